@@ -0,0 +1,116 @@
+"""
+Sample the hidden order of the Player Deck and Infection Deck consistently
+with what the players have seen (determinization). Hands, discard piles and
+the cards in each Infection Deck layer are public; the order within the
+Player Deck and within each layer is not.
+
+sampler = BeliefSampler(game)
+for determinization in sampler.samples(1000, seed=0, horizon=8):
+    determinization.player_draws     # next Player Deck cards, top first
+    determinization.infection_draws  # next Infection Deck cards, top first
+
+Every sample is drawn directly from the posterior, so none are rejected:
+- City cards left in the Player Deck are in uniformly random order, because
+  prepare_player_deck shuffles them before dealing the sub-piles.
+- Each Epidemic still in the deck is uniformly placed among the undrawn
+  cards of its own sub-pile (see epidemics.EpidemicTracker).
+- Each Infection Deck layer is in uniformly random order.
+"""
+from random import Random
+
+
+class Determinization(object):
+    """
+    One sampled ordering of the hidden cards. It holds only the sampled
+    draws; everything else is read from the shared game. With a horizon,
+    only the next horizon cards of each deck are sampled.
+    """
+    __slots__ = ("player_draws", "infection_draws", "complete")
+
+    def __init__(self, player_draws, infection_draws, complete):
+        self.player_draws = player_draws
+        self.infection_draws = infection_draws
+        self.complete = complete
+
+    def apply(self, game):
+        """
+        Put the sampled order into a game, normally a copy of the game the
+        sample was drawn from. Only complete samples can be applied.
+        """
+        if not self.complete:
+            raise ValueError("Can't apply a determinization sampled with a horizon")
+        if len(self.player_draws) != len(game.player_deck) or \
+                len(self.infection_draws) != len(game.infection_deck.deck):
+            raise ValueError("Determinization doesn't match this game's decks")
+        game.player_deck[:] = self.player_draws[::-1]
+        game.infection_deck.deck[:] = self.infection_draws[::-1]
+
+
+class BeliefSampler(object):
+    """
+    Captures the public state of a game once, so that many determinizations
+    can be drawn from it cheaply. Create a new sampler after the game moves on.
+    """
+    def __init__(self, game):
+        deck = game.player_deck
+        self.player_deck_size = len(deck)
+        self.player_cards = [card for card in deck if card != "epidemic"]
+
+        # (offset from the top of the deck, cards left) for each sub-pile whose
+        # Epidemic hasn't been drawn. Without a consistent tracker every
+        # Epidemic is just another card in a uniformly shuffled deck.
+        self.epidemic_piles = []
+        tracker = game.epidemic_tracker
+        if tracker is not None and \
+                tracker.timing.total_cards - tracker.drawn == len(deck):
+            for k, start, remaining in tracker.unresolved_piles():
+                self.epidemic_piles.append((start - tracker.drawn, remaining))
+        if len(self.player_cards) + len(self.epidemic_piles) != len(deck):
+            self.player_cards = list(deck)
+            self.epidemic_piles = []
+
+        # Infection Deck layers, top layer first, each as a list of its cards.
+        self.infection_layers = []
+        infection_deck = game.infection_deck.deck
+        stop = 0
+        for size in game.infection_deck.known_layers():
+            self.infection_layers.append(infection_deck[stop:stop + size])
+            stop += size
+        self.infection_layers.reverse()
+        self.infection_deck_size = len(infection_deck)
+
+    def sample(self, rng, horizon=None):
+        "Return one Determinization, using the random.Random instance rng."
+        player_size = self.player_deck_size
+        infection_size = self.infection_deck_size
+        if horizon is not None:
+            player_size = min(player_size, horizon)
+            infection_size = min(infection_size, horizon)
+
+        epidemic_slots = set()
+        for offset, remaining in self.epidemic_piles:
+            slot = offset + rng.randrange(remaining)
+            if slot < player_size:
+                epidemic_slots.add(slot)
+        cards = rng.sample(self.player_cards, player_size - len(epidemic_slots))
+        if epidemic_slots:
+            cards.reverse()
+            player_draws = ["epidemic" if slot in epidemic_slots else cards.pop()
+                            for slot in range(player_size)]
+        else:
+            player_draws = cards
+
+        infection_draws = []
+        for layer in self.infection_layers:
+            needed = infection_size - len(infection_draws)
+            if needed <= 0:
+                break
+            infection_draws.extend(rng.sample(layer, min(needed, len(layer))))
+
+        complete = player_size == self.player_deck_size and infection_size == self.infection_deck_size
+        return Determinization(player_draws, infection_draws, complete)
+
+    def samples(self, k, seed=None, horizon=None):
+        "Return k independent Determinizations."
+        rng = Random(seed)
+        return [self.sample(rng, horizon) for i in range(k)]
@@ -0,0 +1,309 @@
+"""
+Timing benchmarks for the game engine. Run with
+
+    python bench_pydemic.py
+
+Each benchmark prints the wall-clock time per operation so runs on
+different map sizes can be compared for scaling.
+"""
+import random
+from timeit import default_timer
+import pydemic
+from citymap import citymap, synthetic_map
+from belief import BeliefSampler
+from cureplan import CureOracle
+from doom import DoomDetector
+from endgame import EndgameSolver
+from simulation import RandomPolicy, play_game, run_simulations
+
+MAP_SIZES = [1000, 5000, 20000]
+
+
+def timed(function, repeat):
+    "Return the mean wall-clock seconds for one call of function."
+    start = default_timer()
+    for i in range(repeat):
+        function()
+    return (default_timer() - start) / repeat
+
+
+def report(name, seconds):
+    print "{:<48} {:>12.6f} ms".format(name, seconds * 1000)
+
+
+def bench_maps(repeat=5):
+    "Game construction, setup, infection and full random games on growing maps."
+    maps = [("standard", citymap)]
+    maps.extend(("synthetic {}".format(size), synthetic_map(size, seed=size)) for size in MAP_SIZES)
+
+    for name, city_map in maps:
+        def new_game():
+            return pydemic.Game(num_players=4, num_epidemic_cards=5, city_map=city_map, verbose=False)
+
+        report("{}: construct".format(name), timed(new_game, repeat))
+
+        def setup():
+            new_game().game_setup()
+        report("{}: construct + setup".format(name), timed(setup, repeat))
+
+        def infect_every_city():
+            game = new_game()
+            for city in game.cities.values():
+                city.infect()
+            return game
+        seconds = timed(infect_every_city, repeat)
+        report("{}: infect, per city".format(name), seconds / len(city_map))
+
+        def outbreak_every_city():
+            game = new_game()
+            for city in game.cities.values():
+                game.outbreaks = 0  # keep the outbreak limit out of reach
+                game.outbreak_chain.clear()
+                city.outbreak(city.color)
+        seconds = timed(outbreak_every_city, repeat)
+        report("{}: outbreak, per city".format(name), seconds / len(city_map))
+
+        def random_game():
+            play_game(new_game(), RandomPolicy(seed=0))
+        report("{}: random game".format(name), timed(random_game, repeat))
+
+
+def bench_hands(repeat=20000):
+    "Hand membership and cure checks with list and bitset hands."
+    blue_cities = ["san_francisco", "chicago", "montreal", "new_york", "washington", "atlanta", "london"]
+    for bitset_cards in [False, True]:
+        game = pydemic.Game(num_players=4, num_epidemic_cards=5, verbose=False, bitset_cards=bitset_cards)
+        hand = game.players[0].hand
+        hand.extend(blue_cities)
+        name = "bitset hand" if bitset_cards else "list hand"
+
+        def membership():
+            return "london" in hand and "moscow" in hand
+        report("{}: membership".format(name), timed(membership, repeat))
+
+        def can_cure():
+            return [hand.count_color(color) >= 5 for color in game.colors]
+        report("{}: cure check, all colors".format(name), timed(can_cure, repeat))
+
+
+def bench_belief(samples=1000):
+    "Determinizations of a game in progress, full and with a horizon."
+    game = pydemic.Game(num_players=4, num_epidemic_cards=5, verbose=False)
+    play_game(game, RandomPolicy(seed=0), max_turns=4)
+    report("belief: capture public state", timed(lambda: BeliefSampler(game), 100))
+    sampler = BeliefSampler(game)
+    for horizon in [None, 8]:
+        seconds = timed(lambda: sampler.samples(samples, seed=0, horizon=horizon), 5)
+        report("belief: sample, horizon {}".format(horizon), seconds / samples)
+
+
+def bench_doom(games=1000):
+    "Random games with and without early termination of doomed games."
+    for doom in [None, DoomDetector()]:
+        random.seed(0)
+        start = default_timer()
+        results = run_simulations(games, 4, 5, RandomPolicy(seed=0), doom=doom)
+        name = "doom: with detector" if doom else "doom: without detector"
+        report("{}, per game".format(name), (default_timer() - start) / games)
+        print "{:<48} {:>12.3f}".format(name + ", pruned fraction", results["pruned_fraction"])
+        print "{:<48} {:>12.3f}".format(name + ", turns per game", results["turns"] / float(games))
+
+
+def endgame_position(deck_size):
+    "Return a game where a last blue cure depends on the final draws."
+    game = pydemic.Game(num_players=2, num_epidemic_cards=4, verbose=False, seed=0)
+    game.game_setup()
+    blue = game.cards.cards(game.cards.color_masks["blue"])
+    others = [card for card in game.cards.names if card not in blue]
+    game.cured_diseases.extend(["yellow", "black", "red"])
+    game.turn.player.city = "atlanta"
+    for player in game.players:
+        del player.hand[:]
+    game.turn.player.hand.append(blue[3])
+    game.players[1].hand.extend(blue[:3])
+    game.epidemic_tracker = None
+    game.player_deck[:] = others[:deck_size - 2] + [blue[5], "epidemic"]
+    return game
+
+
+def bench_endgame(deck_sizes=(2, 3)):
+    "Game copies, and exact solves of a last blue cure with the Player Deck nearly empty."
+    game = pydemic.Game(num_players=2, num_epidemic_cards=4, verbose=False, seed=0)
+    game.game_setup()
+    report("endgame: game copy", timed(game.copy, 1000))
+
+    for deck_size in deck_sizes:
+        game = endgame_position(deck_size)
+        solver = EndgameSolver()
+        start = default_timer()
+        result = solver.solve(game)
+        seconds = default_timer() - start
+        name = "endgame: {} cards left".format(deck_size)
+        report(name + ", solve", seconds)
+        print "{:<48} {:>12}".format(name + ", nodes", result.nodes)
+        print "{:<48} {:>12.0f}".format(name + ", nodes per second", result.nodes / seconds)
+        report(name + ", solve again from memo", timed(lambda: solver.solve(game), 3))
+
+
+def bench_cures(repeat=20):
+    "Cure plans per query: searched afresh, unchanged, and after one pawn moves."
+    game = pydemic.Game(num_players=4, num_epidemic_cards=5, verbose=False, seed=0)
+    game.game_setup()
+    for player in game.players:
+        del player.hand[:]
+    for color in game.colors:  # 8 cards of every color spread over the hands
+        for i, card in enumerate(game.cards.cards(game.cards.color_masks[color])[:8]):
+            game.players[i % 4].hand.append(card)
+    mover = game.players[1]
+    home = mover.city
+
+    def fresh():
+        CureOracle(game).plans()
+    report("cures: all colors, fresh oracle", timed(fresh, repeat))
+
+    oracle = CureOracle(game)
+    oracle.plans()
+    report("cures: all colors, unchanged", timed(oracle.plans, repeat))
+
+    def after_move():
+        mover.city = game.neighbors[home][0] if mover.city == home else home
+        oracle.plans()
+    report("cures: all colors, after a pawn moves", timed(after_move, repeat))
+
+
+def bench_transposition(operations=20000, processes=(2, 4)):
+    "Shared table operations, and endgame solves by workers with and without a shared table."
+    from transposition import TranspositionTable, parallel_solve
+
+    table = TranspositionTable(num_entries=2 ** 16)
+    keys = [("state", i) for i in range(operations)]
+    start = default_timer()
+    for key in keys:
+        table.put(key, 0.0, 1.0, depth=1)
+    report("transposition: put", (default_timer() - start) / operations)
+    start = default_timer()
+    for key in keys:
+        table.get(key)
+    report("transposition: get", (default_timer() - start) / operations)
+
+    game = endgame_position(2)
+    for num_processes in processes:
+        for name, table in [("independent", None), ("shared", TranspositionTable(num_entries=2 ** 20))]:
+            start = default_timer()
+            result = parallel_solve(game, processes=num_processes, table=table)
+            seconds = default_timer() - start
+            label = "transposition: {} workers, {}".format(num_processes, name)
+            report(label + ", solve", seconds)
+            print "{:<48} {:>12}".format(label + ", nodes", result.nodes)
+            print "{:<48} {:>12.0f}".format(label + ", nodes/s", result.nodes / seconds)
+
+
+def bench_scoring(positions=200, games=200):
+    "Scoring every legal action at once against listing them, and games played with the scores."
+    from scoring import ActionScorer, ScoringPolicy
+    from simulation import legal_actions
+
+    game = pydemic.Game(num_players=4, num_epidemic_cards=5, verbose=False, seed=0)
+    game.game_setup()
+    scorer = ActionScorer(game)
+    report("scoring: legal_actions", timed(lambda: legal_actions(game, charter=False), positions))
+    report("scoring: score all actions", timed(lambda: scorer.score(game), positions))
+
+    for policy in [RandomPolicy(seed=0), ScoringPolicy(seed=0)]:
+        random.seed(0)
+        start = default_timer()
+        results = run_simulations(games, 4, 5, policy)
+        name = "scoring: " + type(policy).__name__
+        report("{}, per game".format(name), (default_timer() - start) / games)
+        print "{:<48} {:>12.3f}".format(name + ", turns per game", results["turns"] / float(games))
+        print "{:<48} {:>12}".format(name + ", wins", results["won"])
+
+
+def bench_stats(games=500):
+    "Random games with and without GameStats watching them."
+    from stats import GameStats
+
+    for stats in [None, GameStats(citymap)]:
+        random.seed(0)
+        start = default_timer()
+        run_simulations(games, 4, 5, RandomPolicy(seed=0), stats=stats)
+        name = "stats: with GameStats" if stats else "stats: without GameStats"
+        report("{}, per game".format(name), (default_timer() - start) / games)
+    start = default_timer()
+    GameStats(citymap).merge(stats)
+    report("stats: merge", default_timer() - start)
+
+
+def bench_broker(games=64, overhead=0.001, settings=((1, 1), (1, 32), (8, 32), (32, 32), (32, 64))):
+    "Games sharing a batched model with 1 ms of overhead per call, by batch size and games in flight."
+    from broker import InferenceBroker, LinearModel, play_concurrently
+    from environment import PydemicEnv
+
+    env = PydemicEnv(4, 5)
+    for max_batch, in_flight in settings:
+        model = LinearModel.random(env.observation_size, env.num_actions, seed=0, overhead=overhead)
+        broker = InferenceBroker(model, max_batch=max_batch, max_wait=0.002)
+        start = default_timer()
+        play_concurrently(broker, games, in_flight, 4, 5)
+        seconds = default_timer() - start
+        broker.close()
+        stats = broker.report()
+        name = "broker: batch {}, {} in flight".format(max_batch, in_flight)
+        report("{}, per game".format(name), seconds / games)
+        print "{:<48} {:>12.0f}".format(name + ", requests/s", stats["requests_per_second"])
+        print "{:<48} {:>12.1f}".format(name + ", mean batch", stats["mean_batch_size"])
+        print "{:<48} {:>12.3f} ms".format(name + ", p50 latency", stats["p50_ms"])
+        print "{:<48} {:>12.3f} ms".format(name + ", p99 latency", stats["p99_ms"])
+
+
+def bench_environment(steps=2000, num_envs=4):
+    "Environment steps for one game in process and for a vector of worker processes."
+    from environment import PydemicEnv, VectorEnv
+
+    env = PydemicEnv(num_players=4, num_epidemic_cards=5, seed=0)
+    env.reset()
+
+    def env_step():
+        observation, reward, done, info = env.step(int(env.action_mask().nonzero()[0][-1]))
+        if done:
+            env.reset()
+    report("environment: single step", timed(env_step, steps))
+
+    envs = VectorEnv(num_envs, num_players=4, num_epidemic_cards=5, seed=0)
+    envs.reset()
+
+    def vector_step():
+        envs.step([mask.nonzero()[0][-1] for mask in envs.masks])
+    seconds = timed(vector_step, steps // num_envs)
+    envs.close()
+    report("environment: vector of {}, per batch".format(num_envs), seconds)
+    report("environment: vector of {}, per game step".format(num_envs), seconds / num_envs)
+
+
+def bench_sweep(precision=0.05):
+    "Games spent by the adaptive sweep against a uniform grid of the same precision."
+    from sweep import Z_95, run_sweep
+
+    start = default_timer()
+    results = run_sweep(precision=precision, out=None)
+    seconds = default_timer() - start
+    games = sum(totals["games"] for totals in results.values())
+    uniform = len(results) * int(Z_95 * Z_95 * 0.25 / (precision * precision) + 1)
+    report("sweep: adaptive, {} cells".format(len(results)), seconds)
+    print "{:<48} {:>12}".format("sweep: adaptive games", games)
+    print "{:<48} {:>12}".format("sweep: uniform games for the same precision", uniform)
+
+
+if __name__ == "__main__":
+    bench_maps()
+    bench_hands()
+    bench_belief()
+    bench_doom()
+    bench_cures()
+    bench_endgame()
+    bench_transposition()
+    bench_scoring()
+    bench_stats()
+    bench_broker()
+    bench_environment()
+    bench_sweep()
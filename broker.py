@@ -0,0 +1,256 @@
+"""
+Batched evaluation of an expensive policy for many games played at once.
+
+Games running in threads of one process submit state encodings to an
+InferenceBroker and wait for the result. A serving thread takes the
+pending requests in batches, up to max_batch of them, or fewer once the
+oldest has waited max_wait seconds, and makes one call of evaluate on the
+stacked encodings. Per-call overhead is paid once per batch instead of
+once per action.
+
+model = LinearModel.random(env.observation_size, env.num_actions, seed=0)
+broker = InferenceBroker(model, max_batch=32, max_wait=0.002)
+results = play_concurrently(broker, num_games=1000, in_flight=64, num_players=4, num_epidemic_cards=5)
+broker.close()
+broker.report()  # throughput, batch sizes and latency percentiles
+
+BrokeredPolicy turns the scores evaluate returns for each action number
+of environment.PydemicEnv into moves and discards for play_game. Batches
+grow with the number of games in flight, so tune max_batch to in_flight:
+a batch can never be larger than the number of games waiting on it.
+"""
+import threading
+import time
+from Queue import Empty, Queue
+
+import numpy as np
+
+from environment import PydemicEnv
+from pydemic import Game
+from simulation import discarding_player, merge_results, new_results, play_game, record_game
+from stats import Histogram, QuantileSketch
+
+
+class Request(object):
+    "One encoding waiting for its result."
+    __slots__ = ("encoding", "submitted", "output", "error", "_done")
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        self.submitted = time.time()
+        self.output = None
+        self.error = None
+        self._done = threading.Event()
+
+    def result(self):
+        "Wait for the result and return it, raising what evaluate raised if it failed."
+        self._done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.output
+
+
+class InferenceBroker(object):
+    """
+    Serve evaluate, a function from a batch of encodings stacked into one
+    array to an array with one row of results per encoding, to any number
+    of threads. latencies is a QuantileSketch of seconds from submit to
+    result and batch_sizes a Histogram of the sizes of the batches run.
+    """
+    def __init__(self, evaluate, max_batch=32, max_wait=0.002):
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        self.evaluate = evaluate
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.latencies = QuantileSketch()
+        self.batch_sizes = Histogram(max_batch + 1)
+        self.requests = 0
+        self.batches = 0
+        self.started = None
+        self.finished = None
+        self.closed = False
+        self._queue = Queue()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._serve)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def submit(self, encoding):
+        "Queue an encoding and return its Request."
+        request = Request(encoding)
+        with self._lock:  # so no request is queued behind close's sentinel
+            if self.closed:
+                raise ValueError("Broker is closed")
+            self._queue.put(request)
+        return request
+
+    def __call__(self, encoding):
+        "Return the result for one encoding, waiting for its batch to run."
+        return self.submit(encoding).result()
+
+    def close(self):
+        "Run the requests still queued, then stop the serving thread."
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            self._queue.put(None)
+        self._thread.join()
+
+    def _serve(self):
+        queue = self._queue
+        while True:
+            request = queue.get()
+            if request is None:
+                return
+            batch = [request]
+            deadline = request.submitted + self.max_wait
+            stopping = False
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.time()
+                try:
+                    request = queue.get(timeout=timeout) if timeout > 0 else queue.get_nowait()
+                except Empty:
+                    break
+                if request is None:
+                    stopping = True
+                    break
+                batch.append(request)
+            self._run(batch)
+            if stopping:
+                return
+
+    def _run(self, batch):
+        "Evaluate one batch and hand every request its row of the results."
+        if self.started is None:
+            self.started = batch[0].submitted
+        try:
+            outputs = self.evaluate(np.stack([request.encoding for request in batch]))
+            if len(outputs) != len(batch):
+                raise ValueError("evaluate returned {} results for {} encodings".format(len(outputs), len(batch)))
+        except Exception as error:
+            for request in batch:
+                request.error = error
+                request._done.set()
+            return
+        now = time.time()
+        for request, output in zip(batch, outputs):
+            request.output = output
+            self.latencies.add(now - request.submitted)
+        self.requests += len(batch)
+        self.batches += 1
+        self.batch_sizes.add(len(batch))
+        self.finished = now
+        for request in batch:  # after the counts, so a caller's report includes its batch
+            request._done.set()
+
+    def report(self):
+        "Return throughput, mean batch size and latency percentiles in milliseconds."
+        seconds = (self.finished - self.started) if self.batches else 0.0
+        return {"requests": self.requests,
+                "batches": self.batches,
+                "mean_batch_size": self.requests / float(self.batches) if self.batches else 0.0,
+                "requests_per_second": self.requests / seconds if seconds else 0.0,
+                "p50_ms": 1000 * (self.latencies.quantile(0.5) or 0.0),
+                "p99_ms": 1000 * (self.latencies.quantile(0.99) or 0.0)}
+
+
+class LinearModel(object):
+    """
+    A stand-in for an expensive policy network: action scores are the
+    observations times a weight matrix. Each call also sleeps for overhead
+    seconds, like a round trip to an accelerator.
+    """
+    def __init__(self, weights, overhead=0.0):
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.overhead = overhead
+        self.calls = 0
+
+    @classmethod
+    def random(cls, observation_size, num_actions, seed=None, overhead=0.0):
+        weights = np.random.RandomState(seed).standard_normal((observation_size, num_actions))
+        return cls(weights, overhead)
+
+    def __call__(self, observations):
+        self.calls += 1
+        if self.overhead:
+            time.sleep(self.overhead)
+        return observations.dot(self.weights)
+
+
+class BrokeredPolicy(object):
+    """
+    Play the legal action, or discard, that the broker's evaluate scores
+    highest. Games are encoded as environment.PydemicEnv observations and
+    scores are read by PydemicEnv action number.
+    """
+    version = "brokered-1"
+
+    def __init__(self, broker):
+        self.broker = broker
+        self.encoder = None
+
+    def _scores(self, game):
+        "Return the encoder, set to game, and the broker's scores for game."
+        encoder = self.encoder
+        if encoder is None or encoder.city_map is not game.citymap or encoder.num_players != len(game.players):
+            encoder = self.encoder = PydemicEnv(len(game.players), game.num_epidemic_cards, city_map=game.citymap)
+        encoder.game = game
+        encoder.done = False
+        return encoder, self.broker(encoder.observation())
+
+    def _best(self, encoder, scores):
+        mask = encoder.action_mask()
+        return int(np.where(mask, scores, -np.inf).argmax())
+
+    def choose_action(self, game):
+        encoder, scores = self._scores(game)
+        return encoder.action(self._best(encoder, scores))
+
+    def choose_discard(self, game, player):
+        if discarding_player(game) is not player:
+            return player.hand[0]
+        encoder, scores = self._scores(game)
+        method_name, args = encoder.action(self._best(encoder, scores))
+        return args[0]
+
+
+def play_concurrently(broker, num_games, in_flight, num_players, num_epidemic_cards, city_map=None, seed=0):
+    """
+    Play num_games games with BrokeredPolicy, in_flight at a time, each in
+    its own thread, and return their totals from simulation.record_game.
+    Game i is seeded with seed + i.
+    """
+    seeds = Queue()
+    for i in range(num_games):
+        seeds.put(seed + i)
+    results = new_results()
+    lock = threading.Lock()
+    errors = []
+
+    def worker():
+        policy = BrokeredPolicy(broker)
+        own = new_results()
+        try:
+            while True:
+                try:
+                    game_seed = seeds.get_nowait()
+                except Empty:
+                    break
+                game = Game(num_players, num_epidemic_cards, city_map=city_map, verbose=False, seed=game_seed)
+                record_game(own, play_game(game, policy))
+        except Exception as error:
+            errors.append(error)
+        with lock:
+            merge_results(results, own)
+
+    threads = [threading.Thread(target=worker) for i in range(min(in_flight, num_games))]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return results
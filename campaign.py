@@ -0,0 +1,153 @@
+"""
+Long simulation runs that survive being killed, with their results cached.
+
+A campaign plays one game per seed in a range, seeding both the game and
+the policy with that seed, so every game can be replayed exactly. Progress
+and the totals so far are checkpointed to disk every checkpoint_every games.
+A rerun of the same campaign resumes from the last checkpoint, and once it
+finishes its totals are cached, so the same campaign returns immediately.
+
+cache = ResultCache(".pydemic/cache", max_bytes=10 ** 7)
+results = run_campaign(4, 5, seeds=(0, 10 ** 6), directory=".pydemic", cache=cache)
+"""
+import hashlib
+import json
+import os
+
+from doom import DoomDetector
+from pydemic import Game
+from simulation import RandomPolicy, merge_results, new_results, play_game, record_game
+
+
+CACHE_PREFIX = "cache-"
+
+
+def write_json_atomic(path, data):
+    "Write data as JSON so that path holds either the old or the new contents, never a mix."
+    temporary_path = "{}.tmp{}".format(path, os.getpid())
+    with open(temporary_path, "w") as f:
+        json.dump(data, f, sort_keys=True)
+        f.flush()
+        os.fsync(f.fileno())
+    os.rename(temporary_path, path)
+
+
+def read_json(path):
+    "Return the JSON in path, or None if it is missing or corrupt."
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return None
+
+
+def campaign_key(num_players, num_epidemic_cards, policy_version, seeds, doom):
+    "Return the key identifying a campaign's results."
+    return {"num_players": num_players,
+            "num_epidemic_cards": num_epidemic_cards,
+            "policy_version": policy_version,
+            "seeds": list(seeds),
+            "doom": doom}
+
+
+def key_name(key):
+    "Return a file name for a campaign key."
+    return hashlib.sha1(json.dumps(key, sort_keys=True)).hexdigest() + ".json"
+
+
+class ResultCache(object):
+    """
+    Finished campaign totals stored as one JSON file per campaign, named
+    with CACHE_PREFIX. When these files take up more than max_bytes, the
+    least recently used are evicted. Other files in the directory, such as
+    run_campaign's checkpoints, are left alone.
+    """
+    def __init__(self, directory, max_bytes=10 ** 8):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def _path(self, key):
+        return os.path.join(self.directory, CACHE_PREFIX + key_name(key))
+
+    def get(self, key):
+        "Return the cached results for key, or None."
+        path = self._path(key)
+        entry = read_json(path)
+        if entry is None or entry["key"] != key:
+            return None
+        os.utime(path, None)  # mark as recently used
+        return entry["results"]
+
+    def put(self, key, results):
+        "Cache the results for key and evict old entries if over budget."
+        write_json_atomic(self._path(key), {"key": key, "results": results})
+        self.evict()
+
+    def evict(self):
+        "Remove least recently used entries until the cache fits in max_bytes."
+        entries = []
+        for name in os.listdir(self.directory):
+            if not (name.startswith(CACHE_PREFIX) and name.endswith(".json")):
+                continue
+            path = os.path.join(self.directory, name)
+            status = os.stat(path)
+            entries.append((status.st_mtime, status.st_size, path))
+        entries.sort()
+        total = sum(size for mtime, size, path in entries)
+        for mtime, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+
+def play_seeds(num_players, num_epidemic_cards, policy_class, start, stop, use_doom=False):
+    "Play one game for every seed from start to stop and return their totals."
+    results = new_results()
+    doom = DoomDetector() if use_doom else None
+    for seed in range(start, stop):
+        game = Game(num_players, num_epidemic_cards, verbose=False, seed=seed)
+        play_game(game, policy_class(seed=seed), doom=doom)
+        record_game(results, game, doom)
+    return results
+
+
+def run_campaign(num_players, num_epidemic_cards, seeds, directory, policy_class=RandomPolicy,
+                 cache=None, checkpoint_every=1000, use_doom=False):
+    """
+    Play one game for every seed in range(*seeds) and return the totals from
+    simulation.record_game. Checkpoints are kept in directory. With
+    use_doom, games stop as soon as a DoomDetector proves their outcome.
+    """
+    key = campaign_key(num_players, num_epidemic_cards, policy_class.version, seeds, use_doom)
+    if cache is not None:
+        results = cache.get(key)
+        if results is not None:
+            return results
+
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    checkpoint_path = os.path.join(directory, "checkpoint-" + key_name(key))
+    checkpoint = read_json(checkpoint_path)
+    if checkpoint is not None and checkpoint["key"] == key:
+        next_seed = checkpoint["next_seed"]
+        results = checkpoint["results"]
+    else:
+        next_seed = seeds[0]
+        results = new_results()
+
+    stop = seeds[1]
+    while next_seed < stop:
+        batch_stop = min(stop, next_seed + checkpoint_every)
+        merge_results(results, play_seeds(num_players, num_epidemic_cards, policy_class,
+                                          next_seed, batch_stop, use_doom))
+        next_seed = batch_stop
+        write_json_atomic(checkpoint_path, {"key": key, "next_seed": next_seed, "results": results})
+
+    if cache is not None:
+        cache.put(key, results)
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return results
@@ -0,0 +1,143 @@
+"""
+Small-integer card numbering. Every city card on a map gets a bit, so a
+collection of cards is an int whose set bits are its cards and per-color
+masks make color counting a popcount.
+
+cards = CardIndex(citymap)
+hand = cards.mask(["atlanta", "chicago"])
+cards.count(hand, "blue")  # 2
+"""
+
+
+def popcount(mask):
+    "Return the number of set bits in mask."
+    return bin(mask).count("1")
+
+
+def iter_bits(mask):
+    "Yield the index of every set bit in mask, lowest first."
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class CardIndex(object):
+    """
+    Numbers the city cards of a map. Cards of one color get consecutive
+    numbers, in the order of the map's colors.
+    """
+    def __init__(self, city_map):
+        self.colors = list(city_map.graph['colors'])
+        self.names = []
+        for color in self.colors:
+            self.names.extend(city_name for city_name in city_map
+                              if city_map.node[city_name]['color'] == color)
+        self.index = {city_name: i for i, city_name in enumerate(self.names)}
+        self.color_of = [city_map.node[city_name]['color'] for city_name in self.names]
+        self.card_colors = dict(zip(self.names, self.color_of))
+
+        self.color_masks = {color: 0 for color in self.colors}
+        for i, color in enumerate(self.color_of):
+            self.color_masks[color] |= 1 << i
+        self.color_counts = {color: popcount(mask) for color, mask in self.color_masks.items()}
+        self.all_cards = (1 << len(self.names)) - 1
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, card):
+        return card in self.index
+
+    def bit(self, card):
+        "Return the bit for a city card, or 0 for any other card."
+        i = self.index.get(card)
+        if i is None:
+            return 0
+        return 1 << i
+
+    def mask(self, cards):
+        "Return the bitset of the city cards among cards."
+        mask = 0
+        for card in cards:
+            mask |= self.bit(card)
+        return mask
+
+    def cards(self, mask):
+        "Return the city card names in mask."
+        return [self.names[i] for i in iter_bits(mask)]
+
+    def count(self, mask, color):
+        "Return the number of cards of color in mask."
+        return popcount(mask & self.color_masks[color])
+
+
+class CardList(list):
+    """
+    A list of card names that keeps a bitset of its city cards in .mask,
+    so membership tests and color counts don't scan the list. Non-city
+    cards such as "epidemic" are kept in the list but have no bit. City
+    cards are unique in the game, so a city card is never held twice.
+    """
+    def __init__(self, index, cards=()):
+        list.__init__(self, cards)
+        self.index = index
+        self.mask = index.mask(cards)
+
+    def __contains__(self, card):
+        bit = self.index.bit(card)
+        if bit:
+            return bool(self.mask & bit)
+        return list.__contains__(self, card)
+
+    def _recount(self):
+        self.mask = self.index.mask(self)
+
+    def append(self, card):
+        super(CardList, self).append(card)
+        self.mask |= self.index.bit(card)
+
+    def extend(self, cards):
+        super(CardList, self).extend(cards)
+        self._recount()
+
+    def __iadd__(self, cards):
+        self.extend(cards)
+        return self
+
+    def insert(self, i, card):
+        super(CardList, self).insert(i, card)
+        self.mask |= self.index.bit(card)
+
+    def remove(self, card):
+        super(CardList, self).remove(card)
+        self.mask &= ~self.index.bit(card)
+
+    def pop(self, *args):
+        card = super(CardList, self).pop(*args)
+        self.mask &= ~self.index.bit(card)
+        return card
+
+    def __setitem__(self, key, value):
+        super(CardList, self).__setitem__(key, value)
+        self._recount()
+
+    def __delitem__(self, key):
+        super(CardList, self).__delitem__(key)
+        self._recount()
+
+    def __setslice__(self, i, j, cards):
+        super(CardList, self).__setslice__(i, j, cards)
+        self._recount()
+
+    def __delslice__(self, i, j):
+        super(CardList, self).__delslice__(i, j)
+        self._recount()
+
+    def count_color(self, color):
+        "Return the number of cards of color."
+        return self.index.count(self.mask, color)
+
+    def cards_of_color(self, color):
+        "Return the cards of color."
+        return self.index.cards(self.mask & self.index.color_masks[color])
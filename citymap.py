@@ -1,6 +1,126 @@
+import json
+import os
+import random
 import networkx as nx
 
-citymap = nx.read_adjlist("city_map_adj_list_data.txt")
+CUBES_PER_CITY = 2  # the standard map has 24 cubes for 12 cities of each color
+
+
+def finish_map(graph, start, cube_supply=None, colors=None):
+    """
+    Validate a city graph and record the game-wide settings on graph.graph:
+    the ordered list of colors, the starting city and the cube supply.
+    cube_supply may be a single count for every color, a dict of counts,
+    or None to allow CUBES_PER_CITY cubes for every city of a color.
+    colors defaults to the sorted colors of the cities.
+    """
+    city_counts = {}
+    for city_name in graph:
+        color = graph.node[city_name].get('color')
+        if color is None:
+            raise ValueError("City {} has no color".format(city_name))
+        city_counts[color] = city_counts.get(color, 0) + 1
+
+    if colors is None:
+        colors = sorted(city_counts)
+    elif sorted(colors) != sorted(city_counts):
+        raise ValueError("Colors {} do not match the colors of the cities".format(colors))
+    colors = list(colors)
+
+    if start not in graph:
+        raise ValueError("Starting city {} is not on the map".format(start))
+
+    if cube_supply is None:
+        cube_supply = {color: CUBES_PER_CITY * city_counts[color] for color in colors}
+    elif isinstance(cube_supply, dict):
+        cube_supply = dict(cube_supply)
+        for color in colors:
+            if color not in cube_supply:
+                raise ValueError("No cube supply given for {}".format(color))
+    else:
+        cube_supply = {color: cube_supply for color in colors}
+
+    graph.graph['colors'] = colors
+    graph.graph['start'] = start
+    graph.graph['cube_supply'] = cube_supply
+    return graph
+
+
+def load_map(path):
+    """
+    Load a map from a JSON file of the form
+    {"start": "atlanta",
+     "colors": ["blue", "yellow", ...],
+     "cube_supply": 24,
+     "cities": {"atlanta": "blue", "miami": "yellow", ...},
+     "edges": [["atlanta", "miami"], ...]}
+    "colors" and "cube_supply" are optional; "cube_supply" may also map
+    each color to a count.
+    """
+    with open(path) as f:
+        data = json.load(f)
+
+    graph = nx.Graph()
+    for city_name, color in data["cities"].items():
+        graph.add_node(str(city_name), color=str(color))
+    for city_a, city_b in data["edges"]:
+        if city_a not in graph or city_b not in graph:
+            raise ValueError("Route {}-{} uses an unknown city".format(city_a, city_b))
+        graph.add_edge(str(city_a), str(city_b))
+
+    cube_supply = data.get("cube_supply")
+    if isinstance(cube_supply, dict):
+        cube_supply = {str(color): count for color, count in cube_supply.items()}
+    colors = data.get("colors")
+    if colors is not None:
+        colors = [str(color) for color in colors]
+    return finish_map(graph, str(data["start"]), cube_supply, colors)
+
+
+def save_map(graph, path):
+    "Write a map to a JSON file that load_map can read back."
+    data = {"start": graph.graph['start'],
+            "colors": graph.graph['colors'],
+            "cube_supply": graph.graph['cube_supply'],
+            "cities": {city_name: graph.node[city_name]['color'] for city_name in graph},
+            "edges": [list(edge) for edge in graph.edges()]}
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def synthetic_map(num_cities, colors=("blue", "yellow", "black", "red"),
+                  degree=4, shortcuts=0.1, cube_supply=None, seed=None):
+    """
+    Generate a connected small-world map with num_cities cities named
+    city_0, city_1, ... Every city is linked to its degree nearest cities
+    on a ring, and each ring link adds a random long-distance route with
+    probability shortcuts. Colors are assigned in contiguous regions, like
+    the continents of the standard map, and city_0 is the starting city.
+    """
+    colors = list(colors)
+    if num_cities < len(colors):
+        raise ValueError("Need at least one city per color")
+    rng = random.Random(seed)
+    names = ["city_{}".format(i) for i in range(num_cities)]
+
+    graph = nx.Graph()
+    for i, city_name in enumerate(names):
+        graph.add_node(city_name, color=colors[i * len(colors) // num_cities])
+    for i in range(num_cities):
+        for step in range(1, degree // 2 + 1):
+            j = (i + step) % num_cities
+            if i == j:
+                continue
+            graph.add_edge(names[i], names[j])
+            if rng.random() < shortcuts:
+                k = rng.randrange(num_cities)
+                if k != i:
+                    graph.add_edge(names[i], names[k])
+    return finish_map(graph, names[0], cube_supply, colors)
+
+
+STANDARD_MAP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "city_map_adj_list_data.txt")
+citymap = nx.read_adjlist(STANDARD_MAP_PATH)
 
 blue_cities = ["san_francisco",
     "chicago",
@@ -65,3 +185,5 @@ for city in black_cities:
 
 for city in red_cities:
     citymap.node[city]['color'] = 'red'
+
+finish_map(citymap, start="atlanta", colors=["blue", "yellow", "black", "red"])
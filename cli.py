@@ -0,0 +1,293 @@
+#!/usr/bin/env python
+"""
+The pydemic command line. Run with
+
+    python cli.py simulate --games 1000 --players 4 --epidemics 5
+    python cli.py benchmark --games 200 --policy scoring
+    python cli.py replay --seed 17 --format csv
+    python cli.py analyse --games 10000 --stats-out run1.json
+    python cli.py analyse run1.json run2.json
+
+Every subcommand writes rows of results as JSON, or as CSV with --format
+csv. Game i of a run is seeded with --seed + i, for both the game and the
+policy, so any game can be replayed on its own.
+
+Schedulers start this thousands of times, so only argparse is imported at
+startup. The game engine, networkx and NumPy are imported by the
+subcommands that use them; test_cli checks that this stays so.
+"""
+import argparse
+import sys
+from collections import OrderedDict
+
+# Policies by name, as (module, class), imported only when used.
+POLICIES = {"random": ("simulation", "RandomPolicy"),
+            "scoring": ("scoring", "ScoringPolicy"),
+            "endgame": ("endgame", "EndgamePolicy")}
+
+
+def policy_class(name):
+    "Return the policy class registered as name."
+    module_name, class_name = POLICIES[name]
+    module = __import__(module_name)
+    return getattr(module, class_name)
+
+
+def city_map(args):
+    "Return the map chosen by --map, or the standard one."
+    if args.map is None:
+        from citymap import citymap
+        return citymap
+    from citymap import load_map
+    return load_map(args.map)
+
+
+class LossReason(object):
+    "A game observer that only keeps the reason the game was lost."
+    def __init__(self):
+        self.reason = None
+
+    def on_infect(self, city, color):
+        pass
+
+    def on_outbreak(self, city, color):
+        pass
+
+    def on_epidemic(self, game, city):
+        pass
+
+    def on_lose(self, game, reason):
+        self.reason = reason
+
+    def on_treat(self, city, color, cubes):
+        pass
+
+    def on_research_station(self, city):
+        pass
+
+
+def play_games(args, observers=()):
+    "Play args.games games and yield (seed, game, loss reason) for each."
+    from pydemic import Game
+    from simulation import play_game
+
+    policy = policy_class(args.policy)
+    game_map = city_map(args)
+    for seed in range(args.seed, args.seed + args.games):
+        game = Game(args.players, args.epidemics, city_map=game_map, verbose=False, seed=seed)
+        loss = LossReason()
+        game.observers.append(loss)
+        game.observers.extend(observers)
+        play_game(game, policy(seed=seed), max_turns=args.max_turns)
+        for observer in observers:
+            if hasattr(observer, "finish"):
+                observer.finish(game)
+        yield seed, game, loss.reason
+
+
+def game_row(seed, game, reason):
+    from simulation import outcome
+    return OrderedDict([("seed", seed),
+                        ("outcome", outcome(game) or "unfinished"),
+                        ("reason", reason or ""),
+                        ("turns", game.turn_count),
+                        ("outbreaks", game.outbreaks),
+                        ("cured", len(game.cured_diseases)),
+                        ("epidemics", game.infection_track - 1)])
+
+
+def simulate(args):
+    "Play games and return one row per game, or one row of totals."
+    from simulation import new_results, record_game
+
+    results = new_results()
+    rows = []
+    for seed, game, reason in play_games(args):
+        record_game(results, game)
+        if args.per_game:
+            rows.append(game_row(seed, game, reason))
+    if args.per_game:
+        return rows
+    games = results["games"]
+    return [OrderedDict([("games", games),
+                         ("won", results["won"]),
+                         ("lost", results["lost"]),
+                         ("unfinished", results["unfinished"]),
+                         ("win_rate", results["won"] / float(games) if games else 0.0),
+                         ("mean_turns", results["turns"] / float(games) if games else 0.0)])]
+
+
+def benchmark(args):
+    "Time games with the chosen policy and return one row of rates."
+    from timeit import default_timer
+
+    start = default_timer()
+    turns = sum(game.turn_count for seed, game, reason in play_games(args))
+    seconds = default_timer() - start
+    return [OrderedDict([("policy", args.policy),
+                         ("games", args.games),
+                         ("turns", turns),
+                         ("seconds", seconds),
+                         ("games_per_second", args.games / seconds if seconds else 0.0),
+                         ("ms_per_game", 1000 * seconds / args.games if args.games else 0.0)])]
+
+
+class RecordingPolicy(object):
+    "Plays as policy does, keeping the actions it chooses."
+    def __init__(self, policy):
+        self.policy = policy
+        self.actions = []
+
+    def choose_action(self, game):
+        action = self.policy.choose_action(game)
+        self.actions.append(action)
+        return action
+
+    def choose_discard(self, game, player):
+        card = self.policy.choose_discard(game, player)
+        self.actions.append(("discard", (card,)))
+        return card
+
+
+def describe(game, action):
+    "Return an action as text, naming players by their index."
+    method_name, args = action
+    words = [method_name]
+    for arg in args:
+        if isinstance(arg, list):
+            words.append("+".join(arg))
+        elif hasattr(arg, "hand"):
+            words.append("player{}".format(game.players.index(arg)))
+        else:
+            words.append(str(arg))
+    return " ".join(words)
+
+
+def replay(args):
+    "Replay game number --seed turn by turn and return one row per turn."
+    from pydemic import Game
+    from simulation import game_over, outcome, play_turn
+
+    game = Game(args.players, args.epidemics, city_map=city_map(args), verbose=False, seed=args.seed)
+    loss = LossReason()
+    game.observers.append(loss)
+    policy = RecordingPolicy(policy_class(args.policy)(seed=args.seed))
+    game.game_setup()
+    rows = []
+    while not game_over(game) and (args.max_turns is None or game.turn_count <= args.max_turns):
+        turn = game.turn_count
+        player = game.players.index(game.turn.player)
+        del policy.actions[:]
+        play_turn(game, policy)
+        rows.append(OrderedDict([("turn", turn),
+                                 ("player", player),
+                                 ("actions", "; ".join(describe(game, action) for action in policy.actions)),
+                                 ("outbreaks", game.outbreaks),
+                                 ("infection_rate", game.get_infection_rate()),
+                                 ("cubes", sum(sum(city.cubes.values()) for city in game.cities.values())),
+                                 ("cured", " ".join(game.cured_diseases)),
+                                 ("outcome", outcome(game) or ""),
+                                 ("reason", loss.reason or "")]))
+    return rows
+
+
+def analyse(args):
+    """
+    Return the statistics of games as (metric, key, value) rows: from the
+    GameStats files given, merged, or else from playing --games games.
+    """
+    import json
+    from stats import GameStats
+
+    if args.files:
+        stats = None
+        for path in args.files:
+            with open(path) as f:
+                loaded = GameStats.from_dict(json.load(f))
+            stats = loaded if stats is None else stats.merge(loaded)
+    else:
+        stats = GameStats(city_map(args))
+        for game in play_games(args, observers=[stats]):
+            pass
+    if args.stats_out:
+        with open(args.stats_out, "w") as f:
+            json.dump(stats.to_dict(), f, sort_keys=True)
+
+    rows = [("games", "", stats.games),
+            ("win_rate", "", stats.won / float(stats.games) if stats.games else 0.0)]
+    for q in (0.5, 0.9, 0.99):
+        rows.append(("turns", "p{:g}".format(100 * q), stats.turns.quantile(q)))
+        rows.append(("outbreaks_per_game", "p{:g}".format(100 * q), stats.outbreaks_per_game.quantile(q)))
+    for reason, count in sorted(stats.loss_reasons.items(), key=lambda item: -item[1]):
+        rows.append(("loss_reason", reason, count))
+    for turn, count in enumerate(stats.epidemic_turns.counts):
+        if count:
+            rows.append(("epidemic_turn", turn, count))
+    for name in ("outbreaks", "cubes", "epidemics"):
+        for count, city in stats.top(name, args.top):
+            rows.append((name, city, count))
+    return [OrderedDict([("metric", metric), ("key", key), ("value", value)]) for metric, key, value in rows]
+
+
+def write_rows(rows, output_format, out):
+    "Write rows, a list of OrderedDicts with the same keys, as JSON or CSV."
+    if output_format == "json":
+        import json
+        json.dump(rows, out, indent=2, separators=(",", ": "))
+        out.write("\n")
+        return
+    import csv
+    if not rows:
+        return
+    writer = csv.DictWriter(out, fieldnames=list(rows[0]), lineterminator="\n")
+    writer.writeheader()
+    for row in rows:
+        writer.writerow({key: value.encode("utf-8") if isinstance(value, unicode) else value
+                         for key, value in row.items()})
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="pydemic", description="Simulate and analyse games of pydemic.")
+    subcommands = parser.add_subparsers(dest="command")
+
+    def game_options(subparser, games):
+        subparser.add_argument("--players", type=int, default=4)
+        subparser.add_argument("--epidemics", type=int, default=5)
+        subparser.add_argument("--policy", choices=sorted(POLICIES), default="random")
+        subparser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+        subparser.add_argument("--map", help="JSON map file from citymap.save_map")
+        subparser.add_argument("--max-turns", type=int, help="stop games after this many turns")
+        subparser.add_argument("--format", choices=["json", "csv"], default="json")
+        if games is not None:
+            subparser.add_argument("--games", type=int, default=games)
+
+    simulate_parser = subcommands.add_parser("simulate", help="play games and report the totals")
+    game_options(simulate_parser, 100)
+    simulate_parser.add_argument("--per-game", action="store_true", help="one row per game instead of totals")
+    simulate_parser.set_defaults(run=simulate)
+
+    benchmark_parser = subcommands.add_parser("benchmark", help="time games played by a policy")
+    game_options(benchmark_parser, 100)
+    benchmark_parser.set_defaults(run=benchmark)
+
+    replay_parser = subcommands.add_parser("replay", help="replay one game turn by turn")
+    game_options(replay_parser, None)
+    replay_parser.set_defaults(run=replay)
+
+    analyse_parser = subcommands.add_parser("analyse", help="outbreaks, cubes, epidemics and losses over games")
+    game_options(analyse_parser, 100)
+    analyse_parser.add_argument("files", nargs="*", help="GameStats JSON files to merge instead of playing")
+    analyse_parser.add_argument("--stats-out", help="also write the GameStats as JSON to this file")
+    analyse_parser.add_argument("--top", type=int, default=10, help="cities to list per counter")
+    analyse_parser.set_defaults(run=analyse)
+    return parser
+
+
+def main(argv=None, out=None):
+    args = build_parser().parse_args(argv)
+    write_rows(args.run(args), args.format, out or sys.stdout)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
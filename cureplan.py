@@ -0,0 +1,234 @@
+"""
+How far the players are from curing each disease with the cards they hold.
+
+For every uncured color, CureOracle finds the cheapest way for one player,
+the curer, to collect 5 cards of that color and reach a research station.
+Cards held by other players are collected with share_knowledge, which
+needs the giver and the curer to meet in the card's city. The search runs
+over which cards to collect, in which order, and where each giver walks
+to, memoizing every (curer city, cards still needed, giver cities) state.
+
+Travel is by driving and shuttle flights only, so no card is spent to
+move, and cards are never passed on through a third player. A color whose
+cards in hands add up to fewer than 5 has no plan until more are drawn.
+
+oracle = CureOracle(game)
+plan = oracle.plan("blue")
+plan.player, plan.actions, plan.turns, plan.cards
+oracle.fastest_plan("blue").turns
+
+plan is the plan with the fewest actions and fastest_plan the one with
+the fewest turns, which may have another curer.
+
+The oracle reads the game on every query and only searches again for a
+color when its cards, the pawns or the research stations have moved.
+Searches share their memo, so replanning after a move mostly reuses
+earlier states.
+"""
+from collections import deque
+
+CARDS_TO_CURE = 5
+ACTIONS_PER_TURN = 4
+UNREACHABLE = float("inf")
+
+
+class CurePlan(object):
+    """
+    A plan found to cure color. player is the index of the curer, actions the total actions of all players including the cure
+    and cards the cards cured with. turns is how many turns start before
+    this plan's cure could happen, 0 for this turn, assuming meetings
+    never wait.
+    """
+    __slots__ = ("color", "player", "actions", "turns", "cards")
+
+    def __init__(self, color, player, actions, turns, cards):
+        self.color = color
+        self.player = player
+        self.actions = actions
+        self.turns = turns
+        self.cards = cards
+
+    def __repr__(self):
+        return "CurePlan(color={!r}, player={}, actions={}, turns={}, cards={!r})".format(
+            self.color, self.player, self.actions, self.turns, self.cards)
+
+
+class CureOracle(object):
+    "Minimum actions and turns to cure each uncured color. See the module docstring."
+    def __init__(self, game):
+        self.game = game
+        self._distances = {}  # city -> {city: driving distance}
+        self._stations = None
+        self._station_distance = {}
+        self._memo = {}
+        self._plans = {}  # color -> (signature, cheapest plan, fastest plan)
+        self.searches = 0
+
+    def plan(self, color):
+        """
+        Return the CurePlan for color with the fewest actions, and of those
+        the fewest turns, or None if it is cured or can't be cured from the
+        hands.
+        """
+        return self._lookup(color)[0]
+
+    def fastest_plan(self, color):
+        "Return the CurePlan for color with the fewest turns, and of those the fewest actions, or None."
+        return self._lookup(color)[1]
+
+    def _lookup(self, color):
+        "Return the cheapest and the fastest CurePlan for color, searching only if the game changed."
+        game = self.game
+        if color in game.cured_diseases or game.turn is None:
+            return None, None
+        self._check_stations()
+        holdings = tuple(tuple(sorted(player.hand.cards_of_color(color))) for player in game.players)
+        positions = tuple(player.city for player in game.players)
+        signature = (holdings, positions, game.players.index(game.turn.player),
+                     game.turn.actions if not game.turn.ended else 0)
+        cached = self._plans.get(color)
+        if cached is not None and cached[0] == signature:
+            return cached[1:]
+
+        self.searches += 1
+        plans = self._search(color, holdings, positions)
+        self._plans[color] = (signature,) + plans
+        return plans
+
+    def plans(self):
+        "Return {color: CurePlan or None} for every uncured color."
+        return {color: self.plan(color) for color in self.game.colors if color not in self.game.cured_diseases}
+
+    def actions_to_cure(self, color):
+        "Return the minimum actions to cure color, or None."
+        plan = self.plan(color)
+        return plan.actions if plan is not None else None
+
+    def turns_to_cure(self, color):
+        "Return the minimum turns before color can be cured, or None."
+        plan = self.fastest_plan(color)
+        return plan.turns if plan is not None else None
+
+    def distance(self, start, stop):
+        "Return the fewest drives and shuttle flights from start to stop."
+        self._check_stations()
+        return self._distance(start, stop)
+
+    def _distance(self, start, stop):
+        driving = self._bfs(start).get(stop, UNREACHABLE)
+        shuttle = self._station_distance.get(start, UNREACHABLE) + 1 + self._station_distance.get(stop, UNREACHABLE)
+        return min(driving, shuttle)
+
+    def _bfs(self, start):
+        distances = self._distances.get(start)
+        if distances is None:
+            distances = breadth_first(self.game.neighbors, [start])
+            self._distances[start] = distances
+        return distances
+
+    def _check_stations(self):
+        "Start afresh when research stations were built or removed."
+        stations = frozenset(city.name for city in self.game.cities.values() if city.has_research_station)
+        if stations != self._stations:
+            self._stations = stations
+            self._station_distance = breadth_first(self.game.neighbors, stations)
+            self._memo.clear()
+            self._plans.clear()
+
+    def _search(self, color, holdings, positions):
+        "Return the cheapest and the fastest CurePlan over every choice of curer."
+        if sum(len(cards) for cards in holdings) < CARDS_TO_CURE:
+            return None, None
+        best = fastest = None
+        for curer, own_cards in enumerate(holdings):
+            needed = CARDS_TO_CURE - len(own_cards)
+            offers = frozenset((card, giver) for giver, cards in enumerate(holdings) if giver != curer
+                               for card in cards) if needed > 0 else frozenset()
+            actions, per_player, collected = self._collect(curer, positions[curer], max(needed, 0), offers,
+                                                           positions)
+            if actions == UNREACHABLE:
+                continue
+            plan = CurePlan(color, curer, actions, self._turns(per_player),
+                            list(own_cards[:CARDS_TO_CURE]) + collected)
+            if best is None or (plan.actions, plan.turns) < (best.actions, best.turns):
+                best = plan
+            if fastest is None or (plan.turns, plan.actions) < (fastest.turns, fastest.actions):
+                fastest = plan
+        return best, fastest
+
+    def _collect(self, curer, city, needed, offers, positions):
+        """
+        Return (actions, actions per player, cards collected) for the curer
+        in city to collect needed more cards from offers, a set of (card,
+        giver) pairs, and then cure at the nearest research station.
+        Givers stand at positions, a tuple of every player's city.
+        """
+        givers = set(giver for card, giver in offers)
+        key = (curer, city, needed, offers,
+               tuple(position if player in givers else None for player, position in enumerate(positions)))
+        result = self._memo.get(key)
+        if result is not None:
+            return result
+
+        if needed == 0:
+            to_station = self._station_distance.get(city, UNREACHABLE)
+            per_player = [0] * len(positions)
+            per_player[curer] = to_station + 1
+            result = to_station + 1, tuple(per_player), []
+        else:
+            result = UNREACHABLE, (), []
+            costs = []
+            for offer in offers:
+                card, giver = offer
+                walk = self._distance(city, card)
+                giver_walk = self._distance(positions[giver], card)
+                costs.append((walk + giver_walk + 1, walk, giver_walk, offer))  # + 1 for share_knowledge
+            costs.sort()
+            for cost, walk, giver_walk, offer in costs:
+                card, giver = offer
+                if cost >= result[0]:
+                    break
+                moved = positions[:giver] + (card,) + positions[giver + 1:]
+                actions, per_player, collected = self._collect(curer, card, needed - 1,
+                                                               offers - {offer}, moved)
+                if cost + actions < result[0]:
+                    per_player = list(per_player)
+                    per_player[curer] += walk + 1
+                    per_player[giver] += giver_walk
+                    result = cost + actions, tuple(per_player), [card] + collected
+        self._memo[key] = result
+        return result
+
+    def _turns(self, per_player):
+        "Return how many turns start before every player has taken their actions."
+        game = self.game
+        num_players = len(game.players)
+        current = game.players.index(game.turn.player)
+        left_now = game.turn.actions if not game.turn.ended else 0
+        turns = 0
+        for player, actions in enumerate(per_player):
+            if actions == 0:
+                continue
+            if player == current:
+                if actions <= left_now:
+                    continue
+                own_turns = -(-(actions - left_now) // ACTIONS_PER_TURN)
+                turns = max(turns, num_players * own_turns)
+            else:
+                own_turns = -(-actions // ACTIONS_PER_TURN)
+                turns = max(turns, (player - current) % num_players + num_players * (own_turns - 1))
+        return turns
+
+
+def breadth_first(neighbors, sources):
+    "Return {city: fewest drives from any of sources}."
+    distances = {source: 0 for source in sources}
+    queue = deque(sources)
+    while queue:
+        city = queue.popleft()
+        distance = distances[city] + 1
+        for neighbor in neighbors[city]:
+            if neighbor not in distances:
+                distances[neighbor] = distance
+                queue.append(neighbor)
+    return distances
@@ -0,0 +1,220 @@
+"""
+Prove the outcome of a game before it is played out, using cheap bounds.
+A DoomDetector only reports a loss it can prove for every hidden deck
+order and every choice the players could make:
+
+- lost: an uncured disease can no longer collect 5 cards, because the
+  cards of that color left in hands and the Player Deck are too few, or
+  together the uncured diseases need more cards than the deck still holds.
+- lost: after the player cards are drawn, the infection cards still to be
+  drawn this turn must place more cubes than the supply holds or must
+  cause the eighth outbreak, whichever cards come up.
+- lost: the Player Deck can't supply another turn, and the current
+  player can't collect 5 cards of every uncured color or hasn't the
+  actions to cure them all this turn.
+
+With prove_wins, it also reports a win when one is within the players'
+reach, which is only a proof for a search that plays the best move, like
+endgame.EndgameSolver:
+
+- won: the current player holds 5 cards of every uncured color and has
+  the actions to reach a research station and cure them all.
+
+A policy may still miss that win, so play_game is given a detector
+without prove_wins and plays such games out.
+
+doom = DoomDetector()
+play_game(game, policy, doom=doom)
+doom.outcome, doom.reason
+"""
+from collections import Counter
+
+MAX_OUTBREAKS = 7
+CARDS_TO_CURE = 5
+
+
+class DoomDetector(object):
+    """
+    Opt-in outcome proofs. Counts how often it was asked and how often it
+    proved something. See the module docstring for prove_wins.
+    """
+    def __init__(self, prove_wins=False):
+        self.provers = ((forced_win,) if prove_wins else ()) + LOSS_PROVERS
+        self.checks = 0
+        self.proofs = 0
+        self.outcome = None
+        self.reason = None
+
+    def reset(self):
+        "Forget the outcome of the last game."
+        self.outcome = None
+        self.reason = None
+
+    def check(self, game):
+        """
+        Return "won" or "lost" if the outcome of the game is certain, else
+        None. The outcome and its reason are kept in .outcome and .reason.
+        """
+        self.checks += 1
+        if game.won:
+            return self._prove("won", "All diseases cured")
+        if game.lost:
+            return self._prove("lost", "Game already lost")
+        for prover in self.provers:
+            outcome, reason = prover(game)
+            if outcome is not None:
+                return self._prove(outcome, reason)
+        return None
+
+    def _prove(self, outcome, reason):
+        self.proofs += 1
+        self.outcome = outcome
+        self.reason = reason
+        return outcome
+
+
+def uncured_colors(game):
+    return [color for color in game.colors if color not in game.cured_diseases]
+
+
+def too_few_cards(game):
+    "Prove a loss when the Player Deck can't supply the cards for the missing cures."
+    uncured = uncured_colors(game)
+    if not uncured:
+        return None, None
+
+    # A color runs short only after some of its cards are discarded, and
+    # the deck runs short only when it holds fewer cards than the cures need.
+    fewest_cards = min(game.cards.color_counts[color] for color in uncured)
+    if len(game.player_discard_pile) <= fewest_cards - CARDS_TO_CURE and \
+            len(game.player_deck) - game.num_epidemic_cards >= CARDS_TO_CURE * len(uncured):
+        return None, None
+
+    card_colors = game.cards.card_colors
+    deck_counts = Counter(card_colors[card] for card in game.player_deck if card in card_colors)
+    held_counts = Counter(card_colors[card] for player in game.players
+                          for card in player.hand if card in card_colors)
+    needed = 0
+    for color in uncured:
+        missing = max(0, CARDS_TO_CURE - held_counts[color])
+        if missing > deck_counts[color]:
+            return "lost", "Not enough {} cards left to cure".format(color)
+        needed += missing
+
+    if needed > sum(deck_counts.values()):
+        return "lost", "Not enough player cards left to cure every disease"
+    return None, None
+
+
+def last_turn_loss(game):
+    """
+    Prove a loss on the last turn, when fewer than 2 Player Deck cards are
+    left for the next InfectionTurn. Only the current player can cure
+    before then, with cards in hand or given by other players.
+    """
+    turn = game.turn
+    if turn is None or turn.ended or len(game.player_deck) >= 2:
+        return None, None
+    uncured = uncured_colors(game)
+    if len(uncured) > turn.actions:
+        return "lost", "Not enough actions left to cure every disease"
+    hand = turn.player.hand
+    for color in uncured:
+        available = hand.count_color(color)
+        if available >= CARDS_TO_CURE:
+            continue
+        for player in game.players:
+            if player is not turn.player:
+                available += player.hand.count_color(color)
+        if available < CARDS_TO_CURE:
+            return "lost", "Not enough {} cards to cure on the last turn".format(color)
+    return None, None
+
+
+def forced_infection_loss(game):
+    """
+    Prove a loss from the infection cards still to be drawn this turn.
+    Only applies once both player cards are drawn, when no action or
+    Epidemic can change the board before the infections.
+    """
+    infection_turn = game.infection_turn
+    if infection_turn is None or infection_turn.ended or infection_turn.player_cards_drawn < 2:
+        return None, None
+    to_draw = game.get_infection_rate() - infection_turn.infection_cards_drawn
+    if to_draw <= 0:
+        return None, None
+    if game.outbreaks + to_draw <= MAX_OUTBREAKS and \
+            min(game.cube_supply.values()) >= to_draw:
+        return None, None
+
+    # Cards are drawn from the top layer down, in unknown order within a
+    # layer. Whatever the order, drawing n of a layer's cards draws at least
+    # n - (cards without the property) cards with it.
+    deck = game.infection_deck.deck
+    forced_cubes = Counter()
+    forced_outbreaks = 0
+    stop = len(deck)
+    for size in reversed(game.infection_deck.known_layers()):
+        if to_draw <= 0:
+            break
+        layer = deck[stop - size:stop]
+        stop -= size
+        drawn = min(to_draw, size)
+        to_draw -= drawn
+
+        cube_cards = Counter()
+        outbreak_cards = 0
+        for city_name in layer:
+            city = game.cities[city_name]
+            if city.color in game.eradicated_diseases:
+                continue
+            if city.cubes[city.color] < 3:
+                cube_cards[city.color] += 1
+            else:
+                outbreak_cards += 1
+
+        for color, count in cube_cards.items():
+            forced_cubes[color] += max(0, drawn - (size - count))
+        forced_outbreaks += max(0, drawn - (size - outbreak_cards))
+
+        # Even the luckiest cards can't avoid placing a cube without supply.
+        safe_cards = size - sum(cube_cards.values())
+        safe_cards += sum(min(count, game.cube_supply[color]) for color, count in cube_cards.items())
+        if drawn > safe_cards:
+            return "lost", "Not enough cubes for this turn's infections"
+
+    for color, count in forced_cubes.items():
+        if count > game.cube_supply[color]:
+            return "lost", "Not enough {} cubes for this turn's infections".format(color)
+    if game.outbreaks + forced_outbreaks > MAX_OUTBREAKS:
+        return "lost", "This turn's infections must cause the eighth outbreak"
+    return None, None
+
+
+def forced_win(game):
+    """
+    Prove that the current player can win by curing every remaining disease
+    this turn. The game is only won if they do.
+    """
+    turn = game.turn
+    if turn is None or turn.ended:
+        return None, None
+    uncured = uncured_colors(game)
+    hand = turn.player.hand
+    for color in uncured:
+        if hand.count_color(color) < CARDS_TO_CURE:
+            return None, None
+
+    actions_needed = len(uncured)
+    if not game.cities[turn.player.city].has_research_station:
+        neighbors = game.neighbors[turn.player.city]
+        if not any(game.cities[city_name].has_research_station for city_name in neighbors):
+            return None, None
+        actions_needed += 1
+    if actions_needed > turn.actions:
+        return None, None
+    return "won", "Current player can cure every remaining disease this turn"
+
+
+# Proofs that hold whatever the players do, tried in this order.
+LOSS_PROVERS = (too_few_cards, last_turn_loss, forced_infection_loss)
@@ -0,0 +1,457 @@
+"""
+Solve the end of a game exactly. Once the Player Deck is nearly empty the
+game has only a few turns left, because InfectionTurn declares a loss when
+fewer than 2 cards remain, so the players' choices and the hidden cards can
+be searched to the end.
+
+EndgameSolver runs expectimax: the players pick the move with the highest
+win probability, and card draws are averaged over what the deck can hold.
+- Player draws: the next card is an Epidemic with the probability the
+  EpidemicTracker gives, else any city card left in the deck is equally likely.
+- An Epidemic also infects any card of the bottom Infection Deck layer.
+- Infection draws come from the top Infection Deck layer, equally likely.
+
+States are memoized under a canonical key that leaves out the hidden order
+of the decks, chance nodes are cut off with Star1 bounds, and
+doom.DoomDetector ends lines whose outcome is already certain. On the last
+turn, when the Player Deck can't supply another, only the cards, pawns and
+research stations can still matter, so the key leaves out the board, and
+infections that can't lose the game before it collapse into one outcome. A search
+that runs out of its node or time budget returns bounds instead of an
+exact value.
+
+solver = EndgameSolver(max_nodes=10 ** 5)
+result = solver.solve(game)
+result.value, result.action, result.exact
+
+EndgamePolicy plays another policy's moves until the deck is nearly empty
+and the solver's from then on.
+"""
+import time
+
+from doom import DoomDetector
+from simulation import (ACTION, DISCARD, INFECTION_DRAW, OVER, PLAYER_DRAW, RandomPolicy, advance,
+                        discarding_player, legal_actions)
+
+# Moves tried first, so that good lines raise the bounds early.
+MOVE_ORDER = {"discover_cure": 0, "share_knowledge": 1, "build_research_station": 2,
+              "direct_flight": 3, "shuttle_flight": 3, "charter_flight": 3, "drive": 3,
+              "treat_disease": 4, "skip": 5}
+
+
+class EndgameResult(object):
+    """
+    The outcome of EndgameSolver.solve. value is the win probability of
+    the best move, or a lower bound on it when the search ran out of
+    budget, in which case upper bounds it from above and exact is False.
+    action is a (method_name, args) action or a card to discard, for the
+    game passed to solve, or None where the next step is a card draw.
+    """
+    __slots__ = ("value", "upper", "action", "exact", "nodes")
+
+    def __init__(self, value, upper, action, exact, nodes):
+        self.value = value
+        self.upper = upper
+        self.action = action
+        self.exact = exact
+        self.nodes = nodes
+
+    def __repr__(self):
+        return "EndgameResult(value={:.4f}, upper={:.4f}, action={!r}, exact={}, nodes={})".format(
+            self.value, self.upper, self.action, self.exact, self.nodes)
+
+
+class EndgameSolver(object):
+    """
+    Memoized expectimax with a budget of max_nodes expanded nodes and
+    max_seconds per solve. Charter flights are left out unless charter is
+    set, as in the other policies. Solved states are kept between calls,
+    so solving each move of the same endgame reuses the earlier work.
+    Pass a transposition.TranspositionTable as table to keep them there
+    instead, shared with solvers in other processes.
+    """
+    def __init__(self, max_nodes=10 ** 5, max_seconds=None, charter=False, max_entries=10 ** 6, table=None):
+        self.max_nodes = max_nodes
+        self.max_seconds = max_seconds
+        self.charter = charter
+        self.max_entries = max_entries
+        self.doom = DoomDetector(prove_wins=True)
+        self.memo = {}
+        self.table = table
+        self.nodes = 0
+        self._city_map = None
+        self._city_names = []
+        self._deadline = None
+        self._exhausted = False
+
+    def solve(self, game):
+        "Return an EndgameResult for the game's current position."
+        self._start(game)
+        root = game.copy()
+        phase = advance(root, stop_at_draws=True)
+        action = None
+        if phase in (ACTION, DISCARD) and not root.won and not root.lost:
+            lower, upper, action = self._best_move(root, phase, game)
+        else:
+            lower, upper = self._search(root, 0.0, 1.0)
+        exact = upper - lower < 1e-9
+        return EndgameResult(lower, upper, action, exact, self.nodes)
+
+    def root_moves(self, game):
+        """
+        Return the moves solve would choose between, in the order it tries
+        them, or an empty list if a card draw comes first.
+        """
+        root = game.copy()
+        phase = advance(root, stop_at_draws=True)
+        if phase not in (ACTION, DISCARD) or root.won or root.lost:
+            return []
+        return self._moves(game, phase)
+
+    def solve_move(self, game, move, alpha=0.0):
+        """
+        Return (lower, upper) bounds on the win probability after one of
+        the root_moves. Bounds at most alpha only show the move is no better.
+        """
+        self._start(game)
+        root = game.copy()
+        phase = advance(root, stop_at_draws=True)
+        return self._search(self._play(root, phase, move, source=game), alpha, 1.0)
+
+    def _start(self, game):
+        "Reset the budget, and forget solved states from another map or beyond max_entries."
+        if game.citymap is not self._city_map:
+            if self._city_map is not None and self.table is not None:
+                self.table.clear()
+            self._city_map = game.citymap
+            self._city_names = sorted(game.cities)
+            self.memo.clear()
+        elif len(self.memo) > self.max_entries:
+            self.memo.clear()
+        self.nodes = 0
+        self._exhausted = False
+        self._deadline = time.time() + self.max_seconds if self.max_seconds is not None else None
+
+    def _best_move(self, root, phase, game):
+        "Search the root's moves and return (lower, upper, move), with moves from game."
+        best_lower, best_upper, best_move = -1.0, 0.0, None
+        for move in self._moves(game, phase):
+            child = self._play(root, phase, move, source=game)
+            lower, upper = self._search(child, max(best_lower, 0.0), 1.0)
+            if lower > best_lower:
+                best_lower, best_move = lower, move
+            best_upper = max(best_upper, upper)
+            if best_lower >= 1.0:
+                break
+        return best_lower, max(best_upper, best_lower), best_move
+
+    def _search(self, game, alpha, beta):
+        """
+        Return (lower, upper) bounds on the win probability of a game that
+        is about to be advanced. Within the window alpha < value < beta the
+        bounds meet unless the budget runs out; outside it they may only
+        show that the value is at most alpha or at least beta.
+        """
+        phase = advance(game, stop_at_draws=True)
+        if game.won:
+            return 1.0, 1.0
+        if game.lost or phase == OVER:
+            return 0.0, 0.0
+        proved = self.doom.check(game)
+        if proved is not None:
+            return (1.0, 1.0) if proved == "won" else (0.0, 0.0)
+
+        if phase == INFECTION_DRAW and len(game.player_deck) < 2:
+            # Infections before the last turn can only lose the game, so the
+            # last turn's value bounds them, and is their value if they can't.
+            lower, upper = self._last_turn_value(game, alpha, beta)
+            if harmless_infections(game):
+                return lower, upper
+            if upper <= alpha or upper == 0.0:
+                return 0.0, upper
+
+        key = self.state_key(game, phase)
+        if self.table is not None:
+            lower, upper = self.table.get(key, (0.0, 1.0))
+        else:
+            lower, upper = self.memo.get(key, (0.0, 1.0))
+        if upper - lower < 1e-9 or upper <= alpha or lower >= beta:
+            return lower, upper
+        if self._out_of_budget():
+            return lower, upper
+        self.nodes += 1
+        first_node = self.nodes
+
+        alpha = max(alpha, lower)
+        beta = min(beta, upper)
+        if phase in (ACTION, DISCARD):
+            new_lower, new_upper = self._max_node(game, phase, alpha, beta)
+        else:
+            new_lower, new_upper = self._chance_node(game, phase, alpha, beta)
+        lower = max(lower, new_lower)
+        upper = max(lower, min(upper, new_upper))
+        if self.table is not None:
+            self.table.put(key, lower, upper, depth=self.nodes - first_node + 1)
+        else:
+            self.memo[key] = (lower, upper)
+        return lower, upper
+
+    def _last_turn_value(self, game, alpha, beta):
+        "Return bounds on the value of the last turn, reached without this turn's infections."
+        last_turn = game.copy()
+        last_turn.infection_turn.infection_cards_drawn = last_turn.get_infection_rate()
+        return self._search(last_turn, alpha, beta)
+
+    def _max_node(self, game, phase, alpha, beta):
+        best_lower, best_upper = 0.0, 0.0
+        for move in self._moves(game, phase):
+            lower, upper = self._search(self._play(game, phase, move), max(alpha, best_lower), beta)
+            best_lower = max(best_lower, lower)
+            best_upper = max(best_upper, upper)
+            if best_lower >= beta:
+                return best_lower, 1.0
+        return best_lower, best_upper
+
+    def _chance_node(self, game, phase, alpha, beta):
+        """
+        Star1: with the explored outcomes' bounds known and the rest
+        assumed to lie in [0, 1], each outcome is searched with the window
+        that would let it settle the node, and the node stops as soon as
+        its own bounds leave alpha < value < beta.
+        """
+        if phase == PLAYER_DRAW:
+            outcomes = player_draw_outcomes(game)
+        else:
+            outcomes = infection_draw_outcomes(game)
+        outcomes.sort(key=lambda outcome: -outcome[0])
+
+        explored_lower = explored_upper = 0.0
+        unexplored = 1.0
+        for outcome in outcomes:
+            probability = outcome[0]
+            unexplored -= probability
+            child_alpha = (alpha - explored_upper - max(unexplored, 0.0)) / probability
+            child_beta = (beta - explored_lower) / probability
+            child = game.copy()
+            if phase == PLAYER_DRAW:
+                draw_player_outcome(child, outcome[1], outcome[2])
+            else:
+                draw_infection_outcome(child, outcome[1])
+            lower, upper = self._search(child, max(child_alpha, 0.0), min(child_beta, 1.0))
+            explored_lower += probability * lower
+            explored_upper += probability * upper
+            node_upper = explored_upper + max(unexplored, 0.0)
+            if node_upper <= alpha or explored_lower >= beta:
+                return explored_lower, node_upper
+        return explored_lower, explored_upper
+
+    def _moves(self, game, phase):
+        "Return the moves at a max node, most promising first."
+        if phase == DISCARD:
+            return sorted(set(discarding_player(game).hand))
+        return sorted(legal_actions(game, charter=self.charter), key=lambda move: MOVE_ORDER[move[0]])
+
+    def _play(self, game, phase, move, source=None):
+        """
+        Return a copy of game with the move made. The move may come from
+        source, a game in the same position, instead of from game itself.
+        """
+        child = game.copy()
+        if phase == DISCARD:
+            discarding_player(child).hand.discard(move)
+            return child
+        method_name, args = move
+        if method_name == "share_knowledge":
+            args = (child.players[(source or game).players.index(args[0])],)
+        getattr(child.turn, method_name)(*args)
+        return child
+
+    def _out_of_budget(self):
+        if self._exhausted:
+            return True
+        if self.nodes >= self.max_nodes or \
+                (self._deadline is not None and self.nodes % 256 == 0 and time.time() > self._deadline):
+            self._exhausted = True
+        return self._exhausted
+
+    def state_key(self, game, phase):
+        """
+        Return a key for everything that decides the rest of the game and
+        nothing that doesn't: the order of cards within the Player Deck and
+        within each Infection Deck layer is unknown, so only which cards
+        they hold is part of the key.
+        """
+        turn = game.turn
+        if phase == ACTION and len(game.player_deck) < 2:
+            return (phase,
+                    game.players.index(turn.player), turn.actions,
+                    tuple(player.city for player in game.players),
+                    tuple(frozenset(player.hand) for player in game.players),
+                    frozenset(name for name in self._city_names if game.cities[name].has_research_station),
+                    frozenset(game.cured_diseases))
+
+        infection_turn = game.infection_turn
+        cities = game.cities
+        colors = game.colors
+        infection_deck = game.infection_deck
+        deck = infection_deck.deck
+        layers = []
+        stop = len(deck)
+        for size in reversed(infection_deck.known_layers()):
+            layers.append(frozenset(deck[stop - size:stop]))
+            stop -= size
+        tracker = game.epidemic_tracker
+        return (phase,
+                game.players.index(turn.player), turn.actions, turn.ended,
+                (infection_turn.player_cards_drawn, infection_turn.infection_cards_drawn)
+                if infection_turn is not None else None,
+                tuple(player.city for player in game.players),
+                tuple(frozenset(player.hand) for player in game.players),
+                tuple(tuple(cities[name].cubes[color] for color in colors) for name in self._city_names),
+                frozenset(name for name in self._city_names if cities[name].has_research_station),
+                frozenset(game.cured_diseases), frozenset(game.eradicated_diseases),
+                game.outbreaks, game.infection_track,
+                len(game.player_deck), frozenset(game.player_deck),
+                tuple(draw is None for draw in tracker.epidemic_draws) if tracker is not None else None,
+                tuple(layers), frozenset(infection_deck.discards))
+
+
+def epidemic_probability(game):
+    "Return the probability that the next Player Deck card is an Epidemic."
+    deck = game.player_deck
+    epidemics = deck.count("epidemic")
+    if not epidemics:
+        return 0.0
+    tracker = game.epidemic_tracker
+    if tracker is None or tracker.timing.total_cards - tracker.drawn != len(deck):
+        return epidemics / float(len(deck))
+    k = tracker.timing.pile_of(tracker.drawn)
+    if tracker.epidemic_draws[k] is not None:
+        return 0.0
+    start, remaining = tracker._remaining(k)
+    return 1.0 / remaining
+
+
+def player_draw_outcomes(game):
+    """
+    Return the possible next Player Deck draws as (probability, card,
+    bottom infection card index) tuples. The index is only set for
+    Epidemics, which split further over the bottom Infection Deck layer.
+    """
+    deck = game.player_deck
+    p_epidemic = epidemic_probability(game)
+    city_cards = [card for card in deck if card != "epidemic"]
+    outcomes = []
+    if city_cards:
+        p_city = (1 - p_epidemic) / len(city_cards)
+        if p_city > 0:
+            outcomes.extend((p_city, card, None) for card in city_cards)
+    else:
+        p_epidemic = 1.0
+    if p_epidemic > 0:
+        layers = game.infection_deck.known_layers()
+        bottom = layers[0] if layers else 0
+        for i in range(bottom):
+            outcomes.append((p_epidemic / bottom, "epidemic", i))
+    return outcomes
+
+
+def infection_draw_outcomes(game):
+    "Return the possible next Infection Deck draws as (probability, deck index) tuples."
+    deck = game.infection_deck.deck
+    layers = game.infection_deck.known_layers()
+    top = layers[-1]
+    return [(1.0 / top, i) for i in range(len(deck) - top, len(deck))]
+
+
+def harmless_infections(game):
+    """
+    Return True if the infection cards still to be drawn this turn can't
+    cause an outbreak or run out of cubes, whichever cards come up.
+    """
+    to_draw = game.get_infection_rate() - game.infection_turn.infection_cards_drawn
+    deck = game.infection_deck.deck
+    stop = len(deck)
+    reachable = []
+    for size in reversed(game.infection_deck.known_layers()):
+        if to_draw <= 0:
+            break
+        reachable.extend(deck[stop - size:stop])
+        stop -= size
+        to_draw -= size
+
+    cubes_needed = {}
+    for city_name in reachable:
+        city = game.cities[city_name]
+        if city.color in game.eradicated_diseases:
+            continue
+        if city.cubes[city.color] >= 3:
+            return False
+        cubes_needed[city.color] = cubes_needed.get(city.color, 0) + 1
+    to_draw = game.get_infection_rate() - game.infection_turn.infection_cards_drawn
+    return all(game.cube_supply[color] >= min(count, to_draw) for color, count in cubes_needed.items())
+
+
+def draw_player_outcome(game, card, bottom_index):
+    "Put card on top of the Player Deck, and for an Epidemic the chosen card at the bottom of the Infection Deck, then draw."
+    deck = game.player_deck
+    i = len(deck) - 1 - deck[::-1].index(card)
+    deck[i], deck[-1] = deck[-1], deck[i]
+    if bottom_index is not None:
+        infection_deck = game.infection_deck.deck
+        infection_deck[bottom_index], infection_deck[0] = infection_deck[0], infection_deck[bottom_index]
+    game.infection_turn.draw_player_card()
+
+
+def draw_infection_outcome(game, index):
+    "Put the card at index on top of the Infection Deck, then draw it."
+    deck = game.infection_deck.deck
+    deck[index], deck[-1] = deck[-1], deck[index]
+    game.infection_turn.draw_infection_card()
+
+
+class EndgamePolicy(object):
+    """
+    Play fallback's moves until at most max_deck cards are left in the
+    Player Deck, then the EndgameSolver's. solved counts the moves it
+    solved exactly, and bounded those where the solver ran out of budget
+    and the move with the best lower bound was played instead. The solver
+    expands roughly 700 nodes a second on the standard map, so the default
+    budget of 1000 nodes or 1 second caps each endgame decision at about a
+    second. That solves cures a turn or two away; exact solutions of 2 or
+    3 card endgames that hang on the draws take 5 to 10 seconds there, so
+    raise both limits to play those exactly.
+    """
+    version = "endgame-3"
+
+    def __init__(self, seed=None, fallback=None, max_deck=3, max_nodes=1000, max_seconds=1.0):
+        self.fallback = fallback if fallback is not None else RandomPolicy(seed=seed)
+        self.max_deck = max_deck
+        self.solver = EndgameSolver(max_nodes=max_nodes, max_seconds=max_seconds)
+        self.solved = 0
+        self.bounded = 0
+
+    def _solve(self, game):
+        if len(game.player_deck) > self.max_deck:
+            return None
+        result = self.solver.solve(game)
+        if result.action is None:
+            return None
+        if result.exact:
+            self.solved += 1
+        else:
+            self.bounded += 1
+        return result.action
+
+    def choose_action(self, game):
+        action = self._solve(game)
+        if action is None:
+            return self.fallback.choose_action(game)
+        return action
+
+    def choose_discard(self, game, player):
+        if discarding_player(game) is player:
+            card = self._solve(game)
+            if card is not None:
+                return card
+        return self.fallback.choose_discard(game, player)
@@ -0,0 +1,364 @@
+"""
+Gym-style environments for training agents.
+
+PydemicEnv plays one game with a fixed integer action space. It steps the
+game through PlayerTurn, InfectionTurn and next_turn itself, stopping only
+where a player has to choose: an action, or a discard when a hand is over
+the limit. action_mask() marks the legal actions.
+
+env = PydemicEnv(num_players=4, num_epidemic_cards=5, seed=0)
+observation = env.reset()
+observation, reward, done, info = env.step(env.action_mask().nonzero()[0][0])
+
+VectorEnv runs one PydemicEnv per worker process. Observations, rewards,
+done flags and action masks are written straight into shared-memory NumPy
+arrays, so nothing is pickled while stepping, and finished games are reset
+in the worker.
+
+envs = VectorEnv(8, num_players=4, num_epidemic_cards=5, seed=0)
+observations = envs.reset()
+observations, rewards, dones, masks = envs.step(actions)
+envs.close()
+"""
+import ctypes
+import multiprocessing
+from multiprocessing.sharedctypes import RawArray
+from random import Random
+
+import numpy as np
+
+from citymap import citymap
+from pydemic import Game
+from simulation import ACTION, DISCARD, advance, discarding_player, legal_actions
+
+# Action kinds in the order they are laid out in the action space, and
+# what each is indexed by.
+ACTION_KINDS = [("skip", None),
+                ("drive", "city"),
+                ("direct_flight", "city"),
+                ("charter_flight", "city"),
+                ("shuttle_flight", "city"),
+                ("build_research_station", None),
+                ("treat_disease", "color"),
+                ("discover_cure", "color"),
+                ("share_knowledge", "player"),
+                ("discard", "city")]
+
+
+class PydemicEnv(object):
+    """
+    A single game behind an integer action space. Rewards are 1 for a win,
+    -1 for a loss and 0 otherwise. Games longer than max_turns end with
+    reward 0. Illegal actions raise ValueError.
+    """
+    def __init__(self, num_players, num_epidemic_cards, city_map=None, seed=None, max_turns=None):
+        self.num_players = num_players
+        self.num_epidemic_cards = num_epidemic_cards
+        self.city_map = city_map if city_map is not None else citymap
+        self.max_turns = max_turns
+        self.random = Random(seed)
+
+        self.game = Game(num_players, num_epidemic_cards, city_map=self.city_map, verbose=False)
+        self.city_names = self.game.cards.names
+        self.city_index = self.game.cards.index
+        self.colors = self.game.colors
+
+        sizes = {None: 1, "city": len(self.city_names), "color": len(self.colors), "player": num_players}
+        self.offsets = {}
+        self.num_actions = 0
+        for kind, indexed_by in ACTION_KINDS:
+            self.offsets[kind] = self.num_actions
+            self.num_actions += sizes[indexed_by]
+
+        num_cities = len(self.city_names)
+        num_colors = len(self.colors)
+        self.observation_size = (num_cities * num_colors   # cubes
+                                 + num_cities               # research stations
+                                 + 2 * num_players * num_cities  # positions and hands
+                                 + 2 * num_cities           # player and infection discards
+                                 + 3 * num_colors           # cube supply, cured, eradicated
+                                 + num_players              # current player
+                                 + 5)                       # counters
+        self.done = True
+
+    def reset(self, seed=None):
+        "Start a new game and return its first observation."
+        if seed is None:
+            seed = self.random.getrandbits(32)
+        self.game = Game(self.num_players, self.num_epidemic_cards, city_map=self.city_map,
+                         verbose=False, seed=seed)
+        self.game.game_setup()
+        self.done = False
+        self._advance()
+        return self.observation()
+
+    def encode(self, method_name, args):
+        "Return the action number for a (method_name, args) action."
+        offset = self.offsets[method_name]
+        if method_name in ("skip", "build_research_station"):
+            return offset
+        if method_name in ("treat_disease", "discover_cure"):
+            return offset + self.colors.index(args[0])
+        if method_name == "share_knowledge":
+            return offset + self.game.players.index(args[0])
+        return offset + self.city_index[args[0]]
+
+    def decode(self, action):
+        "Return the action kind and its city, color or player index."
+        for kind, indexed_by in reversed(ACTION_KINDS):
+            if action >= self.offsets[kind]:
+                return kind, action - self.offsets[kind]
+        raise ValueError("Unknown action {}".format(action))
+
+    def action(self, action):
+        """
+        Return the (method_name, args) call on game.turn for an action
+        number, or ("discard", (card,)) for a discard.
+        """
+        kind, i = self.decode(action)
+        if kind in ("skip", "build_research_station"):
+            return kind, ()
+        if kind == "treat_disease":
+            return kind, (self.colors[i],)
+        if kind == "discover_cure":
+            color = self.colors[i]
+            return kind, (color, self.game.turn.player.hand.cards_of_color(color)[:5])
+        if kind == "share_knowledge":
+            return kind, (self.game.players[i],)
+        return kind, (self.city_names[i],)
+
+    def action_mask(self, out=None):
+        "Return a boolean array marking the legal actions, filling out if given."
+        if out is None:
+            out = np.zeros(self.num_actions, dtype=np.bool_)
+        else:
+            out[:] = False
+        if self.done:
+            return out
+
+        player = discarding_player(self.game)
+        if player is not None:
+            offset = self.offsets["discard"]
+            for card in player.hand:
+                if card in self.city_index:
+                    out[offset + self.city_index[card]] = True
+            return out
+
+        for method_name, args in legal_actions(self.game):
+            out[self.encode(method_name, args)] = True
+        return out
+
+    def step(self, action):
+        "Play an action and return (observation, reward, done, info)."
+        if self.done:
+            raise ValueError("Game is over. Run env.reset()")
+        if not 0 <= action < self.num_actions or not self.action_mask()[action]:
+            raise ValueError("Action {} is not legal now".format(action))
+
+        method_name, args = self.action(action)
+        if method_name == "discard":
+            discarding_player(self.game).hand.discard(*args)
+        else:
+            getattr(self.game.turn, method_name)(*args)
+
+        self._advance()
+        reward = 0.0
+        if self.game.won:
+            reward = 1.0
+        elif self.game.lost:
+            reward = -1.0
+        info = {"won": self.game.won, "lost": self.game.lost, "turn": self.game.turn_count}
+        return self.observation(), reward, self.done, info
+
+    def _advance(self):
+        "Run the game until a player must choose something or the game ends."
+        phase = advance(self.game)
+        past_max_turns = self.max_turns is not None and self.game.turn_count > self.max_turns
+        self.done = phase not in (DISCARD, ACTION) or past_max_turns
+
+    def observation(self, out=None):
+        "Return the game state as a float32 array, filling out if given."
+        if out is None:
+            out = np.zeros(self.observation_size, dtype=np.float32)
+        else:
+            out[:] = 0
+        game = self.game
+        index = self.city_index
+        num_cities = len(self.city_names)
+        num_colors = len(self.colors)
+
+        cubes = out[:num_cities * num_colors].reshape(num_cities, num_colors)
+        stations = out[num_cities * num_colors:num_cities * (num_colors + 1)]
+        position = num_cities * (num_colors + 1)
+        for city in game.cities.values():
+            i = index[city.name]
+            for c, color in enumerate(self.colors):
+                cubes[i, c] = city.cubes[color]
+            stations[i] = city.has_research_station
+
+        for player in game.players:
+            out[position + index[player.city]] = 1
+            position += num_cities
+            for card in player.hand:
+                if card in index:
+                    out[position + index[card]] = 1
+            position += num_cities
+
+        for pile in (game.player_discard_pile, game.infection_deck.discards):
+            for card in pile:
+                if card in index:
+                    out[position + index[card]] = 1
+            position += num_cities
+
+        for c, color in enumerate(self.colors):
+            out[position + c] = game.cube_supply[color]
+            out[position + num_colors + c] = color in game.cured_diseases
+            out[position + 2 * num_colors + c] = color in game.eradicated_diseases
+        position += 3 * num_colors
+
+        if game.turn is not None:
+            out[position + game.players.index(game.turn.player)] = 1
+        position += self.num_players
+
+        out[position] = game.outbreaks
+        out[position + 1] = game.infection_track
+        out[position + 2] = len(game.player_deck)
+        out[position + 3] = game.turn.actions if game.turn is not None else 0
+        out[position + 4] = game.epidemic_tracker.epidemics_drawn() if game.epidemic_tracker else 0
+        return out
+
+
+# Commands written to VectorEnv's shared command array.
+STEP, RESET, CLOSE = 0, 1, 2
+# How often VectorEnv checks that its workers are alive while waiting for them.
+WORKER_POLL_SECONDS = 1.0
+
+
+def _shared_array(dtype, shape):
+    "Return a shared-memory buffer and a NumPy view on it."
+    buffer = RawArray(ctypes.c_byte, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+    return buffer, _view(buffer, dtype, shape)
+
+
+def _view(buffer, dtype, shape):
+    return np.frombuffer(buffer, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+
+
+def _worker(i, env_kwargs, seed, buffers, shapes, start, finished):
+    "Run one PydemicEnv, reading commands and actions from and writing results to shared memory."
+    env = PydemicEnv(seed=seed, **env_kwargs)
+    arrays = {name: _view(buffers[name], dtype, shape) for name, (dtype, shape) in shapes.items()}
+    observations, rewards, dones, masks = arrays["observations"], arrays["rewards"], arrays["dones"], arrays["masks"]
+    commands, actions, errors = arrays["commands"], arrays["actions"], arrays["errors"]
+
+    while True:
+        start.acquire()
+        command = commands[i]
+        if command == CLOSE:
+            finished.release()
+            return
+        errors[i] = False
+        try:
+            if command == RESET:
+                env.reset()
+                rewards[i] = 0
+                dones[i] = False
+            else:
+                observation, reward, done, info = env.step(int(actions[i]))
+                rewards[i] = reward
+                dones[i] = done
+                if done:
+                    env.reset()
+            env.observation(out=observations[i])
+            env.action_mask(out=masks[i])
+        except Exception:
+            errors[i] = True
+        finally:
+            finished.release()
+
+
+class VectorEnv(object):
+    """
+    num_envs PydemicEnvs, each in its own process. step() writes the
+    actions to shared memory, wakes every worker and waits once for all of
+    them. The arrays it returns are the shared buffers themselves and are
+    overwritten by the next step; copy them to keep them. When a game ends
+    its done flag is set, its reward is the final reward and its
+    observation and mask already belong to the next game. An error in a
+    worker, or a worker dying, raises ValueError in the parent.
+    """
+    def __init__(self, num_envs, num_players, num_epidemic_cards, city_map=None, seed=None, max_turns=None):
+        self.num_envs = num_envs
+        env_kwargs = {"num_players": num_players, "num_epidemic_cards": num_epidemic_cards,
+                      "city_map": city_map, "max_turns": max_turns}
+        layout = PydemicEnv(num_players, num_epidemic_cards, city_map=city_map)
+        self.num_actions = layout.num_actions
+        self.observation_size = layout.observation_size
+
+        shapes = {"observations": (np.float32, (num_envs, self.observation_size)),
+                  "rewards": (np.float32, (num_envs,)),
+                  "dones": (np.bool_, (num_envs,)),
+                  "masks": (np.bool_, (num_envs, self.num_actions)),
+                  "actions": (np.int64, (num_envs,)),
+                  "commands": (np.int8, (num_envs,)),
+                  "errors": (np.bool_, (num_envs,))}
+        self._buffers = {}
+        for name, (dtype, shape) in shapes.items():
+            self._buffers[name], array = _shared_array(dtype, shape)
+            setattr(self, name, array)
+
+        seeds = Random(seed)
+        self._finished = multiprocessing.Semaphore(0)
+        self._starts = [multiprocessing.Semaphore(0) for i in range(num_envs)]
+        self._workers = []
+        for i in range(num_envs):
+            worker = multiprocessing.Process(target=_worker,
+                                             args=(i, env_kwargs, seeds.getrandbits(32), self._buffers,
+                                                   shapes, self._starts[i], self._finished))
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+        self.closed = False
+
+    def _run(self, command):
+        """
+        Send every worker a command and wait for all of them. Raise
+        ValueError if a worker process has died, instead of waiting forever.
+        """
+        self.commands[:] = command
+        for start in self._starts:
+            start.release()
+        for i in range(self.num_envs):
+            while not self._finished.acquire(True, WORKER_POLL_SECONDS):
+                dead = [j for j, worker in enumerate(self._workers) if not worker.is_alive()]
+                if dead:
+                    self.closed = True
+                    for worker in self._workers:
+                        worker.terminate()
+                    if command == CLOSE:
+                        return
+                    raise ValueError("Worker processes {} died".format(dead))
+
+    def reset(self):
+        "Start a new game in every worker and return the observations."
+        self._run(RESET)
+        if self.errors.any():
+            raise ValueError("Reset failed for games {}".format(list(self.errors.nonzero()[0])))
+        return self.observations
+
+    def step(self, actions):
+        "Play one action per game and return (observations, rewards, dones, masks)."
+        self.actions[:] = actions
+        self._run(STEP)
+        if self.errors.any():
+            raise ValueError("Illegal or failed actions for games {}".format(list(self.errors.nonzero()[0])))
+        return self.observations, self.rewards, self.dones, self.masks
+
+    def close(self):
+        "Stop the worker processes."
+        if self.closed:
+            return
+        self._run(CLOSE)
+        for worker in self._workers:
+            worker.join()
+        self.closed = True
@@ -0,0 +1,180 @@
+"""
+Exact timing of Epidemic cards. Game.prepare_player_deck deals the Player
+Deck into num_epidemic_cards sub-piles, shuffles one Epidemic into each and
+stacks them with the largest on top. Each Epidemic is therefore uniformly
+placed within its own sub-pile, and the sub-piles are drawn in order, so
+the distribution of every Epidemic's draw, and its posterior after some
+cards have been drawn, has a closed form.
+
+Draws are numbered from 0 at the top of the prepared deck. Two cards are
+drawn per turn, so draw j happens on turn first_turn + j // 2.
+"""
+from __future__ import division
+
+_timings = {}
+
+
+def epidemic_timing(deck_size, num_epidemic_cards, num_players):
+    """
+    Return the EpidemicTiming for a deck of deck_size city cards. Timings
+    are immutable and cached, so every game with the same settings shares one.
+    """
+    key = (deck_size, num_epidemic_cards, num_players)
+    if key not in _timings:
+        _timings[key] = EpidemicTiming(deck_size, num_epidemic_cards, num_players)
+    return _timings[key]
+
+
+def _turns(start, stop, first_turn):
+    "Return {turn: number of draws} for the draws start..stop-1."
+    turns = {}
+    for j in range(start, stop):
+        turn = first_turn + j // 2
+        turns[turn] = turns.get(turn, 0) + 1
+    return turns
+
+
+class EpidemicTiming(object):
+    """
+    The prior over Epidemic positions for one deck size, epidemic count
+    and number of players. Sub-pile k holds the k-th Epidemic drawn and
+    covers draws pile_starts[k] to pile_starts[k] + pile_lengths[k] - 1.
+    """
+    def __init__(self, deck_size, num_epidemic_cards, num_players, first_turn=1):
+        self.deck_size = deck_size
+        self.num_epidemic_cards = num_epidemic_cards
+        self.num_players = num_players
+        self.first_turn = first_turn
+
+        base, extra = divmod(deck_size, num_epidemic_cards)
+        self.pile_lengths = [base + 2 if k < extra else base + 1 for k in range(num_epidemic_cards)]
+        self.pile_starts = []
+        start = 0
+        for length in self.pile_lengths:
+            self.pile_starts.append(start)
+            start += length
+        self.total_cards = start
+        self._long_piles = extra
+        self._long_length = base + 2
+
+        self._turn_distributions = [self._turn_distribution(k, 0) for k in range(num_epidemic_cards)]
+
+    def pile_of(self, draw):
+        "Return the sub-pile that draw number draw comes from."
+        long_cards = self._long_piles * self._long_length
+        if draw < long_cards:
+            return draw // self._long_length
+        return self._long_piles + (draw - long_cards) // (self._long_length - 1)
+
+    def _turn_distribution(self, k, drawn_from_pile):
+        start = self.pile_starts[k] + drawn_from_pile
+        stop = self.pile_starts[k] + self.pile_lengths[k]
+        remaining = stop - start
+        return {turn: count / remaining
+                for turn, count in _turns(start, stop, self.first_turn).items()}
+
+    def draw_distribution(self, k):
+        "Return {draw: probability} for the k-th Epidemic."
+        start = self.pile_starts[k]
+        length = self.pile_lengths[k]
+        return {j: 1 / length for j in range(start, start + length)}
+
+    def turn_distribution(self, k):
+        "Return {turn: probability} for the turn the k-th Epidemic is drawn on."
+        return dict(self._turn_distributions[k])
+
+    def player_distribution(self, k):
+        "Return {player index: probability} for who draws the k-th Epidemic."
+        players = {}
+        for turn, probability in self._turn_distributions[k].items():
+            player = turn % self.num_players
+            players[player] = players.get(player, 0) + probability
+        return players
+
+
+class EpidemicTracker(object):
+    """
+    The posterior over the positions of the Epidemics not yet drawn, given
+    the cards drawn so far. Game.prepare_player_deck attaches one to the
+    game as game.epidemic_tracker and InfectionTurn.draw_player_card calls
+    observe after every draw, which is constant time.
+    """
+    def __init__(self, timing):
+        self.timing = timing
+        self.drawn = 0
+        self.epidemic_draws = [None] * timing.num_epidemic_cards
+
+    def observe(self, is_epidemic):
+        "Record the next card drawn from the Player Deck."
+        draw = self.drawn
+        if draw >= self.timing.total_cards:
+            raise ValueError("More cards drawn than were prepared")
+        k = self.timing.pile_of(draw)
+        if is_epidemic:
+            if self.epidemic_draws[k] is not None:
+                raise ValueError("Sub-pile {} already had its Epidemic".format(k))
+            self.epidemic_draws[k] = draw
+        elif self.epidemic_draws[k] is None and draw == self._pile_stop(k) - 1:
+            raise ValueError("Sub-pile {} ended without an Epidemic".format(k))
+        self.drawn += 1
+
+    def _pile_stop(self, k):
+        return self.timing.pile_starts[k] + self.timing.pile_lengths[k]
+
+    def _remaining(self, k):
+        "Return the first undrawn draw of sub-pile k and how many remain."
+        start = max(self.timing.pile_starts[k], self.drawn)
+        return start, self._pile_stop(k) - start
+
+    def unresolved_piles(self):
+        """
+        Yield (k, first undrawn draw, cards left) for every sub-pile whose
+        Epidemic is still in the deck.
+        """
+        for k, draw in enumerate(self.epidemic_draws):
+            if draw is None:
+                start, remaining = self._remaining(k)
+                yield k, start, remaining
+
+    def epidemics_drawn(self):
+        return sum(1 for draw in self.epidemic_draws if draw is not None)
+
+    def draw_posterior(self, k):
+        "Return {draw: probability} for the k-th Epidemic given the draws so far."
+        if self.epidemic_draws[k] is not None:
+            return {self.epidemic_draws[k]: 1.0}
+        start, remaining = self._remaining(k)
+        return {j: 1 / remaining for j in range(start, start + remaining)}
+
+    def turn_posterior(self, k):
+        "Return {turn: probability} for the k-th Epidemic given the draws so far."
+        if self.epidemic_draws[k] is not None:
+            return {self.timing.first_turn + self.epidemic_draws[k] // 2: 1.0}
+        if self.drawn <= self.timing.pile_starts[k]:
+            return self.timing.turn_distribution(k)
+        return self.timing._turn_distribution(k, self.drawn - self.timing.pile_starts[k])
+
+    def expected_epidemics(self, draws=2):
+        "Return the expected number of Epidemics in the next draws cards."
+        return sum(probability for probability in self._pile_probabilities(draws))
+
+    def probability_of_epidemic(self, draws=2):
+        "Return the probability of at least one Epidemic in the next draws cards."
+        none = 1.0
+        for probability in self._pile_probabilities(draws):
+            none *= 1 - probability
+        return 1 - none
+
+    def _pile_probabilities(self, draws):
+        "Yield, per sub-pile reached, the chance its Epidemic is in the next draws."
+        stop = min(self.drawn + draws, self.timing.total_cards)
+        if self.drawn >= stop:
+            return
+        first = self.timing.pile_of(self.drawn)
+        last = self.timing.pile_of(stop - 1)
+        for k in range(first, last + 1):
+            if self.epidemic_draws[k] is not None:
+                continue
+            start, remaining = self._remaining(k)
+            covered = min(stop, self._pile_stop(k)) - start
+            yield covered / remaining
@@ -1,16 +1,58 @@
+from cards import CardIndex, CardList
 from citymap import citymap
-from random import shuffle
+from epidemics import EpidemicTracker, epidemic_timing
+import random
+
+
+def map_tables(city_map):
+    """
+    Return the neighbors of every city as {city: tuple} and the CardIndex
+    for city_map. Neither changes during play, so both are built once per
+    map, kept on city_map.graph and shared by every game on it. They are
+    rebuilt if cities or routes were added or removed since.
+    """
+    size = (city_map.number_of_nodes(), city_map.number_of_edges())
+    tables = city_map.graph.get('_tables')
+    if tables is None or tables[0] != size:
+        neighbors = {city_name: tuple(city_map.neighbors(city_name)) for city_name in city_map}
+        tables = (size, neighbors, CardIndex(city_map))
+        city_map.graph['_tables'] = tables
+    return tables[1], tables[2]
+
 
 class Game(object):
     """
     Instantiate this class to play the game.
-    game = Game(num_players=4)
+    game = Game(num_players=4, num_epidemic_cards=5)
     game.game_setup()
     game.turn.treat_disease("blue")
     game.next_turn()
+
+    Pass city_map to play on a map from citymap.load_map or
+    citymap.synthetic_map instead of the standard one, and verbose=False
+    to silence the running commentary during simulations. With
+    bitset_cards=True, hands and the Player Discard Pile also track their
+    city cards as bitsets numbered by game.cards. The game shuffles with its
+    own random number generator, seeded from seed or else from the global one.
+
+    Objects in game.observers hear about every cube placed, outbreak,
+    epidemic and loss through their on_infect(city, color),
+    on_outbreak(city, color), on_epidemic(game, city) and
+    on_lose(game, reason) methods, as stats.GameStats does, and about
+    cubes treated and research stations built or removed through
+    on_treat(city, color, cubes) and on_research_station(city).
     """
 
-    def __init__(self, num_players, num_epidemic_cards):
+    def __init__(self, num_players, num_epidemic_cards, city_map=None, verbose=True, bitset_cards=False,
+                 seed=None):
+        self.citymap = city_map if city_map is not None else citymap
+        self.colors = list(self.citymap.graph['colors'])
+        self.start_city = self.citymap.graph['start']
+        self.neighbors, self.cards = map_tables(self.citymap)
+        self.verbose = verbose
+        self.random = random.Random(seed if seed is not None else random.getrandbits(64))
+        self.bitset_cards = bitset_cards
+
         self.players = [Player(game=self) for i in range(num_players)]
         self.num_epidemic_cards = num_epidemic_cards
 
@@ -18,35 +60,36 @@ class Game(object):
         self.turn = None
         self.infection_turn = None
 
-        self.cities = {city_name: City(game=self, name=city_name, color=citymap.node[city_name]['color'])
-                       for city_name in citymap}
+        self.cities = {city_name: City(game=self, name=city_name, color=self.citymap.node[city_name]['color'])
+                       for city_name in self.citymap}
 
         self.infection_deck = InfectionDeck(game=self)
 
-        self.player_deck = [city_name for city_name in citymap]
-        self.player_discard_pile = []
+        self.player_deck = [city_name for city_name in self.citymap]
+        self.player_discard_pile = CardList(self.cards) if bitset_cards else []
+        self.epidemic_tracker = None  # an EpidemicTracker once the deck is prepared
 
         self.infection_track = 1
         self.outbreaks = 0
-        self.outbreak_chain = []  # used to keep track of chain reaction outbraks
+        self.outbreak_chain = set()  # used to keep track of chain reaction outbraks
 
-        self.cube_supply = {"blue": 24,
-            "yellow": 24,
-            "black": 24,
-            "red": 24}
+        self.initial_cube_supply = dict(self.citymap.graph['cube_supply'])
+        self.cube_supply = dict(self.initial_cube_supply)
 
         self.cured_diseases = []
         self.eradicated_diseases = []
 
-        self.cities['atlanta'].has_research_station = True
+        self.cities[self.start_city].has_research_station = True
         self.research_stations = 1
 
         self.lost = False
+        self.won = False
+        self.observers = []
 
     def game_setup(self):
         "Run the non-deterministic aspects of game setup."
 
-        shuffle(self.player_deck)
+        self.random.shuffle(self.player_deck)
         cards_per_player = 6 - len(self.players)
         for player in self.players:
             player.hand.extend(self.player_deck[-cards_per_player:])
@@ -54,7 +97,7 @@ class Game(object):
 
         self.prepare_player_deck()
 
-        shuffle(self.infection_deck.deck)
+        self.random.shuffle(self.infection_deck.deck)
         for i in range(3):
             city = self.infection_deck.draw()
             city.infect()
@@ -73,8 +116,13 @@ class Game(object):
         self.next_turn()
 
     def prepare_player_deck(self):
-        "Shuffle the Epidemic cards into the Player Deck."
-        shuffle(self.player_deck)
+        """
+        Shuffle the Epidemic cards into the Player Deck, and start tracking
+        when they can come up in self.epidemic_tracker.
+        """
+        timing = epidemic_timing(len(self.player_deck), self.num_epidemic_cards, len(self.players))
+        self.epidemic_tracker = EpidemicTracker(timing)
+        self.random.shuffle(self.player_deck)
         output = []
         sub_piles = [[] for i in range(self.num_epidemic_cards)]
 
@@ -83,7 +131,7 @@ class Game(object):
 
         for sub_pile in sub_piles:
             sub_pile.append("epidemic")
-            shuffle(sub_pile)
+            self.random.shuffle(sub_pile)
             output.extend(sub_pile)
 
         output.reverse()  # so the smallest sub_pile is on the bottom of the stack
@@ -108,7 +156,7 @@ class Game(object):
         next_player = self.players[next_player_index]
         self.turn = PlayerTurn(game=self, player=next_player)
         self.infection_turn = None
-        print "Turn {}. Ready player {}".format(self.turn_count, next_player_index)
+        self.log("Turn {}. Ready player {}".format(self.turn_count, next_player_index))
 
     def epidemic(self):
         "Execute the logic of an Epidemic card."
@@ -117,7 +165,9 @@ class Game(object):
 
         # INFECT
         target_city = self.infection_deck.draw(0)
-        print "Epidemic in {}".format(target_city.name)
+        self.log("Epidemic in {}".format(target_city.name))
+        for observer in self.observers:
+            observer.on_epidemic(self, target_city)
         cubes_present = target_city.cubes[target_city.color]
         if cubes_present == 0:
             for i in range(3):
@@ -127,18 +177,16 @@ class Game(object):
                 target_city.infect()  # this will cause an outbreak.
 
         # INTENSIFY
-        shuffle(self.infection_deck.discards)
-        self.infection_deck.deck.extend(self.infection_deck.discards)
-        del self.infection_deck.discards[:]
+        self.infection_deck.intensify()
 
     def check_eradication(self, color):
         "Determine if a disease has been eradicated"
         if color not in self.cured_diseases:
             return False
-        if self.cube_supply[color] < 24:
+        if self.cube_supply[color] < self.initial_cube_supply[color]:
             return False
         self.eradicated_diseases.append(color)
-        print "{} has been eradicated.".format(color)
+        self.log("{} has been eradicated.".format(color))
 
     def remove_research_station(self, city_name):
         "Remove a research station from the board. This is not an action."
@@ -147,19 +195,88 @@ class Game(object):
             raise ValueError("Can't remove a research station from a city without one.")
         city.has_research_station = False
         self.research_stations -= 1
+        for observer in self.observers:
+            observer.on_research_station(city)
 
     def lose(self, reason):
         "Declare game loss for the specified reason."
+        if not self.lost:
+            for observer in self.observers:
+                observer.on_lose(self, reason)
         self.lost = True
         self.turn = None
-        print "You have lost: {}".format(reason)
+        self.log("You have lost: {}".format(reason))
+
+    def copy(self):
+        """
+        Return an independent copy of the game for searching ahead. The copy
+        shares the map data, which never changes during play, and has no
+        observers.
+        """
+        game = shallow_copy(self)
+        game.random = random.Random.__new__(random.Random)  # skip seeding from the OS
+        game.random.setstate(self.random.getstate())
+
+        game.players = []
+        for player in self.players:
+            copied_player = shallow_copy(player)
+            copied_player.game = game
+            copied_player.hand = player.hand.copy(copied_player)
+            game.players.append(copied_player)
+
+        game.cities = {}
+        for city_name, city in self.cities.items():
+            copied_city = shallow_copy(city)
+            copied_city.game = game
+            copied_city.cubes = dict(city.cubes)
+            game.cities[city_name] = copied_city
+
+        game.infection_deck = shallow_copy(self.infection_deck)
+        game.infection_deck.game = game
+        game.infection_deck.deck = list(self.infection_deck.deck)
+        game.infection_deck.discards = list(self.infection_deck.discards)
+        game.infection_deck.layers = list(self.infection_deck.layers)
+
+        game.player_deck = list(self.player_deck)
+        game.player_discard_pile = self.player_discard_pile[:]
+        if isinstance(self.player_discard_pile, CardList):
+            game.player_discard_pile = CardList(self.cards, self.player_discard_pile)
+        game.outbreak_chain = set(self.outbreak_chain)
+        game.observers = []
+        game.cube_supply = dict(self.cube_supply)
+        game.cured_diseases = list(self.cured_diseases)
+        game.eradicated_diseases = list(self.eradicated_diseases)
+        if self.epidemic_tracker is not None:
+            game.epidemic_tracker = shallow_copy(self.epidemic_tracker)
+            game.epidemic_tracker.epidemic_draws = list(self.epidemic_tracker.epidemic_draws)
+
+        for name in ("turn", "infection_turn"):
+            turn = getattr(self, name)
+            if turn is not None:
+                turn = shallow_copy(turn)
+                turn.game = game
+                turn.player = game.players[self.players.index(turn.player)]
+            setattr(game, name, turn)
+        return game
+
+    def log(self, message):
+        "Print a message about the state of play unless the game is silenced."
+        if self.verbose:
+            print message
+
+def shallow_copy(obj):
+    "Return a new object of the same class sharing obj's attribute values."
+    copied = obj.__class__.__new__(obj.__class__)
+    copied.__dict__.update(obj.__dict__)
+    return copied
+
 
 class Player(object):
     "Represents a player."
     def __init__(self, game):
         self.game = game
-        self.hand = PlayerHand(player=self)
-        self.city = "atlanta"  # all players start here.
+        self.hand = BitsetHand(player=self) if game.bitset_cards else PlayerHand(player=self)
+        self.city = game.start_city  # all players start here.
 
     # TODO: def play_event_card(self, card)
 
@@ -174,6 +291,33 @@ class PlayerHand(list):
         self.remove(card)
         self.player.game.player_discard_pile.append(card)
 
+    def copy(self, player):
+        "Return a copy of the hand for a copy of its player."
+        hand = self.__class__.__new__(self.__class__)
+        list.extend(hand, self)
+        hand.__dict__.update(self.__dict__)
+        hand.player = player
+        return hand
+
+    def count_color(self, color):
+        "Return the number of city cards of color."
+        return len(self.cards_of_color(color))
+
+    def cards_of_color(self, color):
+        "Return the city cards of color."
+        cities = self.player.game.cities
+        return [card for card in self if card in cities and cities[card].color == color]
+
+
+class BitsetHand(CardList, PlayerHand):
+    """
+    A PlayerHand that keeps its city cards as a bitset, so membership
+    tests and color counts are constant time.
+    """
+    def __init__(self, player):
+        PlayerHand.__init__(self, player)
+        CardList.__init__(self, player.game.cards)
+
 class PlayerTurn(object):
     """
     Manages single player's turn of actions. Player actions are methods
@@ -225,7 +369,7 @@ class PlayerTurn(object):
     @action
     def drive(self, target_city):
         "Drive or ferry to a neighboring city."
-        if target_city not in citymap.neighbors(self.player.city):
+        if target_city not in self.game.neighbors[self.player.city]:
             raise ValueError("Target city not adjacent to current city")
         self.player.city = target_city
 
@@ -271,18 +415,21 @@ class PlayerTurn(object):
 
         current_city.has_research_station = True
         self.game.research_stations += 1
+        for observer in self.game.observers:
+            observer.on_research_station(current_city)
 
     @action
     def treat_disease(self, color):
         "Treat a specific disease in your current city."
         city = self.game.cities[self.player.city]
         if color in self.game.cured_diseases:
-            while city.cubes[color] > 0:
-                city.cubes[color] -= 1
-                self.game.cube_supply[color] += 1
+            treated = city.cubes[color]
         else:
-            city.cubes[color] -= 1
-            self.game.cube_supply[color] += 1
+            treated = 1
+        city.cubes[color] -= treated
+        self.game.cube_supply[color] += treated
+        for observer in self.game.observers:
+            observer.on_treat(city, color, treated)
 
         self.game.check_eradication(color)
 
@@ -325,8 +472,9 @@ class PlayerTurn(object):
             self.player.hand.discard(city)
 
         self.game.cured_diseases.append(color)
-        if len(self.game.cured_diseases) == 4:
-            print "All diseases cured: you win!"
+        if len(self.game.cured_diseases) == len(self.game.colors):
+            self.game.won = True
+            self.game.log("All diseases cured: you win!")
         self.game.check_eradication(color)
 
 
@@ -350,6 +498,8 @@ class InfectionTurn(object):
         if len(self.player.hand) > 7:
             raise ValueError("Player {} must discard to 7 cards before continuing".format(i))
 
+        if self.game.epidemic_tracker is not None:
+            self.game.epidemic_tracker.observe(self.game.player_deck[-1] == "epidemic")
         card = self.game.player_deck.pop()
         self.player_cards_drawn += 1
         if card == "epidemic":
@@ -365,7 +515,7 @@ class InfectionTurn(object):
             raise ValueError("Drawn enough infection cards for this turn.")
 
         target_city = self.game.infection_deck.draw()
-        print target_city
+        self.game.log(target_city)
         self.infection_cards_drawn += 1
         target_city.infect()
 
@@ -384,11 +534,16 @@ class InfectionTurn(object):
 class InfectionDeck(object):
     """
     Manages the Infection Deck and Infection Discard Pile.
+    Every Epidemic puts a shuffled layer of known cards on top of the deck.
+    layers holds the sizes of those layers from the bottom of the deck up,
+    starting with the original deck, so players know which cards are in
+    each layer but not their order.
     """
     def __init__(self, game):
         self.game = game
-        self.deck = [city_name for city_name in citymap]
+        self.deck = [city_name for city_name in game.citymap]
         self.discards = []
+        self.layers = [len(self.deck)]
 
     def draw(self, index=None):
         """
@@ -397,15 +552,47 @@ class InfectionDeck(object):
         specific card in the deck. This method also resets the
         outbreak_chain everytime a card is drawn.
         """
-        del self.game.outbreak_chain[:]
+        self.game.outbreak_chain.clear()
         if index is not None:
             target_city_name = self.deck.pop(index)
+            self._remove_from_layer(index % (len(self.deck) + 1))
         else:
             target_city_name = self.deck.pop()
+            self._remove_from_layer(len(self.deck))
         self.discards.append(target_city_name)
         target_city = self.game.cities[target_city_name]
         return target_city
 
+    def intensify(self):
+        "Shuffle the Infection Discard Pile and put it on top of the deck."
+        self.game.random.shuffle(self.discards)
+        self.deck.extend(self.discards)
+        if self.discards:
+            self.layers.append(len(self.discards))
+        del self.discards[:]
+
+    def known_layers(self):
+        """
+        Return the layer sizes from the bottom up, or a single layer for the
+        whole deck if the deck was changed behind the layers' back.
+        """
+        if sum(self.layers) != len(self.deck):
+            return [len(self.deck)] if self.deck else []
+        return list(self.layers)
+
+    def _remove_from_layer(self, index):
+        "Shrink the layer that held the card at index."
+        if sum(self.layers) != len(self.deck) + 1:
+            return
+        for i, size in enumerate(self.layers):
+            if index < size:
+                if size == 1:
+                    del self.layers[i]
+                else:
+                    self.layers[i] -= 1
+                return
+            index -= size
+
 class City(object):
     """
     The City class
@@ -418,10 +605,7 @@ class City(object):
         self.game = game
         self.name = name
         self.color = color
-        self.cubes = {"blue": 0,
-            "yellow": 0,
-            "black": 0,
-            "red": 0}
+        self.cubes = {color: 0 for color in game.colors}
         self.has_research_station = False
 
     def __repr__(self):
@@ -441,6 +625,8 @@ class City(object):
                 return None
             self.cubes[color] += 1
             self.game.cube_supply[color] -= 1
+            for observer in self.game.observers:
+                observer.on_infect(self, color)
 
         else:
             self.outbreak(color)
@@ -451,12 +637,14 @@ class City(object):
         Only called by .infect().
         """
         self.game.outbreaks += 1
+        for observer in self.game.observers:
+            observer.on_outbreak(self, color)
 
         if self.game.outbreaks > 7:
             self.game.lose("Reached eigth outbreak.")
             return None
 
-        self.game.outbreak_chain.append((self.name, color))
-        for city_name in citymap.neighbors(self.name):
+        self.game.outbreak_chain.add((self.name, color))
+        for city_name in self.game.neighbors[self.name]:
             if (city_name, color) not in self.game.outbreak_chain:
                 self.game.cities[city_name].infect(color)
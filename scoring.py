@@ -0,0 +1,265 @@
+"""
+Score every legal action of the current player in one pass of array
+operations, for heuristic and rollout policies.
+
+ActionScorer keeps the map as NumPy arrays (adjacency and driving distance
+matrices, city colors). The board, a city x color cube matrix and a
+research station mask, is read once per game into BoardArrays, a game
+observer that keeps it up to date as cubes are placed and treated and
+stations built or removed. Each legal action gets a row of features, and
+its score is that row times a weight vector:
+
+    cubes             cubes at the destination, or cubes a treatment removes
+    outbreak_risk     colors with 3 cubes at the destination, or treated at 3
+    nearby_cubes      cubes in the cities next to the destination
+    station_progress  drives saved on the way to a research station, while
+                      holding the cards for a cure
+    card_spent        cards of its color still held with a card played
+    cure              1 for discover_cure
+    build             drives from the nearest research station, when building one
+    share             how many more cards of its color the receiver holds
+                      than the giver, after a share_knowledge
+
+scorer = ActionScorer(game)
+actions, scores = scorer.score(game)
+
+ScoringPolicy plays the best scoring action, breaking ties at random. The
+distance matrix has a row per city, so use it on maps of up to a few
+thousand cities.
+"""
+from random import Random
+
+import numpy as np
+
+from cureplan import breadth_first
+
+FEATURES = ["cubes", "outbreak_risk", "nearby_cubes", "station_progress", "card_spent", "cure", "build", "share"]
+DEFAULT_WEIGHTS = {"cubes": 1.0,
+                   "outbreak_risk": 6.0,
+                   "nearby_cubes": 0.2,
+                   "station_progress": 3.0,
+                   "card_spent": -0.5,
+                   "cure": 100.0,
+                   "build": 0.3,
+                   "share": 1.0}
+CARDS_TO_CURE = 5
+
+
+def weight_vector(weights=None):
+    """
+    Return weights as an array in FEATURES order. weights may be None for
+    the defaults, a dict overriding some of them, or a full sequence.
+    """
+    if weights is None or isinstance(weights, dict):
+        named = dict(DEFAULT_WEIGHTS)
+        named.update(weights or {})
+        unknown = set(named) - set(FEATURES)
+        if unknown:
+            raise ValueError("Unknown features {}".format(sorted(unknown)))
+        return np.array([named[name] for name in FEATURES], dtype=np.float64)
+    vector = np.asarray(weights, dtype=np.float64)
+    if vector.shape != (len(FEATURES),):
+        raise ValueError("Need {} weights, got shape {}".format(len(FEATURES), vector.shape))
+    return vector
+
+
+class BoardArrays(object):
+    """
+    The cubes of one game as a city x color matrix, and its research
+    stations as a mask, with cities numbered as game.cards numbers their
+    cards. Updated through the observer hooks of Game, so changes made to
+    the board by other means aren't seen. Use board_arrays to get them.
+    """
+    def __init__(self, game):
+        names = game.cards.names
+        self.index = game.cards.index
+        self.colors = list(game.colors)
+        self.color_index = {color: c for c, color in enumerate(self.colors)}
+        cities = game.cities
+        self.cubes = np.array([[cities[name].cubes[color] for color in self.colors] for name in names],
+                              dtype=np.float64)
+        self.stations = np.array([cities[name].has_research_station for name in names])
+
+    def on_infect(self, city, color):
+        self.cubes[self.index[city.name], self.color_index[color]] += 1
+
+    def on_treat(self, city, color, cubes):
+        self.cubes[self.index[city.name], self.color_index[color]] -= cubes
+
+    def on_research_station(self, city):
+        self.stations[self.index[city.name]] = city.has_research_station
+
+    def on_outbreak(self, city, color):
+        pass
+
+    def on_epidemic(self, game, city):
+        pass
+
+    def on_lose(self, game, reason):
+        pass
+
+
+def board_arrays(game):
+    "Return the BoardArrays observing game, reading the board and adding them to game.observers if none are."
+    for observer in game.observers:
+        if isinstance(observer, BoardArrays):
+            return observer
+    board = BoardArrays(game)
+    game.observers.append(board)
+    return board
+
+
+class ActionScorer(object):
+    """
+    Map arrays for one city map. Cities are numbered as game.cards numbers
+    their cards. Charter flights are left out unless charter is set, as
+    in legal_actions.
+    """
+    def __init__(self, game, weights=None, charter=False):
+        self.city_map = game.citymap
+        self.weights = weight_vector(weights)
+        self.charter = charter
+        self.names = list(game.cards.names)
+        self.index = dict(game.cards.index)
+        self.colors = list(game.colors)
+        num_cities = len(self.names)
+
+        self.adjacency = np.zeros((num_cities, num_cities), dtype=np.float64)
+        # Cities in another part of a disconnected map are num_cities drives away.
+        self.distances = np.full((num_cities, num_cities), num_cities, dtype=np.int32)
+        for i, name in enumerate(self.names):
+            for neighbor in game.neighbors[name]:
+                self.adjacency[i, self.index[neighbor]] = 1
+            for other, distance in breadth_first(game.neighbors, [name]).items():
+                self.distances[i, self.index[other]] = distance
+        self.city_colors = np.array([self.colors.index(color) for color in game.cards.color_of])
+
+    def cube_matrix(self, game):
+        "Return the city x color matrix of cubes on the board. It is kept up to date, so don't change it."
+        return board_arrays(game).cubes
+
+    def features(self, game):
+        "Return the legal actions of the current player and their feature matrix."
+        turn = game.turn
+        player = turn.player
+        hand = player.hand
+        names = self.names
+        here = self.index[player.city]
+        num_colors = len(self.colors)
+
+        board = board_arrays(game)
+        cubes = board.cubes
+        total = cubes.sum(axis=1)
+        hot = (cubes >= 3).sum(axis=1)
+        stations = board.stations
+        if stations.any():
+            station_distance = self.distances[:, stations].min(axis=1)
+        else:
+            station_distance = np.zeros(len(names), dtype=np.int32)
+        held = np.array([hand.count_color(color) for color in self.colors], dtype=np.float64)
+        uncured = np.array([color not in game.cured_diseases for color in self.colors])
+        ready = float(((held >= CARDS_TO_CURE) & uncured).any())
+        cards = np.array([self.index[card] for card in set(hand) if card in self.index], dtype=np.int64)
+        holds_here = player.city in hand
+
+        actions = []
+        rows = []
+
+        def moves(method_name, destinations, spent):
+            "Add a movement action to every destination, playing cards of the colors in spent."
+            if not len(destinations):
+                return
+            block = np.zeros((len(destinations), len(FEATURES)))
+            block[:, 0] = total[destinations]
+            block[:, 1] = hot[destinations]
+            block[:, 2] = self.adjacency[destinations].dot(total)  # only the rows needed, not the whole map
+            block[:, 3] = ready * (station_distance[here] - station_distance[destinations])
+            block[:, 4] = spent
+            actions.extend((method_name, (names[i],)) for i in destinations)
+            rows.append(block)
+
+        moves("drive", self.adjacency[here].nonzero()[0], 0)
+        flights = cards[cards != here]
+        moves("direct_flight", flights, held[self.city_colors[flights]] - 1)
+        if self.charter and holds_here:
+            everywhere = np.arange(len(names))
+            moves("charter_flight", everywhere[everywhere != here], held[self.city_colors[here]] - 1)
+        if stations[here]:
+            others = stations.nonzero()[0]
+            moves("shuttle_flight", others[others != here], 0)
+
+        single = []
+        if not stations[here] and holds_here and game.research_stations < 6:
+            row = np.zeros(len(FEATURES))
+            row[4] = held[self.city_colors[here]] - 1
+            row[6] = station_distance[here]
+            single.append((("build_research_station", ()), row))
+
+        for c in range(num_colors):
+            if cubes[here, c] > 0:
+                row = np.zeros(len(FEATURES))
+                row[0] = cubes[here, c] if not uncured[c] else 1
+                row[1] = cubes[here, c] >= 3
+                single.append((("treat_disease", (self.colors[c],)), row))
+
+        card_color = self.city_colors[here]
+        for other in game.players:
+            if other is player or other.city != player.city:
+                continue
+            if holds_here:
+                giver, receiver = player, other
+            elif player.city in other.hand:
+                giver, receiver = other, player
+            else:
+                continue
+            color = self.colors[card_color]
+            row = np.zeros(len(FEATURES))
+            row[7] = receiver.hand.count_color(color) + 1 - (giver.hand.count_color(color) - 1)
+            single.append((("share_knowledge", (other,)), row))
+
+        if stations[here]:
+            for c in range(num_colors):
+                if uncured[c] and held[c] >= CARDS_TO_CURE:
+                    row = np.zeros(len(FEATURES))
+                    row[5] = 1
+                    color = self.colors[c]
+                    single.append((("discover_cure", (color, hand.cards_of_color(color)[:CARDS_TO_CURE])), row))
+
+        single.append((("skip", ()), np.zeros(len(FEATURES))))
+        for action, row in single:
+            actions.append(action)
+        rows.append(np.array([row for action, row in single]))
+        return actions, np.concatenate(rows)
+
+    def score(self, game, weights=None):
+        "Return the legal actions of the current player and their scores."
+        actions, features = self.features(game)
+        return actions, features.dot(self.weights if weights is None else weight_vector(weights))
+
+
+class ScoringPolicy(object):
+    """
+    Play the action an ActionScorer scores highest, picking at random
+    among ties, and discard from the color with the fewest cards in hand.
+    """
+    version = "scoring-1"
+
+    def __init__(self, seed=None, weights=None):
+        self.random = Random(seed)
+        self.weights = weights
+        self.scorer = None
+
+    def choose_action(self, game):
+        if self.scorer is None or self.scorer.city_map is not game.citymap:
+            self.scorer = ActionScorer(game, self.weights)
+        actions, scores = self.scorer.score(game)
+        best = (scores >= scores.max() - 1e-9).nonzero()[0]
+        return actions[best[self.random.randrange(len(best))]]
+
+    def choose_discard(self, game, player):
+        counts = {card: player.hand.count_color(game.cards.card_colors[card])
+                  for card in player.hand if card in game.cards.card_colors}
+        if not counts:
+            return self.random.choice(player.hand)
+        fewest = min(counts.values())
+        return self.random.choice(sorted(card for card, count in counts.items() if count == fewest))
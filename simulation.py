@@ -0,0 +1,253 @@
+"""
+Play whole games automatically. A policy picks each action and each
+discard; play_game drives a Game through its PlayerTurn and InfectionTurn
+steps until it is won or lost.
+
+game = Game(num_players=4, num_epidemic_cards=5, verbose=False)
+play_game(game, RandomPolicy(seed=0))
+
+Pass a doom.DoomDetector to stop as soon as the outcome is certain.
+"""
+from random import Random
+from pydemic import Game
+
+
+def legal_actions(game, charter=True):
+    """
+    Return the legal actions for the current player as (method_name, args)
+    tuples, to be called on game.turn. Charter flights can go anywhere, so
+    on large maps pass charter=False to leave them out.
+    """
+    turn = game.turn
+    player = turn.player
+    here = game.cities[player.city]
+    hand = player.hand
+    actions = [("skip", ())]
+
+    for city_name in game.neighbors[player.city]:
+        actions.append(("drive", (city_name,)))
+
+    for card in set(hand):
+        if card != player.city and card in game.cities:
+            actions.append(("direct_flight", (card,)))
+
+    if charter and player.city in hand:
+        for city_name in game.cities:
+            if city_name != player.city:
+                actions.append(("charter_flight", (city_name,)))
+
+    if here.has_research_station:
+        for city in game.cities.values():
+            if city.has_research_station and city is not here:
+                actions.append(("shuttle_flight", (city.name,)))
+    elif player.city in hand and game.research_stations < 6:
+        actions.append(("build_research_station", ()))
+
+    for color in game.colors:
+        if here.cubes[color] > 0:
+            actions.append(("treat_disease", (color,)))
+
+    for other in game.players:
+        if other is not player and other.city == player.city:
+            if player.city in hand or player.city in other.hand:
+                actions.append(("share_knowledge", (other,)))
+
+    if here.has_research_station:
+        for color in game.colors:
+            if color in game.cured_diseases:
+                continue
+            if hand.count_color(color) >= 5:
+                actions.append(("discover_cure", (color, hand.cards_of_color(color)[:5])))
+
+    return actions
+
+
+class RandomPolicy(object):
+    """
+    Pick uniformly among legal actions, leaving out charter flights.
+    Bump version whenever the choices it makes change, so cached results
+    for the old behavior aren't reused.
+    """
+    version = "random-1"
+
+    def __init__(self, seed=None):
+        self.random = Random(seed)
+
+    def choose_action(self, game):
+        return self.random.choice(legal_actions(game, charter=False))
+
+    def choose_discard(self, game, player):
+        return self.random.choice(player.hand)
+
+
+def game_over(game):
+    "Return True once the game has been won or lost."
+    return game.won or game.lost
+
+
+def discard_down(game, policy):
+    "Have every player discard to 7 cards."
+    for player in game.players:
+        while len(player.hand) > 7:
+            player.hand.discard(policy.choose_discard(game, player))
+
+
+# What advance stopped for.
+DISCARD, ACTION, PLAYER_DRAW, INFECTION_DRAW, OVER = "discard", "action", "player_draw", "infection_draw", "over"
+
+
+def discarding_player(game):
+    "Return the first player over the hand limit, or None."
+    for player in game.players:
+        if len(player.hand) > 7:
+            return player
+    return None
+
+
+def advance(game, stop_at_draws=False):
+    """
+    Step the game until a player must choose a discard or an action, or
+    the game is over, and return which. Card draws are made along the way
+    unless stop_at_draws is set, in which case advance stops before each
+    draw and returns PLAYER_DRAW or INFECTION_DRAW.
+    """
+    while not game_over(game):
+        if discarding_player(game) is not None:
+            return DISCARD
+        turn = game.turn
+        if not turn.ended:
+            if turn.actions > 0:
+                return ACTION
+            turn.end()
+            continue
+
+        infection_turn = game.infection_turn
+        if infection_turn.player_cards_drawn < 2:
+            if stop_at_draws:
+                return PLAYER_DRAW
+            infection_turn.draw_player_card()
+        elif infection_turn.infection_cards_drawn < game.get_infection_rate():
+            if stop_at_draws:
+                return INFECTION_DRAW
+            infection_turn.draw_infection_card()
+        else:
+            infection_turn.end()
+            game.next_turn()
+    return OVER
+
+
+def play_turn(game, policy, doom=None):
+    """
+    Play the current player's actions, card draws and infections. With a
+    DoomDetector, stop early if it proves the outcome. Return the proved
+    outcome, or None.
+    """
+    if doom is not None and doom.check(game):
+        return doom.outcome
+
+    turn = game.turn
+    while turn.actions and not game_over(game):
+        discard_down(game, policy)
+        method_name, args = policy.choose_action(game)
+        getattr(turn, method_name)(*args)
+    if game_over(game):
+        return None
+
+    discard_down(game, policy)
+    turn.end()
+    infection_turn = game.infection_turn
+    if game.lost:
+        return None
+
+    while infection_turn.player_cards_drawn < 2:
+        infection_turn.draw_player_card()
+        if game.lost:
+            return None
+        discard_down(game, policy)
+
+    if doom is not None and doom.check(game):
+        return doom.outcome
+
+    while infection_turn.infection_cards_drawn < game.get_infection_rate():
+        infection_turn.draw_infection_card()
+        if game.lost:
+            return None
+
+    infection_turn.end()
+    game.next_turn()
+    return None
+
+
+def play_game(game, policy, max_turns=None, doom=None):
+    """
+    Play a game to the end, running game_setup first if it has not been run.
+    Stop early after max_turns turns, or when doom proves the outcome.
+    Return the game.
+    """
+    if doom is not None:
+        doom.reset()
+    if game.turn_count == 0:
+        game.game_setup()
+    while not game_over(game):
+        if max_turns is not None and game.turn_count > max_turns:
+            break
+        if play_turn(game, policy, doom) is not None:
+            break
+    return game
+
+
+def outcome(game, doom=None):
+    """Return "won", "lost" or None for a game played by play_game."""
+    if game.won:
+        return "won"
+    if game.lost:
+        return "lost"
+    if doom is not None:
+        return doom.outcome
+    return None
+
+
+def new_results():
+    "Return empty totals for record_game."
+    return {"games": 0, "won": 0, "lost": 0, "unfinished": 0, "pruned": 0, "turns": 0}
+
+
+def record_game(results, game, doom=None):
+    """
+    Add a game played by play_game to the totals. Games stopped because
+    doom proved their outcome count as won or lost and also as pruned.
+    """
+    result = outcome(game, doom)
+    results["games"] += 1
+    results["turns"] += game.turn_count
+    results[result or "unfinished"] += 1
+    if not game_over(game) and result is not None:
+        results["pruned"] += 1
+    results["pruned_fraction"] = results["pruned"] / float(results["games"])
+    return results
+
+
+def merge_results(results, other):
+    "Add the totals in other to results and return results."
+    for name in ("games", "won", "lost", "unfinished", "pruned", "turns"):
+        results[name] += other[name]
+    if results["games"]:
+        results["pruned_fraction"] = results["pruned"] / float(results["games"])
+    return results
+
+
+def run_simulations(num_games, num_players, num_epidemic_cards, policy, city_map=None, doom=None, stats=None):
+    """
+    Play num_games games with one policy and return their totals. Pass a
+    stats.GameStats as stats to have it watch every game.
+    """
+    results = new_results()
+    for i in range(num_games):
+        game = Game(num_players, num_epidemic_cards, city_map=city_map, verbose=False)
+        if stats is not None:
+            stats.watch(game)
+        play_game(game, policy, doom=doom)
+        record_game(results, game, doom)
+        if stats is not None:
+            stats.finish(game, doom)
+    return results
@@ -0,0 +1,301 @@
+"""
+Streaming statistics over many games, without keeping the games.
+
+GameStats is a game observer (see Game.observers). Each cube placed,
+outbreak, epidemic and loss adds one to a fixed-size counter, so the cost
+per event is constant however many games are played:
+
+    cubes        cubes placed, per city and color
+    outbreaks    outbreaks, per city and color
+    epidemics    epidemics, per city
+    epidemic_turns  a Histogram of the turns epidemics happened on
+    loss_reasons    {reason: games lost that way}, with games a
+                    DoomDetector stopped counted as DOOMED
+
+and finish(game) adds the game's length and outbreak count to
+QuantileSketches once it is over.
+
+stats = GameStats(citymap)
+game = Game(4, 5, verbose=False)
+stats.watch(game)
+play_game(game, RandomPolicy())
+stats.finish(game)
+stats.heatmap("cubes")["atlanta"]["blue"], stats.turns.quantile(0.99)
+
+Stats from separate processes are combined with merge, and to_dict and
+from_dict turn them into JSON-ready dicts and back.
+"""
+import math
+
+from simulation import outcome
+
+# The loss reason of games stopped early because a DoomDetector proved them lost.
+DOOMED = "doomed"
+
+
+class Histogram(object):
+    """
+    Counts of integer values from 0 to size - 1. Larger values are counted
+    in the last bin and negative ones in the first.
+    """
+    def __init__(self, size=128):
+        if size < 1:
+            raise ValueError("Need at least one bin")
+        self.counts = [0] * size
+
+    def add(self, value, count=1):
+        "Count value count times."
+        self.counts[min(max(int(value), 0), len(self.counts) - 1)] += count
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def quantile(self, q):
+        "Return the smallest bin holding at least a fraction q of the values, or None if empty."
+        total = self.count
+        if total == 0:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        for value, count in enumerate(self.counts):
+            seen += count
+            if seen > rank:
+                return value
+        return len(self.counts) - 1
+
+    def merge(self, other):
+        "Add the counts of other, a Histogram of the same size, and return self."
+        if len(other.counts) != len(self.counts):
+            raise ValueError("Can't merge histograms of {} and {} bins".format(len(self.counts), len(other.counts)))
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        return self
+
+    def to_dict(self):
+        return {"counts": list(self.counts)}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls(len(data["counts"]))
+        histogram.counts = list(data["counts"])
+        return histogram
+
+
+class QuantileSketch(object):
+    """
+    Quantiles of nonnegative values to within a relative error of
+    relative_accuracy, in the manner of DDSketch: each value is counted in a
+    bucket of logarithmic width, so the memory used grows with the log of
+    the largest value, and never past max_bins buckets. When there would
+    be more, the lowest buckets are folded together and lose accuracy first.
+    """
+    def __init__(self, relative_accuracy=0.01, max_bins=2048):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins = {}  # bucket key -> count
+        self.zeros = 0
+        self.count = 0
+        self.min = None
+        self.max = None
+
+    def add(self, value, count=1):
+        "Count value count times."
+        if value < 0:
+            raise ValueError("QuantileSketch only holds nonnegative values, got {}".format(value))
+        self.count += count
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        if value == 0:
+            self.zeros += count
+            return
+        key = int(math.ceil(math.log(value) / self._log_gamma))
+        self.bins[key] = self.bins.get(key, 0) + count
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def _collapse(self):
+        "Fold the lowest buckets into the next one up until there are max_bins."
+        keys = sorted(self.bins)
+        excess = len(keys) - self.max_bins
+        folded = sum(self.bins.pop(key) for key in keys[:excess])
+        self.bins[keys[excess]] += folded
+
+    def quantile(self, q):
+        "Return an estimate of the q quantile, or None if no values were added."
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if seen > rank:
+            return 0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                value = 2 * self.gamma ** key / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def merge(self, other):
+        "Add the values counted by other, a sketch of the same accuracy, and return self."
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Can't merge sketches of relative accuracy {} and {}".format(
+                self.relative_accuracy, other.relative_accuracy))
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        while len(self.bins) > self.max_bins:
+            self._collapse()
+        self.zeros += other.zeros
+        self.count += other.count
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+        return self
+
+    def to_dict(self):
+        return {"relative_accuracy": self.relative_accuracy,
+                "max_bins": self.max_bins,
+                "bins": {str(key): count for key, count in self.bins.items()},
+                "zeros": self.zeros,
+                "count": self.count,
+                "min": self.min,
+                "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["relative_accuracy"], data["max_bins"])
+        sketch.bins = {int(key): count for key, count in data["bins"].items()}
+        sketch.zeros = data["zeros"]
+        sketch.count = data["count"]
+        sketch.min = data["min"]
+        sketch.max = data["max"]
+        return sketch
+
+
+class GameStats(object):
+    """
+    Counters for every game watched on one city map. See the module
+    docstring. Counters are flat lists indexed by city, and by city and
+    color, with cities in sorted order so every process numbers them alike.
+    """
+    def __init__(self, city_map, max_turns=128):
+        self.cities = sorted(city_map.nodes())
+        self.colors = list(city_map.graph["colors"])
+        self.index = {name: i for i, name in enumerate(self.cities)}
+        self.color_index = {color: i for i, color in enumerate(self.colors)}
+        size = len(self.cities) * len(self.colors)
+        self.cubes = [0] * size
+        self.outbreaks = [0] * size
+        self.epidemics = [0] * len(self.cities)
+        self.epidemic_turns = Histogram(max_turns)
+        self.loss_reasons = {}
+        self.games = 0
+        self.won = 0
+        self.turns = QuantileSketch()
+        self.outbreaks_per_game = QuantileSketch()
+
+    def watch(self, game):
+        "Start observing game, and return it."
+        game.observers.append(self)
+        return game
+
+    def finish(self, game, doom=None):
+        """
+        Count a game that is over, and stop observing it. Pass the
+        DoomDetector play_game was given, if any, so that games it stopped
+        count as won, or as lost for DOOMED.
+        """
+        result = outcome(game, doom)
+        self.games += 1
+        self.won += result == "won"
+        if result == "lost" and not game.lost:
+            self.loss_reasons[DOOMED] = self.loss_reasons.get(DOOMED, 0) + 1
+        self.turns.add(game.turn_count)
+        self.outbreaks_per_game.add(game.outbreaks)
+        if self in game.observers:
+            game.observers.remove(self)
+
+    def on_infect(self, city, color):
+        self.cubes[self.index[city.name] * len(self.colors) + self.color_index[color]] += 1
+
+    def on_outbreak(self, city, color):
+        self.outbreaks[self.index[city.name] * len(self.colors) + self.color_index[color]] += 1
+
+    def on_epidemic(self, game, city):
+        self.epidemics[self.index[city.name]] += 1
+        self.epidemic_turns.add(game.turn_count)
+
+    def on_lose(self, game, reason):
+        self.loss_reasons[reason] = self.loss_reasons.get(reason, 0) + 1
+
+    def on_treat(self, city, color, cubes):
+        pass
+
+    def on_research_station(self, city):
+        pass
+
+    def heatmap(self, name):
+        "Return the cubes or outbreaks counter as {city: {color: count}}."
+        counts = getattr(self, name)
+        num_colors = len(self.colors)
+        return {city: dict(zip(self.colors, counts[i * num_colors:(i + 1) * num_colors]))
+                for i, city in enumerate(self.cities)}
+
+    def top(self, name, n=10):
+        "Return the n (count, city) pairs with the most cubes, outbreaks or epidemics."
+        counts = getattr(self, name)
+        if len(counts) != len(self.cities):
+            num_colors = len(self.colors)
+            counts = [sum(counts[i * num_colors:(i + 1) * num_colors]) for i in range(len(self.cities))]
+        return sorted(zip(counts, self.cities), key=lambda pair: (-pair[0], pair[1]))[:n]
+
+    def merge(self, other):
+        "Add the counts of other, GameStats for the same map, and return self."
+        if other.cities != self.cities or other.colors != self.colors:
+            raise ValueError("Can't merge stats for different maps")
+        for name in ("cubes", "outbreaks", "epidemics"):
+            setattr(self, name, [a + b for a, b in zip(getattr(self, name), getattr(other, name))])
+        self.epidemic_turns.merge(other.epidemic_turns)
+        for reason, count in other.loss_reasons.items():
+            self.loss_reasons[reason] = self.loss_reasons.get(reason, 0) + count
+        self.games += other.games
+        self.won += other.won
+        self.turns.merge(other.turns)
+        self.outbreaks_per_game.merge(other.outbreaks_per_game)
+        return self
+
+    def to_dict(self):
+        return {"cities": list(self.cities),
+                "colors": list(self.colors),
+                "cubes": list(self.cubes),
+                "outbreaks": list(self.outbreaks),
+                "epidemics": list(self.epidemics),
+                "epidemic_turns": self.epidemic_turns.to_dict(),
+                "loss_reasons": dict(self.loss_reasons),
+                "games": self.games,
+                "won": self.won,
+                "turns": self.turns.to_dict(),
+                "outbreaks_per_game": self.outbreaks_per_game.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls.__new__(cls)
+        stats.cities = list(data["cities"])
+        stats.colors = list(data["colors"])
+        stats.index = {name: i for i, name in enumerate(stats.cities)}
+        stats.color_index = {color: i for i, color in enumerate(stats.colors)}
+        for name in ("cubes", "outbreaks", "epidemics"):
+            setattr(stats, name, list(data[name]))
+        stats.epidemic_turns = Histogram.from_dict(data["epidemic_turns"])
+        stats.loss_reasons = dict(data["loss_reasons"])
+        stats.games = data["games"]
+        stats.won = data["won"]
+        stats.turns = QuantileSketch.from_dict(data["turns"])
+        stats.outbreaks_per_game = QuantileSketch.from_dict(data["outbreaks_per_game"])
+        return stats
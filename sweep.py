@@ -0,0 +1,139 @@
+"""
+Map win rates across game configurations and policies, spending games
+where they are still needed.
+
+Each cell of the grid is a (num_players, num_epidemic_cards, policy) triple.
+Every round, each unresolved cell is given the number of games its current
+win rate estimate says it still needs to bring the half-width of its 95%
+Wilson interval under precision, at least batch_size and at most what is
+left of max_games. Cells whose interval is already narrow enough stop
+getting games, so clear-cut cells cost a few dozen games while close ones
+get thousands. Batches run on a process pool, and the results table is
+printed as batches finish.
+
+results = run_sweep(players=(2, 3, 4), epidemics=(4, 5, 6), policies=(RandomPolicy,))
+"""
+from __future__ import division
+
+import math
+import multiprocessing
+import sys
+
+from campaign import play_seeds
+from simulation import RandomPolicy, merge_results, new_results
+
+Z_95 = 1.96
+
+
+def wilson_interval(wins, games, z=Z_95):
+    "Return the (low, high) Wilson score interval for a win rate."
+    if games == 0:
+        return 0.0, 1.0
+    p = wins / games
+    denominator = 1 + z * z / games
+    center = (p + z * z / (2 * games)) / denominator
+    half_width = z * math.sqrt(p * (1 - p) / games + z * z / (4 * games * games)) / denominator
+    return max(0.0, center - half_width), min(1.0, center + half_width)
+
+
+class Cell(object):
+    "One configuration of the sweep and the totals of the games played for it."
+    def __init__(self, num_players, num_epidemic_cards, policy_class):
+        self.num_players = num_players
+        self.num_epidemic_cards = num_epidemic_cards
+        self.policy_class = policy_class
+        self.results = new_results()
+        self.next_seed = 0
+        self.running = 0
+
+    @property
+    def name(self):
+        return (self.num_players, self.num_epidemic_cards, self.policy_class.version)
+
+    def interval(self):
+        return wilson_interval(self.results["won"], self.results["games"])
+
+    def half_width(self):
+        low, high = self.interval()
+        return (high - low) / 2
+
+    def resolved(self, precision, max_games):
+        games = self.results["games"]
+        return games >= max_games or (games > 0 and self.half_width() <= precision)
+
+    def games_needed(self, precision, batch_size, max_games):
+        """
+        Return how many more games to give this cell, from the normal
+        approximation n = z^2 p (1 - p) / precision^2 at the current win rate.
+        """
+        games = self.results["games"]
+        left = max_games - games - self.running
+        if left <= 0:
+            return 0
+        if games == 0:
+            return min(batch_size, left)
+        low, high = self.interval()
+        p = max(low, min(high, 0.5))  # the worst case the interval still allows
+        needed = int(math.ceil(Z_95 * Z_95 * p * (1 - p) / (precision * precision))) - games - self.running
+        return max(0, min(left, max(batch_size, needed)))
+
+
+def _play_batch(task):
+    "Process pool entry point: play one batch of games for a cell."
+    cell_index, num_players, num_epidemic_cards, policy_class, start, stop, use_doom = task
+    return cell_index, stop - start, play_seeds(num_players, num_epidemic_cards, policy_class, start, stop, use_doom)
+
+
+def format_table(cells):
+    "Return the current results as a text table."
+    lines = ["{:>7} {:>9} {:>12} {:>7} {:>8} {:>17}".format(
+        "players", "epidemics", "policy", "games", "win rate", "95% interval")]
+    for cell in cells:
+        games = cell.results["games"]
+        win_rate = cell.results["won"] / games if games else 0.0
+        low, high = cell.interval()
+        lines.append("{:>7} {:>9} {:>12} {:>7} {:>8.3f}    [{:.3f}, {:.3f}]".format(
+            cell.num_players, cell.num_epidemic_cards, cell.policy_class.version,
+            games, win_rate, low, high))
+    return "\n".join(lines)
+
+
+def run_sweep(players=(2, 3, 4), epidemics=(4, 5, 6), policies=(RandomPolicy,), precision=0.05,
+              batch_size=50, max_games=10000, processes=None, use_doom=False, out=sys.stdout):
+    """
+    Estimate the win rate of every cell of the grid to within precision and
+    return {(num_players, num_epidemic_cards, policy version): totals}.
+    Batches are at most batch_size games long so the table can be printed
+    to out as they finish; pass out=None to keep quiet.
+    """
+    cells = [Cell(num_players, num_epidemic_cards, policy_class)
+             for policy_class in policies for num_players in players for num_epidemic_cards in epidemics]
+    pool = multiprocessing.Pool(processes)
+    try:
+        while True:
+            tasks = []
+            for i, cell in enumerate(cells):
+                if cell.resolved(precision, max_games):
+                    continue
+                needed = cell.games_needed(precision, batch_size, max_games)
+                while needed > 0:
+                    size = min(batch_size, needed)
+                    tasks.append((i, cell.num_players, cell.num_epidemic_cards, cell.policy_class,
+                                  cell.next_seed, cell.next_seed + size, use_doom))
+                    cell.next_seed += size
+                    cell.running += size
+                    needed -= size
+            if not tasks:
+                break
+
+            for i, size, results in pool.imap_unordered(_play_batch, tasks):
+                cells[i].running -= size
+                merge_results(cells[i].results, results)
+                if out is not None:
+                    out.write(format_table(cells) + "\n\n")
+                    out.flush()
+    finally:
+        pool.terminate()
+        pool.join()
+
+    return {cell.name: cell.results for cell in cells}
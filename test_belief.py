@@ -0,0 +1,78 @@
+import copy
+import pydemic
+from belief import BeliefSampler
+from collections import Counter
+from random import Random
+from unittest import TestCase
+
+
+class TestBeliefSampler(TestCase):
+    def setUp(self):
+        self.game = pydemic.Game(num_players=4, num_epidemic_cards=5, verbose=False)
+        self.game.game_setup()
+        self.game.turn.end()
+        self.game.infection_turn.draw_player_card()
+        self.game.infection_turn.draw_player_card()
+        self.sampler = BeliefSampler(self.game)
+
+    def test_player_deck_cards_preserved(self):
+        for determinization in self.sampler.samples(50, seed=0):
+            self.assertEqual(Counter(determinization.player_draws), Counter(self.game.player_deck))
+
+    def test_epidemics_stay_in_their_sub_piles(self):
+        tracker = self.game.epidemic_tracker
+        piles = [k for k, start, remaining in tracker.unresolved_piles()]
+        for determinization in self.sampler.samples(50, seed=1):
+            draws = [tracker.drawn + slot for slot, card in enumerate(determinization.player_draws)
+                     if card == "epidemic"]
+            self.assertEqual([tracker.timing.pile_of(draw) for draw in draws], piles)
+
+    def test_infection_layers_preserved(self):
+        self.game.epidemic()
+        layer_size = self.game.infection_deck.layers[-1]
+        top_layer = Counter(self.game.infection_deck.deck[-layer_size:])
+        for determinization in BeliefSampler(self.game).samples(20, seed=2):
+            self.assertEqual(Counter(determinization.infection_draws[:layer_size]), top_layer)
+            self.assertEqual(Counter(determinization.infection_draws), Counter(self.game.infection_deck.deck))
+
+    def test_horizon(self):
+        determinization = self.sampler.sample(Random(3), horizon=4)
+        self.assertEqual(len(determinization.player_draws), 4)
+        self.assertEqual(len(determinization.infection_draws), 4)
+        self.assertFalse(determinization.complete)
+        with self.assertRaises(ValueError):
+            determinization.apply(self.game)
+
+    def test_apply(self):
+        determinization = self.sampler.samples(1, seed=4)[0]
+        game = copy.deepcopy(self.game)
+        determinization.apply(game)
+        self.assertEqual(game.player_deck[::-1], determinization.player_draws)
+        self.assertEqual(game.infection_deck.deck[-1], determinization.infection_draws[0])
+
+    def test_reproducible(self):
+        first = [d.player_draws for d in self.sampler.samples(5, seed=5)]
+        second = [d.player_draws for d in self.sampler.samples(5, seed=5)]
+        self.assertEqual(first, second)
+
+
+class TestInfectionDeckLayers(TestCase):
+    def setUp(self):
+        self.game = pydemic.Game(num_players=4, num_epidemic_cards=5, verbose=False)
+
+    def test_layers_follow_draws(self):
+        deck = self.game.infection_deck
+        for i in range(5):
+            deck.draw()
+        self.game.epidemic()
+        self.assertEqual(deck.layers, [42, 6])
+        deck.draw()
+        self.assertEqual(deck.layers, [42, 5])
+        deck.draw(0)
+        self.assertEqual(deck.layers, [41, 5])
+        self.assertEqual(deck.known_layers(), [41, 5])
+
+    def test_edited_deck_is_one_layer(self):
+        deck = self.game.infection_deck
+        deck.deck.append("moscow")
+        self.assertEqual(deck.known_layers(), [49])
@@ -0,0 +1,129 @@
+import threading
+import numpy as np
+from broker import BrokeredPolicy, InferenceBroker, LinearModel, play_concurrently
+from environment import PydemicEnv
+from simulation import discarding_player
+from unittest import TestCase
+
+
+def double(batch):
+    return batch * 2
+
+
+class TestInferenceBroker(TestCase):
+    def tearDown(self):
+        self.broker.close()
+
+    def test_results_go_to_their_threads(self):
+        self.broker = InferenceBroker(double, max_batch=8)
+        results = {}
+
+        def ask(i):
+            results[i] = [self.broker(np.array([i, -i])) for repeat in range(20)]
+
+        threads = [threading.Thread(target=ask, args=(i,)) for i in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for i in range(16):
+            for output in results[i]:
+                np.testing.assert_array_equal(output, [2 * i, -2 * i])
+        self.assertEqual(self.broker.requests, 16 * 20)
+        self.assertLessEqual(max(size for size, count in enumerate(self.broker.batch_sizes.counts) if count), 8)
+
+    def test_batches_by_size(self):
+        self.broker = InferenceBroker(double, max_batch=4, max_wait=10.0)
+        requests = [self.broker.submit(np.array([i])) for i in range(8)]
+        self.assertEqual([int(request.result()[0]) for request in requests], [2 * i for i in range(8)])
+        self.assertEqual(self.broker.batch_sizes.counts[4], 2)
+
+    def test_batches_by_deadline(self):
+        self.broker = InferenceBroker(double, max_batch=100, max_wait=0.01)
+        requests = [self.broker.submit(np.array([i])) for i in range(3)]
+        self.assertEqual([int(request.result()[0]) for request in requests], [0, 2, 4])
+        self.assertEqual(self.broker.batches, 1)
+        self.assertGreaterEqual(self.broker.latencies.max, 0.009)
+
+    def test_errors_reach_every_request(self):
+        def fail(batch):
+            raise KeyError("model")
+        self.broker = InferenceBroker(fail, max_wait=0.01)
+        requests = [self.broker.submit(np.zeros(2)) for i in range(3)]
+        for request in requests:
+            with self.assertRaises(KeyError):
+                request.result()
+
+    def test_closed_broker_rejects_requests(self):
+        self.broker = InferenceBroker(double)
+        self.broker.close()
+        with self.assertRaises(ValueError):
+            self.broker.submit(np.zeros(2))
+
+    def test_close_while_submitting(self):
+        self.broker = InferenceBroker(double, max_batch=4)
+        outcomes = []
+        start = threading.Event()
+
+        def submit():
+            start.wait()
+            for i in range(200):
+                try:
+                    request = self.broker.submit(np.array([i]))
+                except ValueError:
+                    outcomes.append("rejected")
+                    return
+                request.result()  # never waits forever on a request queued after close
+                outcomes.append("served")
+
+        threads = [threading.Thread(target=submit) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        start.set()
+        self.broker.close()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(outcomes.count("served"), self.broker.requests)
+
+    def test_report(self):
+        self.broker = InferenceBroker(double, max_wait=0.0)
+        for i in range(5):
+            self.broker(np.array([i]))
+        report = self.broker.report()
+        self.assertEqual(report["requests"], 5)
+        self.assertGreater(report["requests_per_second"], 0)
+        self.assertLessEqual(report["p50_ms"], report["p99_ms"])
+
+
+class TestPlayConcurrently(TestCase):
+    def test_batching_does_not_change_play(self):
+        env = PydemicEnv(2, 4)
+        totals = []
+        for max_batch in (1, 8):
+            broker = InferenceBroker(LinearModel.random(env.observation_size, env.num_actions, seed=0),
+                                     max_batch=max_batch)
+            totals.append(play_concurrently(broker, 6, 4, 2, 4))
+            broker.close()
+        self.assertEqual(totals[0], totals[1])
+        self.assertEqual(totals[0]["games"], 6)
+
+    def test_policy_plays_legal_actions(self):
+        env = PydemicEnv(4, 5)
+        broker = InferenceBroker(LinearModel.random(env.observation_size, env.num_actions, seed=1), max_wait=0.0)
+        policy = BrokeredPolicy(broker)
+        env.reset(seed=3)
+        try:
+            for step in range(40):
+                if env.done:
+                    break
+                player = discarding_player(env.game)
+                if player is not None:
+                    card = policy.choose_discard(env.game, player)
+                    self.assertIn(card, player.hand)
+                    env.step(env.offsets["discard"] + env.city_index[card])
+                else:
+                    action = env.encode(*policy.choose_action(env.game))
+                    self.assertTrue(env.action_mask()[action])
+                    env.step(action)
+        finally:
+            broker.close()
@@ -0,0 +1,106 @@
+import os
+import shutil
+import tempfile
+from campaign import ResultCache, campaign_key, key_name, read_json, run_campaign, write_json_atomic
+from simulation import RandomPolicy
+from unittest import TestCase
+
+
+class CrashingPolicy(RandomPolicy):
+    "Plays like RandomPolicy but dies on seed 12, as if the run were killed."
+    def __init__(self, seed=None):
+        if seed == 12:
+            raise KeyboardInterrupt
+        RandomPolicy.__init__(self, seed)
+
+
+class CampaignTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+class TestRunCampaign(CampaignTestCase):
+    def test_reproducible(self):
+        first = run_campaign(4, 5, (0, 10), os.path.join(self.directory, "a"))
+        second = run_campaign(4, 5, (0, 10), os.path.join(self.directory, "b"))
+        self.assertEqual(first, second)
+        self.assertEqual(first["games"], 10)
+
+    def test_resume_after_crash(self):
+        expected = run_campaign(4, 5, (0, 20), os.path.join(self.directory, "uninterrupted"))
+        directory = os.path.join(self.directory, "crashed")
+        with self.assertRaises(KeyboardInterrupt):
+            run_campaign(4, 5, (0, 20), directory, policy_class=CrashingPolicy, checkpoint_every=5)
+        checkpoints = os.listdir(directory)
+        self.assertEqual(len(checkpoints), 1)
+        self.assertEqual(read_json(os.path.join(directory, checkpoints[0]))["next_seed"], 10)
+
+        results = run_campaign(4, 5, (0, 20), directory, checkpoint_every=5)
+        self.assertEqual(results, expected)
+        self.assertEqual(os.listdir(directory), [])
+
+    def test_corrupt_checkpoint_starts_over(self):
+        expected = run_campaign(4, 5, (0, 10), os.path.join(self.directory, "clean"))
+        key = campaign_key(4, 5, RandomPolicy.version, (0, 10), False)
+        with open(os.path.join(self.directory, "checkpoint-" + key_name(key)), "w") as f:
+            f.write('{"next_seed": 5, "res')
+        self.assertEqual(run_campaign(4, 5, (0, 10), self.directory), expected)
+
+    def test_cached_results(self):
+        cache = ResultCache(os.path.join(self.directory, "cache"))
+        results = run_campaign(4, 5, (0, 5), self.directory, cache=cache)
+        # a crashing policy with the same version is never run on a cache hit
+        self.assertEqual(run_campaign(4, 5, (0, 5), self.directory, policy_class=CrashingPolicy, cache=cache),
+                         results)
+
+
+class TestResultCache(CampaignTestCase):
+    def test_get_and_put(self):
+        cache = ResultCache(self.directory)
+        key = campaign_key(4, 5, "random-1", (0, 10), False)
+        self.assertIsNone(cache.get(key))
+        cache.put(key, {"games": 10})
+        self.assertEqual(cache.get(key), {"games": 10})
+        self.assertIsNone(cache.get(campaign_key(4, 5, "random-2", (0, 10), False)))
+
+    def test_evicts_least_recently_used(self):
+        cache = ResultCache(self.directory, max_bytes=10 ** 6)
+        keys = [campaign_key(4, 5, "random-1", (i, i + 1), False) for i in range(3)]
+        for i, key in enumerate(keys):
+            cache.put(key, {"games": i})
+            os.utime(cache._path(key), (i, i))
+        entry_size = os.path.getsize(cache._path(keys[0]))
+        cache.get(keys[0])
+        cache.max_bytes = 2 * entry_size
+        cache.evict()
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertEqual(cache.get(keys[0]), {"games": 0})
+        self.assertEqual(cache.get(keys[2]), {"games": 2})
+
+    def test_eviction_keeps_other_files(self):
+        checkpoint_path = os.path.join(self.directory, "checkpoint-0123.json")
+        write_json_atomic(checkpoint_path, {"next_seed": 5})
+        os.utime(checkpoint_path, (0, 0))
+        cache = ResultCache(self.directory, max_bytes=0)
+        cache.put(campaign_key(4, 5, "random-1", (0, 1), False), {"games": 1})
+        self.assertEqual(os.listdir(self.directory), ["checkpoint-0123.json"])
+
+    def test_corrupt_entry_is_a_miss(self):
+        cache = ResultCache(self.directory)
+        key = campaign_key(4, 5, "random-1", (0, 10), False)
+        cache.put(key, {"games": 10})
+        with open(cache._path(key), "w") as f:
+            f.write('{"key": ')
+        self.assertIsNone(cache.get(key))
+
+
+class TestWriteJsonAtomic(CampaignTestCase):
+    def test_replaces_file(self):
+        path = os.path.join(self.directory, "data.json")
+        write_json_atomic(path, {"a": 1})
+        write_json_atomic(path, {"a": 2})
+        self.assertEqual(read_json(path), {"a": 2})
+        self.assertEqual(os.listdir(self.directory), ["data.json"])
@@ -0,0 +1,61 @@
+from cards import CardIndex, CardList, iter_bits, popcount
+from citymap import citymap
+from unittest import TestCase
+
+
+class TestBits(TestCase):
+    def test_popcount(self):
+        self.assertEqual(popcount(0), 0)
+        self.assertEqual(popcount(0b101101), 4)
+        self.assertEqual(popcount(1 << 100 | 1), 2)
+
+    def test_iter_bits(self):
+        self.assertEqual(list(iter_bits(0b100101)), [0, 2, 5])
+
+
+class TestCardIndex(TestCase):
+    def setUp(self):
+        self.cards = CardIndex(citymap)
+
+    def test_every_city_has_a_card(self):
+        self.assertEqual(len(self.cards), 48)
+        self.assertEqual(sorted(self.cards.names), sorted(citymap.nodes()))
+
+    def test_color_masks(self):
+        for color in ["blue", "yellow", "black", "red"]:
+            self.assertEqual(popcount(self.cards.color_masks[color]), 12)
+        self.assertEqual(self.cards.count(self.cards.all_cards, "red"), 12)
+
+    def test_mask_round_trip(self):
+        mask = self.cards.mask(["atlanta", "moscow", "epidemic"])
+        self.assertEqual(sorted(self.cards.cards(mask)), ["atlanta", "moscow"])
+        self.assertEqual(self.cards.count(mask, "blue"), 1)
+
+
+class TestCardList(TestCase):
+    def setUp(self):
+        self.cards = CardIndex(citymap)
+        self.hand = CardList(self.cards, ["atlanta", "chicago"])
+
+    def test_membership(self):
+        self.assertIn("atlanta", self.hand)
+        self.assertNotIn("moscow", self.hand)
+        self.hand.append("epidemic")
+        self.assertIn("epidemic", self.hand)
+
+    def test_mutations_keep_mask(self):
+        self.hand.append("moscow")
+        self.hand.remove("atlanta")
+        self.hand.extend(["tokyo", "lima"])
+        self.hand.pop(0)
+        del self.hand[-1]
+        self.hand.insert(0, "miami")
+        self.assertEqual(self.hand.mask, self.cards.mask(self.hand))
+        self.assertEqual(sorted(self.hand), ["miami", "moscow", "tokyo"])
+        del self.hand[:]
+        self.assertEqual(self.hand.mask, 0)
+
+    def test_colors(self):
+        self.hand.extend(["moscow", "montreal"])
+        self.assertEqual(self.hand.count_color("blue"), 3)
+        self.assertEqual(sorted(self.hand.cards_of_color("black")), ["moscow"])
@@ -0,0 +1,94 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from StringIO import StringIO
+from unittest import TestCase
+
+import cli
+
+CLI_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cli.py")
+# Seconds cli.py --help may take beyond starting a bare interpreter.
+STARTUP_MARGIN_SECONDS = 0.25
+
+
+def run(*argv):
+    "Return the JSON rows cli.main writes for argv."
+    out = StringIO()
+    cli.main(list(argv), out=out)
+    return json.loads(out.getvalue())
+
+
+def startup_seconds(arguments, runs=3):
+    "Return the fastest wall-clock time of running python with arguments."
+    from timeit import default_timer
+    fastest = None
+    with open(os.devnull, "w") as devnull:
+        for i in range(runs):
+            start = default_timer()
+            subprocess.check_call([sys.executable] + arguments, stdout=devnull)
+            seconds = default_timer() - start
+            fastest = seconds if fastest is None else min(fastest, seconds)
+    return fastest
+
+
+class TestStartup(TestCase):
+    def test_no_heavy_imports(self):
+        script = ("import sys; import cli; cli.build_parser().parse_args(['analyse', '--games', '1']); "
+                  "print(sorted(set(sys.modules) & {'networkx', 'numpy', 'citymap', 'pydemic', 'simulation'}))")
+        output = subprocess.check_output([sys.executable, "-c", script], cwd=os.path.dirname(CLI_PATH))
+        self.assertEqual(output.strip(), "[]")
+
+    def test_help_starts_within_budget(self):
+        # about 0.07 s against 0.05 s for a bare interpreter on a quiet machine
+        bare = startup_seconds(["-c", "pass"])
+        self.assertLess(startup_seconds([CLI_PATH, "--help"]), bare + STARTUP_MARGIN_SECONDS)
+
+    def test_runs_from_any_directory(self):
+        directory = tempfile.mkdtemp()
+        try:
+            output = subprocess.check_output([sys.executable, CLI_PATH, "simulate", "--games", "2"], cwd=directory)
+        finally:
+            shutil.rmtree(directory)
+        self.assertEqual(json.loads(output)[0]["games"], 2)
+
+
+class TestSubcommands(TestCase):
+    def test_simulate(self):
+        totals = run("simulate", "--games", "4", "--seed", "10")[0]
+        self.assertEqual(totals["games"], 4)
+        self.assertEqual(totals["won"] + totals["lost"] + totals["unfinished"], 4)
+
+    def test_simulate_csv(self):
+        out = StringIO()
+        cli.main(["simulate", "--games", "3", "--per-game", "--format", "csv"], out=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], "seed,outcome,reason,turns,outbreaks,cured,epidemics")
+        self.assertEqual([line.split(",")[0] for line in lines[1:]], ["0", "1", "2"])
+
+    def test_replay_matches_simulate(self):
+        game = run("simulate", "--games", "1", "--seed", "7", "--per-game")[0]
+        turns = run("replay", "--seed", "7")
+        self.assertEqual(len(turns), game["turns"])
+        self.assertEqual(turns[-1]["outcome"], game["outcome"])
+        self.assertEqual(turns[-1]["reason"], game["reason"])
+
+    def test_benchmark(self):
+        rates = run("benchmark", "--games", "2")[0]
+        self.assertEqual(rates["games"], 2)
+        self.assertGreater(rates["games_per_second"], 0)
+
+    def test_analyse_merges_stats_files(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "stats.json")
+            played = run("analyse", "--games", "5", "--stats-out", path)
+            merged = run("analyse", path, path)
+        finally:
+            shutil.rmtree(directory)
+        self.assertEqual(played[0], {"metric": "games", "key": "", "value": 5})
+        self.assertEqual(merged[0], {"metric": "games", "key": "", "value": 10})
+        reasons = sum(row["value"] for row in merged if row["metric"] == "loss_reason")
+        self.assertEqual(reasons, 2 * sum(row["value"] for row in played if row["metric"] == "loss_reason"))
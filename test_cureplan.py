@@ -0,0 +1,90 @@
+import pydemic
+from cureplan import CureOracle
+from unittest import TestCase
+
+BLUE = ["san_francisco", "chicago", "montreal", "new_york", "washington"]
+
+
+class TestCureOracle(TestCase):
+    def setUp(self):
+        self.game = pydemic.Game(num_players=2, num_epidemic_cards=5, verbose=False)
+        self.player = self.game.players[0]
+        self.other = self.game.players[1]
+        self.game.turn = pydemic.PlayerTurn(self.game, self.player)
+        self.oracle = CureOracle(self.game)
+
+    def test_cure_at_research_station(self):
+        self.player.hand.extend(BLUE)
+        plan = self.oracle.plan("blue")
+        self.assertEqual((plan.player, plan.actions, plan.turns), (0, 1, 0))
+        self.assertEqual(sorted(plan.cards), sorted(BLUE))
+
+    def test_travel_to_research_station(self):
+        self.player.hand.extend(BLUE)
+        self.player.city = "montreal"  # chicago, then atlanta
+        self.assertEqual(self.oracle.actions_to_cure("blue"), 3)
+
+    def test_share_knowledge(self):
+        self.player.hand.extend(BLUE[:4])
+        self.other.hand.append("atlanta")
+        plan = self.oracle.plan("blue")
+        self.assertEqual((plan.player, plan.actions, plan.turns), (0, 2, 0))
+        self.assertIn("atlanta", plan.cards)
+
+    def test_meeting_in_the_card_city(self):
+        self.player.hand.extend(BLUE[:4])
+        self.other.hand.append("london")
+        # both drive the 3 cities to london, share there, and player 0
+        # drives back to cure
+        plan = self.oracle.plan("blue")
+        self.assertEqual(plan.actions, 3 + 3 + 1 + 3 + 1)
+        self.assertEqual(plan.player, 0)
+
+    def test_turns_for_other_players(self):
+        self.other.hand.extend(BLUE)
+        self.assertEqual(self.oracle.turns_to_cure("blue"), 1)
+        self.game.turn.ended = True
+        self.player.hand.extend(BLUE)
+        self.other.hand.remove("chicago")
+        self.assertEqual(self.oracle.turns_to_cure("blue"), 2)
+
+    def test_turns_belong_to_the_plan(self):
+        self.game.turn.ended = True
+        self.player.hand.extend(BLUE)  # 1 action, on player 0's next turn
+        self.other.hand.extend(["london", "madrid", "paris", "essen", "milan"])
+        self.other.city = "london"  # 4 actions, but on the very next turn
+        plan = self.oracle.plan("blue")
+        self.assertEqual((plan.player, plan.actions, plan.turns), (0, 1, 2))
+        fastest = self.oracle.fastest_plan("blue")
+        self.assertEqual((fastest.player, fastest.actions, fastest.turns), (1, 4, 1))
+        self.assertEqual(self.oracle.turns_to_cure("blue"), 1)
+
+    def test_not_enough_cards(self):
+        self.player.hand.extend(BLUE[:3])
+        self.other.hand.append("atlanta")
+        self.assertIsNone(self.oracle.plan("blue"))
+        self.assertIsNone(self.oracle.actions_to_cure("blue"))
+
+    def test_cured_color(self):
+        self.player.hand.extend(BLUE)
+        self.game.cured_diseases.append("blue")
+        self.assertNotIn("blue", self.oracle.plans())
+
+    def test_shuttle_flights(self):
+        self.oracle.plan("blue")
+        self.assertEqual(self.oracle.distance("atlanta", "karachi"), 7)
+        self.game.cities["riyadh"].has_research_station = True
+        self.oracle.plan("blue")
+        self.assertEqual(self.oracle.distance("atlanta", "karachi"), 2)
+
+    def test_replans_only_when_needed(self):
+        self.player.hand.extend(BLUE)
+        self.oracle.plans()
+        searches = self.oracle.searches
+        self.oracle.plans()
+        self.player.hand.append("tokyo")
+        self.oracle.plan("blue")
+        self.assertEqual(self.oracle.searches, searches)
+        self.game.turn.drive("chicago")
+        self.assertEqual(self.oracle.actions_to_cure("blue"), 2)
+        self.assertGreater(self.oracle.searches, searches)
@@ -0,0 +1,147 @@
+import pydemic
+from doom import DoomDetector, forced_infection_loss, forced_win, last_turn_loss, too_few_cards
+from simulation import RandomPolicy, run_simulations
+from unittest import TestCase
+
+
+class TestTooFewCards(TestCase):
+    def setUp(self):
+        self.game = pydemic.Game(num_players=4, num_epidemic_cards=5, verbose=False)
+
+    def test_full_deck_is_not_doomed(self):
+        self.assertEqual(too_few_cards(self.game), (None, None))
+
+    def test_discarded_color(self):
+        for card in ["san_francisco", "chicago", "montreal", "new_york", "washington", "atlanta", "london", "madrid"]:
+            self.game.player_deck.remove(card)
+            self.game.player_discard_pile.append(card)
+        outcome, reason = too_few_cards(self.game)
+        self.assertEqual(outcome, "lost")
+        self.assertIn("blue", reason)
+
+    def test_held_cards_count(self):
+        held = ["san_francisco", "chicago", "montreal"]
+        for card in ["new_york", "washington", "atlanta", "london", "madrid", "paris", "essen"] + held:
+            self.game.player_deck.remove(card)
+        self.game.players[2].hand.extend(held)
+        self.assertEqual(too_few_cards(self.game), (None, None))
+
+    def test_total_cards_needed(self):
+        del self.game.player_deck[:]
+        self.game.player_deck.extend(["atlanta", "chicago", "moscow", "tokyo", "lima"])
+        self.assertEqual(too_few_cards(self.game)[0], "lost")
+
+
+class TestForcedInfectionLoss(TestCase):
+    def setUp(self):
+        self.game = pydemic.Game(num_players=4, num_epidemic_cards=5, verbose=False)
+        self.game.turn = pydemic.PlayerTurn(self.game, self.game.players[0])
+        self.game.turn.end()
+        self.game.infection_turn.player_cards_drawn = 2
+
+    def test_quiet_board(self):
+        self.assertEqual(forced_infection_loss(self.game), (None, None))
+
+    def test_eighth_outbreak_is_certain(self):
+        self.game.outbreaks = 7
+        for city in self.game.cities.values():
+            city.cubes[city.color] = 3
+        self.assertEqual(forced_infection_loss(self.game)[0], "lost")
+
+    def test_eighth_outbreak_depends_on_order(self):
+        self.game.outbreaks = 7
+        deck = self.game.infection_deck
+        deck.deck.remove("moscow")
+        deck.deck.remove("lima")
+        deck.layers = [46]
+        deck.deck.extend(["moscow", "lima"])  # an intensified layer of two cards
+        deck.layers.append(2)
+        self.game.cities["moscow"].cubes["black"] = 3
+        # either card could come first, but both are drawn at infection rate 2
+        self.assertEqual(forced_infection_loss(self.game)[0], "lost")
+        self.game.infection_turn.infection_cards_drawn = 1
+        self.assertEqual(forced_infection_loss(self.game), (None, None))
+
+    def test_cube_supply(self):
+        self.game.cube_supply = {color: 0 for color in self.game.colors}
+        self.assertEqual(forced_infection_loss(self.game)[0], "lost")
+
+    def test_not_before_player_cards(self):
+        self.game.cube_supply = {color: 0 for color in self.game.colors}
+        self.game.infection_turn.player_cards_drawn = 1
+        self.assertEqual(forced_infection_loss(self.game), (None, None))
+
+
+class TestForcedWin(TestCase):
+    def setUp(self):
+        self.game = pydemic.Game(num_players=4, num_epidemic_cards=5, verbose=False)
+        self.player = self.game.players[0]
+        self.game.turn = pydemic.PlayerTurn(self.game, self.player)
+        self.game.cured_diseases.extend(["yellow", "black", "red"])
+
+    def test_cards_at_research_station(self):
+        self.player.hand.extend(["san_francisco", "chicago", "montreal", "new_york", "washington"])
+        self.assertEqual(forced_win(self.game)[0], "won")
+
+    def test_drive_to_research_station(self):
+        self.player.city = "chicago"
+        self.player.hand.extend(["san_francisco", "chicago", "montreal", "new_york", "washington"])
+        self.assertEqual(forced_win(self.game)[0], "won")
+        self.game.turn.actions = 1
+        self.assertEqual(forced_win(self.game), (None, None))
+
+    def test_missing_cards(self):
+        self.player.hand.extend(["san_francisco", "chicago", "montreal", "new_york"])
+        self.assertEqual(forced_win(self.game), (None, None))
+
+    def test_only_proved_for_search(self):
+        self.player.hand.extend(["san_francisco", "chicago", "montreal", "new_york", "washington"])
+        self.assertIsNone(DoomDetector().check(self.game))
+        self.assertEqual(DoomDetector(prove_wins=True).check(self.game), "won")
+
+
+class TestLastTurnLoss(TestCase):
+    def setUp(self):
+        self.game = pydemic.Game(num_players=2, num_epidemic_cards=5, verbose=False)
+        self.player = self.game.players[0]
+        self.game.turn = pydemic.PlayerTurn(self.game, self.player)
+        self.game.cured_diseases.extend(["yellow", "black", "red"])
+        self.player.hand.extend(["san_francisco", "chicago", "montreal"])
+        self.game.players[1].hand.append("new_york")
+        del self.game.player_deck[1:]
+
+    def test_too_few_cards_within_reach(self):
+        outcome, reason = last_turn_loss(self.game)
+        self.assertEqual(outcome, "lost")
+        self.assertIn("blue", reason)
+
+    def test_cards_from_other_players_count(self):
+        self.game.players[1].hand.append("washington")
+        self.assertEqual(last_turn_loss(self.game), (None, None))
+
+    def test_not_before_the_last_turn(self):
+        self.game.player_deck.append("london")
+        self.assertEqual(last_turn_loss(self.game), (None, None))
+
+    def test_too_few_actions(self):
+        del self.game.cured_diseases[:]
+        self.game.turn.actions = 3
+        outcome, reason = last_turn_loss(self.game)
+        self.assertEqual(outcome, "lost")
+        self.assertIn("actions", reason)
+
+
+class TestDoomDetector(TestCase):
+    def test_check_records_outcome(self):
+        game = pydemic.Game(num_players=4, num_epidemic_cards=5, verbose=False)
+        doom = DoomDetector()
+        self.assertIsNone(doom.check(game))
+        del game.player_deck[:]
+        self.assertEqual(doom.check(game), "lost")
+        self.assertEqual((doom.checks, doom.proofs, doom.outcome), (2, 1, "lost"))
+
+    def test_pruned_simulations(self):
+        results = run_simulations(20, 4, 5, RandomPolicy(seed=0), doom=DoomDetector())
+        self.assertEqual(results["games"], 20)
+        self.assertEqual(results["won"] + results["lost"] + results["unfinished"], 20)
+        self.assertEqual(results["pruned_fraction"], results["pruned"] / 20.0)
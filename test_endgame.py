@@ -0,0 +1,121 @@
+import pydemic
+from citymap import synthetic_map
+from endgame import EndgamePolicy, EndgameSolver
+from simulation import play_game
+from unittest import TestCase
+
+BLUE = ["city_1", "city_2", "city_3", "city_4", "city_5"]
+
+
+class TestEndgameSolver(TestCase):
+    def setUp(self):
+        # city_0 to city_5 are blue, city_6 to city_11 red; red is already cured
+        city_map = synthetic_map(12, colors=("blue", "red"), degree=2, shortcuts=0, seed=0)
+        self.game = pydemic.Game(num_players=1, num_epidemic_cards=2, city_map=city_map, verbose=False, seed=0)
+        self.game.cured_diseases.append("red")
+        self.player = self.game.players[0]
+        self.game.turn = pydemic.PlayerTurn(self.game, self.player)
+        self.game.player_deck[:] = ["city_6", "city_7", "city_8"]
+
+    def test_forced_cure(self):
+        self.player.hand.extend(BLUE)
+        result = EndgameSolver().solve(self.game)
+        self.assertTrue(result.exact)
+        self.assertEqual(result.value, 1.0)
+        self.assertEqual(result.action, ("discover_cure", ("blue", BLUE)))
+
+    def test_lost_game(self):
+        self.game.lose("test")
+        result = EndgameSolver().solve(self.game)
+        self.assertEqual((result.value, result.upper, result.action), (0.0, 0.0, None))
+
+    def test_win_depends_on_draws(self):
+        # two of the three cards are drawn; holding the fifth blue card wins the last turn
+        self.player.hand.extend(BLUE[:4])
+        self.game.player_deck[:] = ["city_6", "city_7", "city_5"]
+        self.game.turn.actions = 0
+        result = EndgameSolver().solve(self.game)
+        self.assertTrue(result.exact)
+        self.assertAlmostEqual(result.value, 2 / 3.0)
+        self.assertIsNone(result.action)
+
+    def test_epidemics(self):
+        # the Epidemic doesn't change which cards can be drawn, only the board
+        self.player.hand.extend(BLUE[:4])
+        self.game.player_deck[:] = ["city_6", "epidemic", "city_5"]
+        self.game.turn.actions = 0
+        result = EndgameSolver().solve(self.game)
+        self.assertTrue(result.exact)
+        self.assertAlmostEqual(result.value, 2 / 3.0)
+
+    def test_budget(self):
+        self.player.hand.extend(BLUE[:4])
+        self.game.player_deck[:] = ["city_6", "city_7", "city_5"]
+        self.game.turn.actions = 0
+        result = EndgameSolver(max_nodes=1).solve(self.game)
+        self.assertFalse(result.exact)
+        self.assertLessEqual(result.value, 2 / 3.0)
+        self.assertGreaterEqual(result.upper, 2 / 3.0)
+
+    def test_state_key_ignores_deck_order(self):
+        solver = EndgameSolver()
+        solver.solve(self.game)
+        key = solver.state_key(self.game, "action")
+        self.game.player_deck.reverse()
+        self.game.infection_deck.deck.reverse()
+        self.assertEqual(solver.state_key(self.game, "action"), key)
+        self.game.player_deck.pop()
+        self.assertNotEqual(solver.state_key(self.game, "action"), key)
+
+
+class TestEndgamePolicy(TestCase):
+    def setUp(self):
+        self.city_map = synthetic_map(12, colors=("blue", "red"), degree=2, shortcuts=0, seed=0)
+
+    def test_switches_near_the_end(self):
+        game = pydemic.Game(num_players=1, num_epidemic_cards=2, city_map=self.city_map, verbose=False)
+        game.cured_diseases.append("red")
+        game.turn = pydemic.PlayerTurn(game, game.players[0])
+        game.players[0].hand.extend(BLUE)
+        policy = EndgamePolicy(seed=0, max_deck=3)
+        game.player_deck[:] = ["city_6", "city_7", "city_8", "city_9"]
+        policy.choose_action(game)
+        self.assertEqual(policy.solved, 0)
+        game.player_deck.pop()
+        self.assertEqual(policy.choose_action(game)[0], "discover_cure")
+        self.assertEqual(policy.solved, 1)
+
+    def standard_endgame(self, blue_cards):
+        "Return a standard map game where atlanta's card and blue_cards held in chicago can cure blue."
+        game = pydemic.Game(num_players=2, num_epidemic_cards=4, verbose=False, seed=0)
+        game.game_setup()
+        game.cured_diseases.extend(["yellow", "black", "red"])
+        player = game.turn.player
+        partner = [other for other in game.players if other is not player][0]
+        for someone in game.players:
+            del someone.hand[:]
+        blue = [card for card in game.cards.cards(game.cards.color_masks["blue"]) if card != "atlanta"]
+        player.city, partner.city = "chicago", "atlanta"
+        player.hand.extend(blue[:blue_cards])
+        partner.hand.append("atlanta")
+        game.player_deck[:] = [blue[blue_cards], "tokyo"]
+        return game
+
+    def test_solves_on_the_standard_map(self):
+        game = self.standard_endgame(4)
+        policy = EndgamePolicy(seed=0)
+        self.assertEqual(policy.choose_action(game), ("drive", ("atlanta",)))
+        self.assertEqual((policy.solved, policy.bounded), (1, 0))
+
+    def test_plays_best_bound_out_of_budget(self):
+        game = self.standard_endgame(3)
+        policy = EndgamePolicy(seed=0, max_nodes=20)
+        action = policy.choose_action(game)
+        self.assertIn(action, policy.solver.root_moves(game))
+        self.assertEqual((policy.solved, policy.bounded), (0, 1))
+
+    def test_plays_whole_games(self):
+        for seed in range(3):
+            game = pydemic.Game(num_players=2, num_epidemic_cards=2, city_map=self.city_map, verbose=False, seed=seed)
+            play_game(game, EndgamePolicy(seed=seed, max_nodes=200))
+            self.assertTrue(game.won or game.lost)
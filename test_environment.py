@@ -0,0 +1,112 @@
+import numpy as np
+from environment import PydemicEnv, VectorEnv
+from unittest import TestCase
+
+
+def first_legal(mask):
+    return int(mask.nonzero()[0][0])
+
+
+class TestPydemicEnv(TestCase):
+    def setUp(self):
+        self.env = PydemicEnv(num_players=4, num_epidemic_cards=5, seed=0)
+        self.observation = self.env.reset()
+
+    def test_spaces(self):
+        # 48 cities, 4 colors, 4 players
+        self.assertEqual(self.env.num_actions, 1 + 4 * 48 + 1 + 4 + 4 + 4 + 48)
+        self.assertEqual(self.observation.shape, (self.env.observation_size,))
+        self.assertEqual(self.observation.dtype, np.float32)
+
+    def test_observation_after_setup(self):
+        num_cubes = 48 * 4
+        self.assertEqual(self.observation[:num_cubes].sum(), 18)
+
+    def test_mask_matches_legal_moves(self):
+        mask = self.env.action_mask()
+        self.assertTrue(mask[self.env.offsets["skip"]])
+        player = self.env.game.turn.player
+        for city_name in self.env.game.neighbors[player.city]:
+            self.assertTrue(mask[self.env.offsets["drive"] + self.env.city_index[city_name]])
+        self.assertFalse(mask[self.env.offsets["discard"]:].any())
+
+    def test_encode_decode(self):
+        action = self.env.encode("drive", ("chicago",))
+        self.assertEqual(self.env.decode(action), ("drive", self.env.city_index["chicago"]))
+        action = self.env.encode("treat_disease", ("black",))
+        self.assertEqual(self.env.decode(action), ("treat_disease", 2))
+
+    def test_illegal_action(self):
+        with self.assertRaises(ValueError):
+            self.env.step(self.env.encode("drive", ("tokyo",)))
+        with self.assertRaises(ValueError):
+            self.env.step(self.env.num_actions)
+
+    def test_play_to_the_end(self):
+        rng = np.random.RandomState(0)
+        done = False
+        while not done:
+            legal = self.env.action_mask().nonzero()[0]
+            observation, reward, done, info = self.env.step(int(rng.choice(legal)))
+        self.assertIn(reward, (1.0, -1.0))
+        self.assertTrue(info["won"] or info["lost"])
+
+    def test_discard_phase(self):
+        player = self.env.game.turn.player
+        player.hand.extend([card for card in self.env.game.player_deck[:8] if card != "epidemic"])
+        mask = self.env.action_mask()
+        self.assertFalse(mask[self.env.offsets["skip"]])
+        self.assertTrue(mask[self.env.offsets["discard"]:].any())
+
+    def test_seeded_reset(self):
+        first = self.env.reset(seed=5)
+        self.assertTrue((first == PydemicEnv(4, 5).reset(seed=5)).all())
+
+
+class TestVectorEnv(TestCase):
+    def setUp(self):
+        self.envs = VectorEnv(3, num_players=2, num_epidemic_cards=4, seed=0)
+
+    def tearDown(self):
+        self.envs.close()
+
+    def test_step_writes_shared_buffers(self):
+        observations = self.envs.reset()
+        self.assertEqual(observations.shape, (3, self.envs.observation_size))
+        for i in range(50):
+            actions = [first_legal(mask) for mask in self.envs.masks]
+            observations, rewards, dones, masks = self.envs.step(actions)
+            self.assertTrue(masks.any(axis=1).all())  # finished games are reset
+        self.assertIs(observations, self.envs.observations)
+
+    def test_illegal_action(self):
+        self.envs.reset()
+        with self.assertRaises(ValueError):
+            self.envs.step([self.envs.num_actions - 1] * 3)
+
+    def test_dead_worker_raises(self):
+        self.envs.reset()
+        self.envs._workers[1].terminate()
+        self.envs._workers[1].join()
+        with self.assertRaises(ValueError):
+            self.envs.step([first_legal(mask) for mask in self.envs.masks])
+
+
+class TestVectorEnvWorkerErrors(TestCase):
+    def test_unexpected_error_is_reported(self):
+        def broken_step(env, action):
+            raise KeyError(action)
+        step = PydemicEnv.step
+        PydemicEnv.step = broken_step  # inherited by the forked workers
+        try:
+            envs = VectorEnv(2, num_players=2, num_epidemic_cards=4, seed=0)
+        finally:
+            PydemicEnv.step = step
+        try:
+            envs.reset()
+            for i in range(2):  # the workers survive the error and keep serving
+                with self.assertRaises(ValueError):
+                    envs.step([first_legal(mask) for mask in envs.masks])
+            self.assertTrue(all(worker.is_alive() for worker in envs._workers))
+        finally:
+            envs.close()
@@ -0,0 +1,82 @@
+import pydemic
+from epidemics import EpidemicTracker, EpidemicTiming, epidemic_timing
+from unittest import TestCase
+
+
+class TestEpidemicTiming(TestCase):
+    def setUp(self):
+        # 4 players are dealt 8 cards, leaving 40 city cards for 6 sub-piles
+        self.timing = epidemic_timing(40, 6, 4)
+
+    def test_cached(self):
+        self.assertIs(self.timing, epidemic_timing(40, 6, 4))
+
+    def test_sub_piles(self):
+        self.assertEqual(self.timing.pile_lengths, [8, 8, 8, 8, 7, 7])
+        self.assertEqual(self.timing.pile_starts, [0, 8, 16, 24, 32, 39])
+        self.assertEqual(self.timing.total_cards, 46)
+
+    def test_pile_of(self):
+        piles = [self.timing.pile_of(j) for j in range(self.timing.total_cards)]
+        for k, (start, length) in enumerate(zip(self.timing.pile_starts, self.timing.pile_lengths)):
+            self.assertEqual(piles[start:start + length], [k] * length)
+
+    def test_turn_distribution(self):
+        self.assertEqual(self.timing.turn_distribution(0), {1: 0.25, 2: 0.25, 3: 0.25, 4: 0.25})
+        # sub-pile 4 covers draws 32-38, i.e. turns 17-20, with one draw in turn 20
+        self.assertEqual(self.timing.turn_distribution(4), {17: 2 / 7.0, 18: 2 / 7.0, 19: 2 / 7.0, 20: 1 / 7.0})
+        for k in range(6):
+            self.assertAlmostEqual(sum(self.timing.turn_distribution(k).values()), 1)
+            self.assertAlmostEqual(sum(self.timing.player_distribution(k).values()), 1)
+
+    def test_matches_prepared_deck(self):
+        for i in range(20):
+            game = pydemic.Game(num_players=4, num_epidemic_cards=6, verbose=False)
+            game.game_setup()
+            timing = game.epidemic_tracker.timing
+            draws = [j for j, card in enumerate(reversed(game.player_deck)) if card == "epidemic"]
+            self.assertEqual([timing.pile_of(j) for j in draws], range(6))
+
+
+class TestEpidemicTracker(TestCase):
+    def setUp(self):
+        self.tracker = EpidemicTracker(EpidemicTiming(10, 2, 2))  # sub-piles of 6 cards
+
+    def test_posterior_after_safe_draws(self):
+        for i in range(4):
+            self.tracker.observe(False)
+        self.assertEqual(self.tracker.draw_posterior(0), {4: 0.5, 5: 0.5})
+        self.assertEqual(self.tracker.turn_posterior(0), {3: 1.0})
+        self.assertEqual(self.tracker.draw_posterior(1), self.tracker.timing.draw_distribution(1))
+        self.assertAlmostEqual(self.tracker.probability_of_epidemic(2), 1.0)
+
+    def test_posterior_after_epidemic(self):
+        self.tracker.observe(True)
+        self.assertEqual(self.tracker.draw_posterior(0), {0: 1.0})
+        self.assertEqual(self.tracker.epidemics_drawn(), 1)
+        self.assertEqual(self.tracker.probability_of_epidemic(5), 0)
+        self.assertAlmostEqual(self.tracker.probability_of_epidemic(6), 1 / 6.0)
+
+    def test_epidemic_chance_spans_sub_piles(self):
+        for i in range(5):
+            self.tracker.observe(False)
+        # the last card of sub-pile 0 must be its Epidemic
+        self.assertAlmostEqual(self.tracker.expected_epidemics(2), 1 + 1 / 6.0)
+        self.assertAlmostEqual(self.tracker.probability_of_epidemic(2), 1.0)
+
+    def test_inconsistent_draws(self):
+        self.tracker.observe(True)
+        with self.assertRaises(ValueError):
+            self.tracker.observe(True)
+
+
+class TestGameTracksEpidemics(TestCase):
+    def test_draw_player_card_updates_tracker(self):
+        game = pydemic.Game(num_players=4, num_epidemic_cards=5, verbose=False)
+        game.game_setup()
+        game.turn.end()
+        top_card = game.player_deck[-1]
+        game.infection_turn.draw_player_card()
+        tracker = game.epidemic_tracker
+        self.assertEqual(tracker.drawn, 1)
+        self.assertEqual(tracker.epidemics_drawn(), 1 if top_card == "epidemic" else 0)
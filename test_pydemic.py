@@ -1,5 +1,8 @@
+import os
+import networkx as nx
+import tempfile
 import pydemic
-from citymap import citymap
+from citymap import citymap, load_map, save_map, synthetic_map
 from collections import Counter
 from unittest import TestCase
 
@@ -78,6 +81,38 @@ class TestGameSetup(TestCase):
         for player in self.game.players:
             self.assertEqual(len(player.hand), 2)
 
+    def test_copy(self):
+        copied = self.game.copy()
+        self.assertIs(copied.citymap, self.game.citymap)
+        self.assertIs(copied.epidemic_tracker.timing, self.game.epidemic_tracker.timing)
+        copied.turn.skip()
+        copied.players[0].hand.append("dummy")
+        copied.cities["atlanta"].infect()
+        self.assertEqual(self.game.turn.actions, 4)
+        self.assertNotIn("dummy", self.game.players[0].hand)
+        self.assertEqual(sum(self.game.cube_supply.values()), 78)
+        self.assertIs(copied.cities["atlanta"].game, copied)
+        self.assertIs(copied.turn.player, copied.players[copied.turn_count % 4])
+        self.assertEqual(copied.player_deck, self.game.player_deck)
+
+    def test_copy_bitset_hands(self):
+        game = pydemic.Game(num_players=4, num_epidemic_cards=5, bitset_cards=True)
+        game.players[0].hand.append("atlanta")
+        copied = game.copy()
+        copied.players[0].hand.discard("atlanta")
+        self.assertIn("atlanta", game.players[0].hand)
+        self.assertNotIn("atlanta", copied.players[0].hand)
+        self.assertEqual(copied.player_discard_pile.mask, game.cards.bit("atlanta"))
+        self.assertEqual(game.player_discard_pile.mask, 0)
+
+    def test_seeded_setup_is_reproducible(self):
+        first = pydemic.Game(num_players=4, num_epidemic_cards=5, verbose=False, seed=1)
+        second = pydemic.Game(num_players=4, num_epidemic_cards=5, verbose=False, seed=1)
+        first.game_setup()
+        second.game_setup()
+        self.assertEqual(first.player_deck, second.player_deck)
+        self.assertEqual(first.infection_deck.deck, second.infection_deck.deck)
+
 
 class TestTurn(TestCase):
     def setUp(self):
@@ -281,6 +316,23 @@ class TestActions(TestCase):
         self.assertNotIn("blue", self.game.cured_diseases)
 
 
+class TestActionsWithBitsetCards(TestActions):
+    "Run the action tests again with bitset hands."
+    def setUp(self):
+        self.game = pydemic.Game(num_players=4, num_epidemic_cards=5, bitset_cards=True)
+        self.player = self.game.players[0]
+        self.game.turn = pydemic.PlayerTurn(self.game, self.player)
+        self.turn = self.game.turn
+
+    def test_discarded_cards_leave_hand_bitset(self):
+        blue_cities = ["san_francisco", "chicago", "montreal", "new_york", "washington"]
+        self.player.hand.extend(blue_cities)
+        self.assertEqual(self.player.hand.count_color("blue"), 5)
+        self.turn.discover_cure("blue", blue_cities)
+        self.assertEqual(self.player.hand.mask, 0)
+        self.assertEqual(self.game.player_discard_pile.count_color("blue"), 5)
+
+
 class TestTreatingDisease(TestCase):
     def setUp(self):
         self.game = pydemic.Game(num_players=4, num_epidemic_cards=5)
@@ -381,6 +433,17 @@ class TestPlayerHand(TestCase):
         self.assertEqual(card, game.player_discard_pile[-1])
 
 
+class TestPlayerHandColors(TestCase):
+    def test_count_color(self):
+        for bitset_cards in [False, True]:
+            game = pydemic.Game(num_players=4, num_epidemic_cards=5, bitset_cards=bitset_cards)
+            hand = game.players[0].hand
+            hand.extend(["atlanta", "chicago", "moscow"])
+            hand.append("dummy")
+            self.assertEqual(hand.count_color("blue"), 2)
+            self.assertEqual(sorted(hand.cards_of_color("blue")), ["atlanta", "chicago"])
+
+
 class TestCity(TestCase):
     def setUp(self):
         self.game = pydemic.Game(num_players=4, num_epidemic_cards=5)
@@ -467,6 +530,78 @@ class TestCityMap(TestCase):
         correct_counts = {'blue': 12, 'red': 12, 'black': 12, 'yellow': 12}
         self.assertEqual(counter, correct_counts)
 
+    def test_standard_map_settings(self):
+        self.assertEqual(citymap.graph['start'], 'atlanta')
+        self.assertEqual(citymap.graph['colors'], ['blue', 'yellow', 'black', 'red'])
+        self.assertEqual(citymap.graph['cube_supply'], {'blue': 24, 'yellow': 24, 'black': 24, 'red': 24})
+
+    def test_synthetic_map(self):
+        city_map = synthetic_map(1000, colors=("blue", "red", "green"), seed=1)
+        self.assertEqual(len(city_map), 1000)
+        self.assertEqual(city_map.graph['colors'], ['blue', 'red', 'green'])
+        self.assertEqual(sum(city_map.graph['cube_supply'].values()), 2000)
+        self.assertEqual(len(list(nx.connected_components(city_map))), 1)
+
+    def test_synthetic_map_is_reproducible(self):
+        self.assertEqual(sorted(synthetic_map(200, seed=3).edges()),
+                         sorted(synthetic_map(200, seed=3).edges()))
+
+    def test_save_and_load_map(self):
+        city_map = synthetic_map(50, cube_supply=7, seed=2)
+        handle, path = tempfile.mkstemp(suffix=".json")
+        os.close(handle)
+        try:
+            save_map(city_map, path)
+            loaded = load_map(path)
+        finally:
+            os.remove(path)
+        self.assertEqual(sorted(loaded.nodes()), sorted(city_map.nodes()))
+        self.assertEqual(len(loaded.edges()), len(city_map.edges()))
+        self.assertEqual(loaded.graph['start'], 'city_0')
+        self.assertEqual(loaded.graph['colors'], city_map.graph['colors'])
+        self.assertEqual(loaded.graph['cube_supply'], city_map.graph['cube_supply'])
+
+
+    def test_games_share_map_tables(self):
+        city_map = synthetic_map(30, seed=4)
+        first = pydemic.Game(num_players=2, num_epidemic_cards=4, city_map=city_map, verbose=False)
+        second = pydemic.Game(num_players=2, num_epidemic_cards=4, city_map=city_map, verbose=False)
+        self.assertIs(first.neighbors, second.neighbors)
+        self.assertIs(first.cards, second.cards)
+        city_map.add_edge("city_0", "city_15")
+        third = pydemic.Game(num_players=2, num_epidemic_cards=4, city_map=city_map, verbose=False)
+        self.assertIn("city_15", third.neighbors["city_0"])
+        self.assertNotIn("city_15", first.neighbors["city_0"])
+
+
+class TestCustomMap(TestCase):
+    def setUp(self):
+        self.city_map = synthetic_map(100, colors=("blue", "red"), cube_supply=30, seed=0)
+        self.game = pydemic.Game(num_players=2, num_epidemic_cards=4, city_map=self.city_map, verbose=False)
+
+    def test_game_uses_map_settings(self):
+        self.assertEqual(self.game.colors, ['blue', 'red'])
+        self.assertEqual(self.game.cube_supply, {'blue': 30, 'red': 30})
+        self.assertEqual(self.game.players[0].city, 'city_0')
+        self.assertTrue(self.game.cities['city_0'].has_research_station)
+        self.assertEqual(len(self.game.player_deck), 100)
+
+    def test_game_setup(self):
+        self.game.game_setup()
+        self.assertEqual(sum(self.game.cube_supply.values()), 60 - 18)
+        self.assertEqual(self.game.player_deck.count("epidemic"), 4)
+
+    def test_eradication_uses_map_cube_supply(self):
+        self.game.cured_diseases.append("red")
+        self.game.check_eradication("red")
+        self.assertIn("red", self.game.eradicated_diseases)
+
+    def test_outbreak(self):
+        city = self.game.cities['city_0']
+        city.outbreak('blue')
+        for city_name in self.city_map.neighbors('city_0'):
+            self.assertEqual(self.game.cities[city_name].cubes['blue'], 1)
+
 
 class TestInfectionDeck(TestCase):
     def setUp(self):
@@ -0,0 +1,160 @@
+import networkx as nx
+import numpy as np
+import pydemic
+from citymap import finish_map
+from scoring import FEATURES, ActionScorer, BoardArrays, ScoringPolicy, board_arrays, weight_vector
+from simulation import RandomPolicy, legal_actions, play_game, play_turn
+from unittest import TestCase
+
+
+def reference_features(game, method_name, args):
+    "Compute one action's features with plain loops over the game, for comparison."
+    player = game.turn.player
+    hand = player.hand
+    row = dict.fromkeys(FEATURES, 0.0)
+
+    def station_distance(city_name):
+        seen, frontier, distance = {city_name}, [city_name], 0
+        while not any(game.cities[name].has_research_station for name in frontier):
+            frontier = [n for name in frontier for n in game.neighbors[name] if n not in seen]
+            seen.update(frontier)
+            distance += 1
+        return distance
+
+    def held(color):
+        return sum(1 for card in hand if card in game.cards.card_colors and game.cards.card_colors[card] == color)
+
+    ready = any(held(color) >= 5 and color not in game.cured_diseases for color in game.colors)
+    if method_name in ("drive", "direct_flight", "charter_flight", "shuttle_flight"):
+        city = game.cities[args[0]]
+        row["cubes"] = sum(city.cubes.values())
+        row["outbreak_risk"] = sum(1 for count in city.cubes.values() if count >= 3)
+        row["nearby_cubes"] = sum(sum(game.cities[n].cubes.values()) for n in game.neighbors[city.name])
+        row["station_progress"] = ready * (station_distance(player.city) - station_distance(city.name))
+        if method_name == "direct_flight":
+            row["card_spent"] = held(city.color) - 1
+        elif method_name == "charter_flight":
+            row["card_spent"] = held(game.cities[player.city].color) - 1
+    elif method_name == "build_research_station":
+        row["card_spent"] = held(game.cities[player.city].color) - 1
+        row["build"] = station_distance(player.city)
+    elif method_name == "treat_disease":
+        cubes = game.cities[player.city].cubes[args[0]]
+        row["cubes"] = cubes if args[0] in game.cured_diseases else 1
+        row["outbreak_risk"] = cubes >= 3
+    elif method_name == "share_knowledge":
+        giver, receiver = (player, args[0]) if player.city in hand else (args[0], player)
+        color = game.cities[player.city].color
+        row["share"] = receiver.hand.count_color(color) + 1 - (giver.hand.count_color(color) - 1)
+    elif method_name == "discover_cure":
+        row["cure"] = 1
+    return [row[name] for name in FEATURES]
+
+
+def action_key(action):
+    method_name, args = action
+    return method_name, tuple(tuple(arg) if isinstance(arg, list) else arg for arg in args)
+
+
+class TestActionScorer(TestCase):
+    def setUp(self):
+        self.game = pydemic.Game(num_players=4, num_epidemic_cards=5, verbose=False, seed=0)
+        self.game.game_setup()
+        self.scorer = ActionScorer(self.game, charter=True)
+
+    def test_matches_one_action_at_a_time(self):
+        policy = RandomPolicy(seed=0)
+        for turn in range(5):
+            actions, features = self.scorer.features(self.game)
+            self.assertEqual(sorted(map(action_key, actions)),
+                             sorted(map(action_key, legal_actions(self.game))))
+            for action, row in zip(actions, features):
+                np.testing.assert_allclose(row, reference_features(self.game, *action), err_msg=str(action))
+            play_turn(self.game, policy)
+
+    def test_cure_scores_highest(self):
+        player = self.game.turn.player
+        player.city = "atlanta"
+        player.hand.extend(["san_francisco", "chicago", "montreal", "new_york", "washington"])
+        actions, scores = self.scorer.score(self.game)
+        self.assertEqual(actions[scores.argmax()][0], "discover_cure")
+
+    def test_pluggable_weights(self):
+        self.game.cities["chicago"].cubes["blue"] = 3
+        self.game.turn.player.city = "atlanta"
+        actions, scores = self.scorer.score(self.game, weights={"cubes": 0.0, "outbreak_risk": 0.0,
+                                                                "nearby_cubes": -10.0})
+        self.assertNotEqual(actions[scores.argmax()], ("drive", ("chicago",)))
+        actions, scores = self.scorer.score(self.game, weights={"outbreak_risk": 10.0})
+        self.assertEqual(actions[scores.argmax()], ("drive", ("chicago",)))
+
+    def test_board_follows_the_game(self):
+        board = board_arrays(self.game)
+        turn = self.game.turn
+        infected = sorted(name for name, city in self.game.cities.items() if city.cubes[city.color])[0]
+        turn.player.city = infected
+        turn.treat_disease(self.game.cities[infected].color)
+        turn.player.hand.append(infected)
+        turn.build_research_station()
+        self.game.remove_research_station("atlanta")
+        play_turn(self.game, RandomPolicy(seed=0))
+        fresh = BoardArrays(self.game)
+        np.testing.assert_array_equal(board.cubes, fresh.cubes)
+        np.testing.assert_array_equal(board.stations, fresh.stations)
+        self.scorer.score(self.game)
+        self.assertIs(board_arrays(self.game), board)
+        self.assertEqual(sum(isinstance(observer, BoardArrays) for observer in self.game.observers), 1)
+
+    def test_weight_vector(self):
+        self.assertEqual(weight_vector().shape, (len(FEATURES),))
+        self.assertEqual(weight_vector({"cure": 7.0})[FEATURES.index("cure")], 7.0)
+        with self.assertRaises(ValueError):
+            weight_vector({"speed": 1.0})
+        with self.assertRaises(ValueError):
+            weight_vector([1.0, 2.0])
+
+
+class TestDisconnectedMap(TestCase):
+    def setUp(self):
+        graph = nx.Graph()
+        blue = ["a{}".format(i) for i in range(6)]
+        red = ["b0", "b1"]
+        for name in blue:
+            graph.add_node(name, color="blue")
+        for name in red:
+            graph.add_node(name, color="red")
+        graph.add_path(blue)
+        graph.add_path(red)
+        self.game = pydemic.Game(num_players=1, num_epidemic_cards=2, city_map=finish_map(graph, "a0"),
+                                 verbose=False)
+        self.scorer = ActionScorer(self.game)
+
+    def test_unreachable_cities_are_far(self):
+        a0, b0 = self.scorer.index["a0"], self.scorer.index["b0"]
+        self.assertEqual(self.scorer.distances[a0, b0], len(self.scorer.names))
+        self.assertEqual(self.scorer.distances[b0, b0], 0)
+
+    def test_flying_away_from_the_stations_is_no_progress(self):
+        player = self.game.players[0]
+        player.city = "a1"
+        player.hand.extend(["a0", "a2", "a3", "a4", "a5", "b0"])
+        self.game.turn = pydemic.PlayerTurn(self.game, player)
+        actions, features = self.scorer.features(self.game)
+        progress = {action_key(action): row[FEATURES.index("station_progress")]
+                    for action, row in zip(actions, features)}
+        self.assertEqual(progress[("drive", ("a0",))], 1)
+        self.assertLess(progress[("direct_flight", ("b0",))], 0)
+
+
+class TestScoringPolicy(TestCase):
+    def test_plays_whole_games(self):
+        for seed in range(3):
+            game = play_game(pydemic.Game(num_players=4, num_epidemic_cards=5, verbose=False, seed=seed),
+                             ScoringPolicy(seed=seed))
+            self.assertTrue(game.won or game.lost)
+
+    def test_discards_from_the_smallest_color(self):
+        game = pydemic.Game(num_players=4, num_epidemic_cards=5, verbose=False)
+        player = game.players[0]
+        player.hand.extend(["atlanta", "chicago", "tokyo"])
+        self.assertEqual(ScoringPolicy(seed=0).choose_discard(game, player), "tokyo")
@@ -0,0 +1,74 @@
+import pydemic
+from citymap import synthetic_map
+from simulation import ACTION, DISCARD, PLAYER_DRAW, RandomPolicy, advance, legal_actions, play_game
+from unittest import TestCase
+
+
+class TestLegalActions(TestCase):
+    def setUp(self):
+        self.game = pydemic.Game(num_players=4, num_epidemic_cards=5, verbose=False)
+        self.player = self.game.players[0]
+        self.game.turn = pydemic.PlayerTurn(self.game, self.player)
+
+    def test_drive_to_neighbors(self):
+        actions = legal_actions(self.game)
+        drives = set(args[0] for name, args in actions if name == "drive")
+        self.assertEqual(drives, set(self.game.neighbors["atlanta"]))
+
+    def test_charter_flight_needs_current_city_card(self):
+        self.assertNotIn("charter_flight", [name for name, args in legal_actions(self.game)])
+        self.player.hand.append("atlanta")
+        charters = [name for name, args in legal_actions(self.game) if name == "charter_flight"]
+        self.assertEqual(len(charters), 47)
+        self.assertNotIn("charter_flight", [name for name, args in legal_actions(self.game, charter=False)])
+
+    def test_discover_cure(self):
+        blue_cities = ["san_francisco", "chicago", "montreal", "new_york", "washington"]
+        self.player.hand.extend(blue_cities)
+        self.assertIn(("discover_cure", ("blue", blue_cities)), legal_actions(self.game))
+
+    def test_all_actions_are_legal(self):
+        self.game.cities["atlanta"].cubes["blue"] = 2
+        self.player.hand.extend(["atlanta", "moscow"])
+        for method_name, args in legal_actions(self.game):
+            game = pydemic.Game(num_players=4, num_epidemic_cards=5, verbose=False)
+            player = game.players[0]
+            game.turn = pydemic.PlayerTurn(game, player)
+            game.cities["atlanta"].cubes["blue"] = 2
+            player.hand.extend(["atlanta", "moscow"])
+            getattr(game.turn, method_name)(*args)
+            self.assertEqual(game.turn.actions, 3)
+
+
+class TestPlayGame(TestCase):
+    def test_game_ends(self):
+        game = play_game(pydemic.Game(num_players=4, num_epidemic_cards=5, verbose=False), RandomPolicy(seed=0))
+        self.assertTrue(game.won or game.lost)
+
+    def test_large_synthetic_map(self):
+        city_map = synthetic_map(3000, seed=0)
+        game = pydemic.Game(num_players=3, num_epidemic_cards=6, city_map=city_map, verbose=False)
+        play_game(game, RandomPolicy(seed=0), max_turns=50)
+        self.assertTrue(game.lost or game.turn_count > 50)
+
+
+class TestAdvance(TestCase):
+    def setUp(self):
+        self.game = pydemic.Game(num_players=4, num_epidemic_cards=5, verbose=False, seed=0)
+        self.game.game_setup()
+
+    def test_stops_for_actions(self):
+        self.assertEqual(advance(self.game), ACTION)
+        self.game.turn.actions = 0
+        self.assertEqual(advance(self.game), ACTION)
+        self.assertEqual(self.game.turn_count, 2)
+
+    def test_stops_for_draws(self):
+        self.game.turn.actions = 0
+        self.assertEqual(advance(self.game, stop_at_draws=True), PLAYER_DRAW)
+        self.assertTrue(self.game.turn.ended)
+        self.assertEqual(self.game.infection_turn.player_cards_drawn, 0)
+
+    def test_stops_for_discards(self):
+        self.game.turn.player.hand.extend(self.game.player_deck[-10:])
+        self.assertEqual(advance(self.game), DISCARD)
@@ -0,0 +1,100 @@
+import json
+import pydemic
+from citymap import citymap
+from doom import DoomDetector
+from simulation import RandomPolicy, play_game, run_simulations
+from stats import DOOMED, GameStats, Histogram, QuantileSketch
+from unittest import TestCase
+
+
+class TestHistogram(TestCase):
+    def test_clamps_to_bins(self):
+        histogram = Histogram(4)
+        for value in (-1, 0, 2, 3, 10):
+            histogram.add(value)
+        self.assertEqual(histogram.counts, [2, 0, 1, 2])
+        self.assertEqual(histogram.quantile(0.5), 2)
+
+    def test_merge_needs_same_size(self):
+        with self.assertRaises(ValueError):
+            Histogram(4).merge(Histogram(5))
+
+
+class TestQuantileSketch(TestCase):
+    def test_relative_accuracy(self):
+        sketch = QuantileSketch(relative_accuracy=0.01)
+        values = range(1, 10001)
+        for value in values:
+            sketch.add(value)
+        for q in (0.01, 0.5, 0.9, 0.99):
+            exact = values[int(q * (len(values) - 1))]
+            self.assertAlmostEqual(sketch.quantile(q) / exact, 1, delta=0.0101)
+
+    def test_merge_matches_one_sketch(self):
+        whole, first, second = QuantileSketch(), QuantileSketch(), QuantileSketch()
+        for value in range(500):
+            whole.add(value)
+            (first if value % 3 else second).add(value)
+        merged = first.merge(second)
+        self.assertEqual(merged.to_dict(), whole.to_dict())
+
+    def test_bounded_bins(self):
+        sketch = QuantileSketch(max_bins=10)
+        for value in range(1, 1000):
+            sketch.add(value)
+        self.assertEqual(len(sketch.bins), 10)
+        self.assertAlmostEqual(sketch.quantile(0.99) / 989, 1, delta=0.0101)
+
+    def test_rejects_negative_values(self):
+        with self.assertRaises(ValueError):
+            QuantileSketch().add(-1)
+
+
+class TestGameStats(TestCase):
+    def test_counts_events(self):
+        stats = GameStats(citymap)
+        game = stats.watch(pydemic.Game(num_players=4, num_epidemic_cards=5, verbose=False, seed=0))
+        game.game_setup()
+        self.assertEqual(sum(stats.cubes), 18)
+        self.assertEqual(sum(stats.heatmap("cubes")[name][color] for name, city in game.cities.items()
+                             for color, count in city.cubes.items()), 18)
+        game.epidemic()
+        self.assertEqual(sum(stats.epidemics), 1)
+        self.assertEqual(stats.epidemic_turns.counts[game.turn_count], 1)
+        game.lose("Reached eigth outbreak.")
+        game.lose("Ran out of blue cubes")
+        self.assertEqual(stats.loss_reasons, {"Reached eigth outbreak.": 1})
+
+    def test_copies_are_not_watched(self):
+        stats = GameStats(citymap)
+        game = stats.watch(pydemic.Game(num_players=4, num_epidemic_cards=5, verbose=False, seed=0))
+        game.game_setup()
+        game.copy().cities["atlanta"].infect()
+        self.assertEqual(sum(stats.cubes), 18)
+
+    def test_merge_and_serialize(self):
+        whole, first, second = GameStats(citymap), GameStats(citymap), GameStats(citymap)
+        for seed in range(20):
+            for stats in (whole, first if seed % 2 else second):
+                game = stats.watch(pydemic.Game(num_players=4, num_epidemic_cards=5, verbose=False, seed=seed))
+                play_game(game, RandomPolicy(seed=seed))
+                stats.finish(game)
+        merged = GameStats.from_dict(json.loads(json.dumps(first.to_dict()))).merge(second)
+        self.assertEqual(merged.to_dict(), whole.to_dict())
+        self.assertEqual(merged.games, 20)
+        self.assertEqual(sum(merged.loss_reasons.values()), 20 - merged.won)
+
+    def test_run_simulations(self):
+        stats = GameStats(citymap)
+        results = run_simulations(5, 4, 5, RandomPolicy(seed=0), stats=stats)
+        self.assertEqual(stats.games, 5)
+        self.assertEqual(sum(stats.outbreaks), sum(count for count, city in stats.top("outbreaks", n=None)))
+        self.assertEqual(stats.turns.count, results["games"])
+
+    def test_doomed_games_count_as_losses(self):
+        stats = GameStats(citymap)
+        results = run_simulations(30, 4, 5, RandomPolicy(seed=0), doom=DoomDetector(), stats=stats)
+        self.assertGreater(results["pruned"], 0)
+        self.assertGreater(stats.loss_reasons[DOOMED], 0)
+        self.assertEqual(sum(stats.loss_reasons.values()), results["lost"])
+        self.assertEqual(stats.won, results["won"])
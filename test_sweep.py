@@ -0,0 +1,49 @@
+from StringIO import StringIO
+from simulation import RandomPolicy
+from sweep import Cell, run_sweep, wilson_interval
+from unittest import TestCase
+
+
+class TestWilsonInterval(TestCase):
+    def test_no_games(self):
+        self.assertEqual(wilson_interval(0, 0), (0.0, 1.0))
+
+    def test_contains_win_rate(self):
+        low, high = wilson_interval(30, 100)
+        self.assertTrue(low < 0.3 < high)
+        self.assertAlmostEqual(low, 0.2189, places=3)
+        self.assertAlmostEqual(high, 0.3958, places=3)
+
+    def test_narrows_with_games(self):
+        low, high = wilson_interval(0, 100)
+        self.assertEqual(low, 0.0)
+        self.assertTrue(high < wilson_interval(0, 10)[1])
+
+
+class TestCell(TestCase):
+    def test_first_batch(self):
+        cell = Cell(4, 5, RandomPolicy)
+        self.assertEqual(cell.games_needed(0.05, 50, 10000), 50)
+        self.assertFalse(cell.resolved(0.05, 10000))
+
+    def test_close_cell_needs_more_games(self):
+        cell = Cell(4, 5, RandomPolicy)
+        cell.results.update(games=100, won=50)
+        self.assertEqual(cell.games_needed(0.05, 50, 10000), 385 - 100)
+        self.assertEqual(cell.games_needed(0.05, 50, 200), 100)
+
+    def test_clear_cell_is_resolved(self):
+        cell = Cell(4, 5, RandomPolicy)
+        cell.results.update(games=100, won=0)
+        self.assertTrue(cell.resolved(0.05, 10000))
+
+
+class TestRunSweep(TestCase):
+    def test_sweep(self):
+        out = StringIO()
+        results = run_sweep(players=(2, 4), epidemics=(4,), precision=0.1, batch_size=10,
+                            max_games=40, processes=2, out=out)
+        self.assertEqual(sorted(results), [(2, 4, "random-1"), (4, 4, "random-1")])
+        for totals in results.values():
+            self.assertTrue(10 <= totals["games"] <= 40)
+        self.assertIn("win rate", out.getvalue())
@@ -0,0 +1,79 @@
+import multiprocessing
+import pydemic
+from citymap import synthetic_map
+from endgame import EndgameSolver
+from transposition import TranspositionTable, parallel_solve
+from unittest import TestCase
+
+
+def _store(table, key):
+    table.put(key, 0.25, 0.75, depth=3)
+
+
+class TestTranspositionTable(TestCase):
+    def setUp(self):
+        self.table = TranspositionTable(num_entries=64)
+
+    def test_entry_layout(self):
+        self.assertEqual(self.table.entries.dtype.itemsize, 32)
+        self.assertEqual(self.table.entries.nbytes, 64 * 32)
+
+    def test_put_and_get(self):
+        self.assertIsNone(self.table.get(("state", 1)))
+        self.assertEqual(self.table.get(("state", 1), (0.0, 1.0)), (0.0, 1.0))
+        self.table.put(("state", 1), 0.5, 0.5)
+        self.assertEqual(self.table.get(("state", 1)), (0.5, 0.5))
+        self.assertEqual(self.table.visits(("state", 1)), 2)
+        self.assertEqual(len(self.table), 1)
+        self.table.clear()
+        self.assertEqual(len(self.table), 0)
+
+    def test_replacement(self):
+        table = TranspositionTable(num_entries=4, ways=4)  # a single bucket
+        for depth in [5, 1, 7, 3]:
+            table.put(depth, 0.0, 1.0, depth=depth)
+        table.put("new", 0.0, 1.0, depth=2)
+        self.assertIsNone(table.get(1))  # the least work is replaced
+        self.assertEqual(table.replacements, 1)
+
+        table.new_search()
+        table.put(8, 0.0, 1.0, depth=8)
+        table.put("newer", 0.0, 1.0, depth=0)
+        self.assertIsNone(table.get(3))  # entries from the old search go first
+        self.assertIsNotNone(table.get(8))
+
+    def test_shared_between_processes(self):
+        process = multiprocessing.Process(target=_store, args=(self.table, "from a worker"))
+        process.start()
+        process.join()
+        self.assertEqual(self.table.get("from a worker"), (0.25, 0.75))
+
+
+class TestParallelSolve(TestCase):
+    def setUp(self):
+        city_map = synthetic_map(12, colors=("blue", "red"), degree=2, shortcuts=0, seed=0)
+        self.game = pydemic.Game(num_players=1, num_epidemic_cards=2, city_map=city_map, verbose=False, seed=0)
+        self.game.cured_diseases.append("red")
+        self.game.turn = pydemic.PlayerTurn(self.game, self.game.players[0])
+        self.game.turn.actions = 2
+        self.game.players[0].city = "city_2"
+        self.game.players[0].hand.extend(["city_1", "city_2", "city_3", "city_4"])
+        self.game.player_deck[:] = ["city_6", "city_7", "city_5"]
+
+    def test_matches_single_process(self):
+        expected = EndgameSolver().solve(self.game)
+        table = TranspositionTable(num_entries=2 ** 12)
+        for result in [parallel_solve(self.game, processes=2, table=table),
+                       parallel_solve(self.game, processes=2)]:
+            self.assertTrue(result.exact)
+            self.assertAlmostEqual(result.value, expected.value)
+        self.assertGreater(len(table), 0)
+
+    def test_solver_with_table(self):
+        expected = EndgameSolver().solve(self.game)
+        table = TranspositionTable(num_entries=2 ** 12)
+        solver = EndgameSolver(table=table)
+        result = solver.solve(self.game)
+        self.assertAlmostEqual(result.value, expected.value)
+        self.assertEqual(solver.memo, {})
+        self.assertEqual(solver.solve(self.game).nodes, 0)
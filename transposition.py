@@ -0,0 +1,208 @@
+"""
+A transposition table in shared memory, so that searches in several
+worker processes reuse each other's results instead of rediscovering the
+same states.
+
+The table is a fixed number of 32-byte entries in one RawArray, viewed as
+a NumPy structured array:
+
+    key     int64    hash of the state key, 0 for an empty entry
+    lower   float64  lower bound on the state's value
+    upper   float64  upper bound on the state's value
+    visits  uint32   lookups and stores of the state
+    depth   uint16   work behind the bounds, in expanded nodes
+    age     uint16   the search that last stored the entry
+
+Entries are grouped in buckets of ways entries; a state can only live in
+the bucket its hash picks. When a bucket is full, a new state replaces the
+entry from the oldest search, or else the one with the least work behind
+it. Buckets are guarded by a fixed number of striped locks, so workers
+only wait for each other when they touch buckets of the same stripe.
+
+table = TranspositionTable(num_entries=2 ** 20)
+result = parallel_solve(game, processes=4, table=table)
+
+States are identified by the 64-bit hash of their key alone, so two
+states whose hashes collide share an entry. Workers must be forked from
+the process that created the table, as with environment.VectorEnv.
+"""
+import ctypes
+import multiprocessing
+from multiprocessing.sharedctypes import RawArray, RawValue
+
+import numpy as np
+
+from endgame import EndgameResult, EndgameSolver
+
+ENTRY = np.dtype([("key", np.int64),
+                  ("lower", np.float64),
+                  ("upper", np.float64),
+                  ("visits", np.uint32),
+                  ("depth", np.uint16),
+                  ("age", np.uint16)])
+MAX_DEPTH = 2 ** 16 - 1
+
+
+def state_hash(key):
+    "Return the nonzero 64-bit hash stored for a state key."
+    h = hash(key)
+    return h if h != 0 else 1
+
+
+class TranspositionTable(object):
+    """
+    Bounds and visit counts for up to num_entries states, shared with
+    every process forked after it is created. Supports the get used by
+    EndgameSolver's memo, plus put for storing with a depth. hits, misses,
+    stores and replacements count this process's operations.
+    """
+    def __init__(self, num_entries=2 ** 20, ways=4, stripes=64):
+        if num_entries < ways:
+            raise ValueError("Need at least one bucket of {} entries".format(ways))
+        self.ways = ways
+        self.num_buckets = num_entries // ways
+        self.num_entries = self.num_buckets * ways
+        self._buffer = RawArray(ctypes.c_byte, self.num_entries * ENTRY.itemsize)
+        self.entries = np.frombuffer(self._buffer, dtype=ENTRY)
+        self._search_age = RawValue(ctypes.c_uint16, 0)
+        self._locks = [multiprocessing.Lock() for i in range(stripes)]
+        self._views()
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.replacements = 0
+
+    def _views(self):
+        "Keep a view per field, so entries are read without building records."
+        for name in ENTRY.names:
+            setattr(self, "_" + name, self.entries[name])
+
+    def __len__(self):
+        return int(np.count_nonzero(self._key))
+
+    @property
+    def age(self):
+        return self._search_age.value
+
+    def new_search(self):
+        "Start a new search, so entries stored by earlier ones are replaced first."
+        self._search_age.value = (self._search_age.value + 1) % (MAX_DEPTH + 1)
+
+    def clear(self):
+        "Empty the table."
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            self.entries[:] = 0
+        finally:
+            for lock in self._locks:
+                lock.release()
+
+    def _bucket(self, h):
+        bucket = h % self.num_buckets
+        return bucket * self.ways, self._locks[bucket % len(self._locks)]
+
+    def get(self, key, default=None):
+        "Return the (lower, upper) bounds stored for key, or default."
+        h = state_hash(key)
+        start, lock = self._bucket(h)
+        keys = self._key
+        with lock:
+            for i in range(start, start + self.ways):
+                if keys[i] == h:
+                    self._visits[i] += 1
+                    self.hits += 1
+                    return float(self._lower[i]), float(self._upper[i])
+        self.misses += 1
+        return default
+
+    def visits(self, key):
+        "Return how often key was looked up or stored, or 0 if it isn't in the table."
+        h = state_hash(key)
+        start, lock = self._bucket(h)
+        with lock:
+            for i in range(start, start + self.ways):
+                if self._key[i] == h:
+                    return int(self._visits[i])
+        return 0
+
+    def put(self, key, lower, upper, depth=0):
+        "Store bounds for key, found with depth expanded nodes of work."
+        h = state_hash(key)
+        depth = min(depth, MAX_DEPTH)
+        age = self._search_age.value
+        start, lock = self._bucket(h)
+        keys = self._key
+        with lock:
+            victim = None
+            victim_priority = None
+            for i in range(start, start + self.ways):
+                stored = keys[i]
+                if stored == h:
+                    victim = i
+                    depth = max(depth, int(self._depth[i]))
+                    break
+                if stored == 0:
+                    victim_priority = (-1, 0)
+                    victim = i
+                    continue
+                priority = (int(self._age[i] == age), int(self._depth[i]))
+                if victim_priority is None or priority < victim_priority:
+                    victim, victim_priority = i, priority
+            else:
+                if victim_priority != (-1, 0):
+                    self.replacements += 1
+                self._visits[victim] = 0
+            keys[victim] = h
+            self._lower[victim] = lower
+            self._upper[victim] = upper
+            self._visits[victim] += 1
+            self._depth[victim] = depth
+            self._age[victim] = age
+        self.stores += 1
+
+
+def _solve_moves(game, moves, indices, table, solver_kwargs, lowers, uppers, nodes, worker):
+    "Worker process: solve some of the root moves and write their bounds to shared memory."
+    solver = EndgameSolver(table=table, **solver_kwargs)
+    for i in indices:
+        lowers[i], uppers[i] = solver.solve_move(game, moves[i])
+        nodes[worker] += solver.nodes
+
+
+def parallel_solve(game, processes=2, table=None, **solver_kwargs):
+    """
+    Solve the endgame with the root moves dealt out to processes worker
+    processes and return an EndgameResult. With a TranspositionTable, the
+    workers share what they solve; without one, each keeps its own memo.
+    The node and time budgets in solver_kwargs apply to each root move.
+    """
+    moves = EndgameSolver(**solver_kwargs).root_moves(game)
+    if not moves:
+        return EndgameSolver(table=table, **solver_kwargs).solve(game)
+    if table is not None:
+        table.new_search()
+
+    lowers = RawArray(ctypes.c_double, len(moves))
+    uppers = RawArray(ctypes.c_double, len(moves))
+    nodes = RawArray(ctypes.c_double, processes)
+    workers = []
+    for worker in range(processes):
+        indices = range(worker, len(moves), processes)
+        process = multiprocessing.Process(target=_solve_moves,
+                                          args=(game, moves, indices, table, solver_kwargs,
+                                                lowers, uppers, nodes, worker))
+        process.daemon = True
+        process.start()
+        workers.append(process)
+    for process in workers:
+        process.join()
+        if process.exitcode != 0:
+            raise ValueError("Worker process failed with exit code {}".format(process.exitcode))
+
+    best = max(range(len(moves)), key=lambda i: (lowers[i], -i))
+    lower = lowers[best]
+    upper = max(uppers)
+    exact = upper - lower < 1e-9
+    return EndgameResult(lower, upper, moves[best], exact, int(sum(nodes)))